@@ -0,0 +1,211 @@
+"""
+Benchmarks for the model and db layers on synthetic databases. Tk free.
+
+    python3 -m mastery_app.bench.bench_mastery --scale small --out bench.json
+    python3 -m mastery_app.bench.bench_mastery --scale small --baseline bench.json
+
+Results are written as json, --baseline compares against an earlier run and
+exits non-zero when any case is slower than the tolerance allows.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from ..lib.mastery_db import MasteryDB
+from ..lib.mastery_container import MasteryContainer
+from ..lib.user import make_user_from_db, load_user
+
+# users, containers, sessions
+SCALES = {
+    "tiny": (1, 100, 1_000),
+    "small": (10, 1_000, 10_000),
+    "medium": (100, 10_000, 100_000),
+    "large": (1_000, 100_000, 1_000_000),
+}
+
+LEVELS = ("New", "Novice", "Advanced Beginner", "Competent", "Proficient", "Expert", "Mastery")
+
+
+# ===============================================================
+# Fixtures
+# ===============================================================
+def make_fixture(db_path, users, containers, sessions, seed = 1234):
+    """
+    Fill a fresh database with synthetic users, containers and sessions.
+    Rows are written with executemany in one transaction, not through the
+    per-row MasteryDB methods, so building a large fixture stays quick.
+    """
+    rng = random.Random(seed)
+    db = MasteryDB(db_path, profile="fast")
+    db.setup_mastery_db()
+
+    user_ids = [uuid.UUID(int=rng.getrandbits(128)).bytes for _ in range(users)]
+    container_ids = [uuid.UUID(int=rng.getrandbits(128)).bytes for _ in range(containers)]
+    totals = [0] * containers
+
+    now = time.time()
+    session_rows = []
+    for _ in range(sessions):
+        i = rng.randrange(containers)
+        seconds = rng.randrange(60, 4 * 3600)
+        end = now - rng.uniform(0, 3 * 365 * 86400)
+        totals[i] += seconds
+        session_rows.append((uuid.UUID(int=rng.getrandbits(128)).bytes, container_ids[i], end - seconds, end, seconds, rng.choice(("manual", "timer"))))
+
+    with db.get_cursor() as cursor:
+        cursor.executemany("INSERT INTO users (id, username) VALUES (?,?)",
+                           [(uid, f"user{n}") for n, uid in enumerate(user_ids)])
+        cursor.executemany("INSERT INTO containers (id, xp_seconds, level, name, user_uuid) VALUES (?,?,?,?,?)",
+                           [(cid, totals[n], rng.choice(LEVELS), f"container{n}", user_ids[n % users])
+                            for n, cid in enumerate(container_ids)])
+        cursor.executemany("INSERT INTO sessions (id, container_id, start_time, end_time, seconds, source) VALUES (?,?,?,?,?,?)",
+                           session_rows)
+
+    db.close()
+    return container_ids
+
+
+# ===============================================================
+# Cases
+# ===============================================================
+def timed(func, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": len(runs)}
+
+
+def open_and_setup(db_path):
+    # a fresh MasteryDB per run, closed again so no pooled connection is left open
+    db = MasteryDB(db_path)
+    db.setup_mastery_db()
+    db.close()
+
+
+def run_cases(db_path, container_ids, repeat, updates):
+    db = MasteryDB(db_path)
+    results = {}
+
+    results["setup_mastery_db"] = timed(lambda: open_and_setup(db_path), repeat)
+    results["fetch_existing_db_data"] = timed(db.fetch_existing_db_data, repeat)
+
+    user_rows, container_rows = db.fetch_existing_db_data()
+    results["make_user_from_db"] = timed(lambda: make_user_from_db(user_rows, container_rows, db), repeat)
+    results["load_user_lazy"] = timed(lambda: load_user(db, lazy=True), repeat)
+
+    targets = container_ids[:updates]
+
+    def single_updates():
+        for cid in targets:
+            db.update_container_db(cid, 3600, "New")
+
+    def bulk_update():
+        with db.get_cursor():
+            for cid in targets:
+                db.update_container_db(cid, 3600, "New")
+
+    results[f"update_container_db_single_x{len(targets)}"] = timed(single_updates, repeat)
+    results[f"update_container_db_bulk_x{len(targets)}"] = timed(bulk_update, repeat)
+
+    containers = [MasteryContainer(name=row["name"], cont_uuid=row["id"], xp_seconds=row["xp_seconds"]) for row in container_rows]
+
+    def level_computation():
+        for container in containers:
+            container.update_xp_seconds(0)
+
+    results[f"level_computation_x{len(containers)}"] = timed(level_computation, repeat)
+
+    db.close()
+    return results
+
+
+# ===============================================================
+# Reporting
+# ===============================================================
+def compare(results, baseline, tolerance):
+    """
+    Print each case against the baseline, return the names that regressed.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:<45} {result['min'] * 1000:10.2f} ms   (new)")
+            continue
+
+        ratio = result["min"] / base["min"] if base["min"] else float("inf")
+        flag = ""
+        if ratio > 1.0 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<45} {result['min'] * 1000:10.2f} ms   {ratio:6.2f}x baseline{flag}")
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Benchmark the model and db layers")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int, help="override the scale's user count")
+    parser.add_argument("--containers", type=int, help="override the scale's container count")
+    parser.add_argument("--sessions", type=int, help="override the scale's session count")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--updates", type=int, default=200, help="containers touched by the update cases")
+    parser.add_argument("--out", help="write results json here")
+    parser.add_argument("--baseline", help="compare against an earlier results json")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing, 0.25 = 25%%")
+    parser.add_argument("--keep", action="store_true", help="keep the fixture database")
+    args = parser.parse_args(argv)
+
+    users, containers, sessions = SCALES[args.scale]
+    users = args.users or users
+    containers = args.containers or containers
+    sessions = args.sessions if args.sessions is not None else sessions
+
+    workdir = tempfile.mkdtemp(prefix="mastery_bench_")
+    db_path = os.path.join(workdir, "bench.db")
+
+    start = time.perf_counter()
+    container_ids = make_fixture(db_path, users, containers, sessions)
+    print(f"fixture: {users} users, {containers} containers, {sessions} sessions in {time.perf_counter() - start:.1f}s")
+
+    results = run_cases(db_path, container_ids, args.repeat, args.updates)
+    report = {
+        "scale": {"users": users, "containers": containers, "sessions": sessions},
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.time(),
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    else:
+        for name, result in results.items():
+            print(f"{name:<45} {result['min'] * 1000:10.2f} ms")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.keep:
+        MasteryDB(db_path).delete_db()
+        os.rmdir(workdir)
+    else:
+        print(f"fixture kept at {db_path}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# batch entry: many "name hh.mm" lines checked up front and applied together
+from mastery_app.lib.time_format import parse_seconds
+
+MAX_SECONDS = 10000 * 3600  # same clamp as a single manual update
+
+
+def parse_batch(text, known = None) -> list:
+    """
+    Parse lines of "name hh.mm" into (name, seconds) pairs. The name is
+    everything before the last token, so it may contain spaces. Blank lines
+    and # comments are skipped. When known is given every name must be in it.
+
+    Every line is checked before anything is returned; ValueError lists all
+    bad lines at once.
+    """
+    entries = []
+    errors = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        name, _, value = line.rpartition(" ")
+        name = name.strip()
+        if not name:
+            errors.append(f"Line {number}: expected 'name hh.mm'")
+            continue
+
+        try:
+            seconds = parse_seconds(value)
+        except ValueError:
+            errors.append(f"Line {number}: invalid time '{value}'")
+            continue
+
+        if known is not None and name not in known:
+            errors.append(f"Line {number}: no XP bar named '{name}'")
+            continue
+
+        entries.append((name, max(0, min(MAX_SECONDS, seconds))))
+
+    if errors:
+        raise ValueError("\n".join(errors))
+    return entries
@@ -0,0 +1,186 @@
+import itertools
+import threading
+import time
+
+from mastery_app.lib.keys import to_key
+
+
+class DBWriter:
+    """
+    Runs every MasteryDB write on one background thread so the UI never waits
+    on a commit. Writes are queued, repeated writes with the same key collapse
+    into the latest one, and each batch is committed as a single transaction.
+    A write that fails is printed and dropped on its own, the rest of its
+    batch still lands.
+    """
+    def __init__(self, db, interval = 0.25):
+        self.db = db
+        self.interval = interval  # seconds to let writes pile up before committing
+
+        self._pending = {}  # key -> (method name, args, kwargs), in submit order
+        self._cond = threading.Condition()
+        self._ids = itertools.count()
+        self._submitted = 0
+        self._committed = 0
+        self._flush_waiters = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="mastery-db-writer", daemon=True)
+        self._thread.start()
+
+    # ===============================================================
+    # Queue
+    # ===============================================================
+    def submit(self, method, *args, key = None, **kwargs):
+        """
+        Queue db.<method>(*args, **kwargs). Writes sharing a key replace each
+        other, the survivor moves to the back of the queue.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("DBWriter is closed")
+
+            if key is None:
+                key = ("write", next(self._ids))
+            was_idle = not self._pending
+            self._pending.pop(key, None)
+            self._pending[key] = (method, args, kwargs)
+            self._submitted += 1
+
+            if was_idle:
+                self._cond.notify_all()
+
+    def flush(self):
+        """
+        Block until everything submitted so far is committed or dropped.
+        """
+        with self._cond:
+            target = self._submitted
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._committed < target:
+                    self._cond.wait()
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self):
+        """
+        Drain the queue, stop the writer thread and release its connection.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    # ===============================================================
+    # Writer thread
+    # ===============================================================
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+
+                if not self._pending and self._closed:
+                    break
+
+                # give more writes a chance to land in this batch unless
+                # someone is waiting on a flush or we are shutting down
+                deadline = time.monotonic() + self.interval
+                while not self._flush_waiters and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch, self._pending = self._pending, {}
+                target = self._submitted
+
+            try:
+                with self.db.get_cursor():
+                    for method, args, kwargs in batch.values():
+                        getattr(self.db, method)(*args, **kwargs)
+            except Exception:
+                # the batch rolled back, redo each write on its own so one
+                # bad write only loses itself
+                for method, args, kwargs in batch.values():
+                    try:
+                        with self.db.get_cursor():
+                            getattr(self.db, method)(*args, **kwargs)
+                    except Exception as e:
+                        print(f"DB write {method} failed: {e}")
+
+            with self._cond:
+                self._committed = target
+                self._cond.notify_all()
+
+        self.db.connections.release()
+
+    # ===============================================================
+    # Same write API as MasteryDB
+    # ===============================================================
+    def insert_user_db(self, id, username):
+        self.submit("insert_user_db", to_key(id), username)
+
+    def update_user_db(self, id, name):
+        self.submit("update_user_db", to_key(id), name, key=("user", to_key(id)))
+
+    def set_level_ladder_db(self, user_id, ladder):
+        self.submit("set_level_ladder_db", to_key(user_id), ladder, key=("levels", to_key(user_id)))
+
+    def set_setting_db(self, key, value):
+        self.submit("set_setting_db", key, value, key=("setting", key))
+
+    def insert_container_db(self, cont_uuid, name, user_id, level = None):
+        self.submit("insert_container_db", to_key(cont_uuid), name, to_key(user_id), level)
+
+    def update_container_db(self, id, xp_seconds, level):
+        self.submit("update_container_db", to_key(id), xp_seconds, level, key=("container", to_key(id)))
+
+    def delete_container_db(self, id):
+        # shares the update key so a pending xp update is dropped with the container
+        self.submit("delete_container_db", to_key(id), key=("container", to_key(id)))
+
+    def add_session_db(self, cont_uuid, seconds, level, source = "manual", start = None, end = None):
+        # sessions are additive and never coalesced, stamp the time now rather than at commit
+        if end is None:
+            end = time.time()
+        self.submit("add_session_db", to_key(cont_uuid), seconds, level, source=source, start=start, end=end)
+
+    def add_sessions_db(self, entries, source = "manual"):
+        entries = [(to_key(cont_uuid), seconds, level) for cont_uuid, seconds, level in entries]
+        self.submit("add_sessions_db", entries, source=source, end=time.time())
+
+    def open_session_db(self, session_id, cont_uuid, start, source = "timer"):
+        self.submit("open_session_db", to_key(session_id), to_key(cont_uuid), start, source=source)
+
+    def checkpoint_session_db(self, session_id, end, seconds, level):
+        # checkpoints carry the running total, so only the newest one matters
+        self.submit("checkpoint_session_db", to_key(session_id), end, seconds, level, key=("session", to_key(session_id)))
+
+    def checkpoint_sessions_db(self, entries):
+        self.submit("checkpoint_sessions_db", [(to_key(session_id), end, seconds, level) for session_id, end, seconds, level in entries])
+
+    def close_session_db(self, session_id, end, seconds, level):
+        self.submit("close_session_db", to_key(session_id), end, seconds, level, key=("session", to_key(session_id)))
+
+    def finish_session_db(self, session_id):
+        self.submit("finish_session_db", to_key(session_id))
+
+    def discard_session_db(self, session_id, level):
+        self.submit("discard_session_db", to_key(session_id), level)
+
+    def record_milestones_db(self, crossings):
+        self.submit("record_milestones_db", [(to_key(key), hours, reached_at) for key, hours, reached_at in crossings])
+
+    def set_goal_db(self, cont_uuid, target_hours, due):
+        self.submit("set_goal_db", to_key(cont_uuid), target_hours, due, key=("goal", to_key(cont_uuid)))
+
+    def delete_goal_db(self, cont_uuid):
+        self.submit("delete_goal_db", to_key(cont_uuid), key=("goal", to_key(cont_uuid)))
+
+    def set_watch_rules_db(self, user_id, rules):
+        self.submit("set_watch_rules_db", to_key(user_id), list(rules), key=("watch", to_key(user_id)))
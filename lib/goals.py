@@ -0,0 +1,108 @@
+import datetime
+import time
+
+# practice rates are exponential moving averages over roughly this many days
+RATE_SPAN_DAYS = 14
+RATE_ALPHA = 2.0 / (RATE_SPAN_DAYS + 1)
+
+SECONDS_PER_DAY = 86400.0
+# an idle bar's rate decays towards zero, past this its ETA is just "never"
+MAX_FORECAST_DAYS = 100 * 365
+
+
+def day_number(timestamp) -> int:
+    """
+    Local calendar day of a unix timestamp, as a plain counting number.
+    """
+    return datetime.date.fromtimestamp(timestamp).toordinal()
+
+
+class PracticeRate:
+    """
+    Hours practiced per day as an EMA over whole days. Adding time is O(1):
+    hours pile up in the current day and get folded into the average once a
+    later day shows up, days without practice just decay it. Nothing is ever
+    recomputed from the session history.
+    """
+    __slots__ = ("ema", "day", "day_hours")
+
+    def __init__(self, ema = 0.0, day = None, day_hours = 0.0):
+        self.ema = ema
+        self.day = day
+        self.day_hours = day_hours
+
+    def _decayed(self, today) -> float:
+        # the average as it stands once every day before today is folded in
+        if self.day is None:
+            return self.ema
+        if today <= self.day:
+            return self.ema
+        ema = RATE_ALPHA * self.day_hours + (1 - RATE_ALPHA) * self.ema
+        return ema * (1 - RATE_ALPHA) ** (today - self.day - 1)
+
+    def add(self, hours, day):
+        if self.day is None:
+            self.day = day
+        elif day > self.day:
+            self.ema = self._decayed(day)
+            self.day = day
+            self.day_hours = 0.0
+        elif day < self.day:
+            # late time for a day that is already folded in, leave the average be
+            return
+
+        self.day_hours = max(0.0, self.day_hours + hours)
+
+    def per_day(self, today = None) -> float:
+        """
+        Current hours per day, counting today's practice so far as a full day.
+        """
+        if today is None:
+            today = day_number(time.time())
+        if self.day is None:
+            return 0.0
+        if today < self.day:
+            today = self.day
+        ema = self._decayed(today)
+        if today == self.day:
+            ema = RATE_ALPHA * self.day_hours + (1 - RATE_ALPHA) * ema
+        return ema
+
+    def row(self) -> tuple:
+        return (self.ema, self.day, self.day_hours)
+
+
+def forecast(hours, target_hours, per_day, now = None):
+    """
+    Projected timestamp at which hours reaches target_hours at per_day hours
+    a day. None when there is no practice to project from or the date is
+    too far out to mean anything.
+    """
+    if now is None:
+        now = time.time()
+    remaining = target_hours - hours
+    if remaining <= 0:
+        return now
+    if per_day <= 0:
+        return None
+    days = remaining / per_day
+    if days > MAX_FORECAST_DAYS:
+        return None
+    return now + days * SECONDS_PER_DAY
+
+
+def parse_due_date(text):
+    """
+    'YYYY-MM-DD' → unix timestamp at the end of that local day.
+    """
+    date = datetime.datetime.strptime(text.strip(), "%Y-%m-%d")
+    return (date + datetime.timedelta(days=1)).timestamp() - 1
+
+
+def format_date(timestamp):
+    if timestamp is None:
+        return "never"
+    try:
+        return datetime.date.fromtimestamp(timestamp).isoformat()
+    except (OverflowError, OSError, ValueError):
+        return "never"
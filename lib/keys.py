@@ -0,0 +1,39 @@
+# ids are stored as 16 byte blobs, these convert whatever callers hold
+import os
+import uuid
+
+
+def to_key(value) -> bytes:
+    """
+    uuid.UUID, uuid string or 16 raw bytes → 16 raw bytes.
+    """
+    if isinstance(value, bytes):
+        if len(value) != 16:
+            raise ValueError(f"Invalid key length: {len(value)}")
+        return value
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    return uuid.UUID(str(value)).bytes
+
+
+def from_key(value) -> uuid.UUID:
+    if isinstance(value, uuid.UUID):
+        return value
+    if isinstance(value, bytes):
+        return uuid.UUID(bytes=value)
+    return uuid.UUID(str(value))
+
+
+def new_key() -> bytes:
+    return uuid.uuid4().bytes
+
+
+def new_keys(count) -> list:
+    """
+    count random version 4 keys at once, for bulk inserts where building a
+    UUID object per row would dominate.
+    """
+    raw = bytearray(os.urandom(16 * count))
+    raw[6::16] = bytes(b & 0x0F | 0x40 for b in raw[6::16])
+    raw[8::16] = bytes(b & 0x3F | 0x80 for b in raw[8::16])
+    return [bytes(raw[i:i + 16]) for i in range(0, len(raw), 16)]
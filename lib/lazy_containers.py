@@ -0,0 +1,67 @@
+import sys
+from collections.abc import MutableMapping
+
+from mastery_app.lib.mastery_container import MasteryContainer
+from mastery_app.lib.levels import DEFAULT_LADDER
+
+
+class LazyContainers(MutableMapping):
+    """
+    name -> MasteryContainer mapping that starts out holding only the
+    (id, xp_seconds, level) tuples streamed from the db, with level strings
+    interned. A full MasteryContainer is built the first time a name is
+    looked up, so loading a large profile costs one small tuple per
+    container until something actually needs it.
+    """
+    def __init__(self, rows = (), ladder = DEFAULT_LADDER):
+        self.ladder = ladder
+        # rows are (id, name, xp_seconds, level), usually straight off a cursor
+        self._items = {name: (cont_id, xp_seconds, sys.intern(level)) for cont_id, name, xp_seconds, level in rows}
+
+    def __getitem__(self, name):
+        item = self._items[name]
+        if isinstance(item, tuple):
+            cont_id, xp_seconds, level = item
+            item = MasteryContainer(name=name, cont_uuid=cont_id, xp_seconds=xp_seconds, level=level, ladder=self.ladder)
+            # replacing an existing key keeps its position in the mapping
+            self._items[name] = item
+        return item
+
+    def __setitem__(self, name, container):
+        self._items[name] = container
+
+    def __delitem__(self, name):
+        del self._items[name]
+
+    def __contains__(self, name):
+        return name in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def xp_seconds(self, name):
+        """
+        Current seconds for a name without building its container.
+        """
+        item = self._items[name]
+        return item[1] if isinstance(item, tuple) else item.xp_seconds
+
+    def set_ladder(self, ladder, levels):
+        """
+        Switch to a new ladder. levels maps every name to its new level, so
+        unbuilt entries are updated without building them.
+        """
+        self.ladder = ladder
+        for name, item in self._items.items():
+            if isinstance(item, tuple):
+                self._items[name] = (item[0], item[1], levels[name])
+            else:
+                item.ladder = ladder
+                item.level = levels[name]
+                item.version += 1
+
+    def built(self):
+        return sum(1 for item in self._items.values() if not isinstance(item, tuple))
@@ -0,0 +1,102 @@
+# level ladder: hours thresholds → level names
+import bisect
+import sys
+
+# below this many values a bisect per value beats importing and calling NumPy
+NUMPY_MIN_VALUES = 10000
+
+# (minimum hours, level name), the first entry is the starting level
+DEFAULT_LEVELS = (
+    (0.0, "New"),
+    (20.0, "Novice"),
+    (100.0, "Advanced Beginner"),
+    (1000.0, "Competent"),
+    (4000.0, "Proficient"),
+    (8000.0, "Expert"),
+    (10000.0, "Mastery"),
+)
+
+
+class LevelLadder:
+    """
+    Sorted level thresholds. A level starts at its threshold, so looking one
+    up is a single bisect over the thresholds instead of a chain of compares.
+    """
+    __slots__ = ("thresholds", "names")
+
+    def __init__(self, levels = DEFAULT_LEVELS):
+        levels = [(float(hours), str(name).strip()) for hours, name in levels]
+        if not levels:
+            raise ValueError("A level ladder needs at least one level")
+        if levels[0][0] != 0.0:
+            raise ValueError("The first level must start at 0 hours")
+        for (lower, _), (upper, _) in zip(levels, levels[1:]):
+            if upper <= lower:
+                raise ValueError("Level thresholds must be strictly increasing")
+        if any(not name for _, name in levels):
+            raise ValueError("Level names cannot be empty")
+
+        # the starting level has no threshold to cross
+        self.thresholds = tuple(hours for hours, _ in levels[1:])
+        self.names = tuple(sys.intern(name) for _, name in levels)
+
+    def __eq__(self, other):
+        return isinstance(other, LevelLadder) and self.thresholds == other.thresholds and self.names == other.names
+
+    def __hash__(self):
+        return hash((self.thresholds, self.names))
+
+    def levels(self) -> list:
+        """
+        (minimum hours, name) pairs, the form stored in the db.
+        """
+        return list(zip((0.0, *self.thresholds), self.names))
+
+    def level_for(self, hours) -> str:
+        return self.names[bisect.bisect_right(self.thresholds, hours)]
+
+    def levels_for(self, hours_list) -> list:
+        """
+        Levels for many values at once, vectorized with NumPy for large inputs
+        when it is installed. NumPy is only imported here, it is too slow to
+        load for every CLI call.
+        """
+        np = None
+        if len(hours_list) >= NUMPY_MIN_VALUES:
+            try:
+                import numpy as np
+            except ImportError:  # optional, falls back to bisect per value
+                np = None
+
+        if np is not None:
+            indexes = np.searchsorted(np.asarray(self.thresholds, dtype=float),
+                                      np.asarray(hours_list, dtype=float), side="right")
+            names = self.names
+            return [names[i] for i in indexes.tolist()]
+
+        thresholds, names = self.thresholds, self.names
+        return [names[bisect.bisect_right(thresholds, hours)] for hours in hours_list]
+
+
+DEFAULT_LADDER = LevelLadder()
+
+
+def parse_levels(text) -> LevelLadder:
+    """
+    One "hours name" pair per line, e.g. "20 Novice". Raises ValueError.
+    """
+    levels = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        hours, _, name = line.partition(" ")
+        try:
+            levels.append((float(hours), name))
+        except ValueError:
+            raise ValueError(f"Line {number}: expected 'hours name', got '{line}'")
+    return LevelLadder(levels)
+
+
+def format_levels(ladder) -> str:
+    return "\n".join(f"{hours:g} {name}" for hours, name in ladder.levels())
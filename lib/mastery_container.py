@@ -1,56 +1,60 @@
 # container that shows mastery
 # from mastery_app.lib.milestone import Milestone 
-import uuid
+import sys
 
-class MasteryContainer:
+from mastery_app.lib.keys import to_key, from_key, new_key
+from mastery_app.lib.levels import DEFAULT_LADDER
 
-    NOVICE = 20.0
-    ADAVANCED_BEGINNER = 100.0
-    COMPETENT = 1000.0
-    PROFICIENT = 4000.0
-    EXPERT = 8000.0
-    MASTERY = 10000.0
+class MasteryContainer:
 
-    # define levels
+    # slots keep large profiles small: no per-object __dict__
+    __slots__ = ("key", "xp_seconds", "_level", "container_name", "version", "ladder")
 
-    def __init__(self, name, cont_uuid = None, xp_level = 0.0, level = "Novice"):
-        self.uuid = cont_uuid
+    def __init__(self, name, cont_uuid = None, xp_seconds = 0, level = None, ladder = DEFAULT_LADDER):
+        # the id is kept as its 16 db bytes rather than a uuid.UUID object
+        self.key = to_key(cont_uuid) if cont_uuid else new_key()
         #self.milestone = Milestone()
-        self.xp_level = xp_level
-        self.level = level
+        self.ladder = ladder  # shared per user, decides which level an xp total is
+        # whole seconds, summing ints never drifts the way float hours did
+        self.xp_seconds = int(xp_seconds)
+        self.level = level if level is not None else ladder.level_for(self.hours)
         self.container_name = name
+        self.version = 0  # bumped on every change so views only redraw what changed
+
+    @property
+    def uuid(self):
+        return from_key(self.key)
+
+    @property
+    def hours(self):
+        return self.xp_seconds / 3600.0
 
-        if not self.uuid:
-            self.uuid = uuid.uuid4()
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, value):
+        # every container at a level shares one string object
+        self._level = sys.intern(value)
 
     def update_name(self, name):
         self.container_name = name
+        self.version += 1
+
+    def update_xp_seconds(self, seconds: int):
+        self.xp_seconds += int(seconds)
+        self.level = self._check_expert_level()
+        self.version += 1
 
-    def update_xp_level(self, time: float):
-        self.xp_level += time
+    def set_ladder(self, ladder):
+        self.ladder = ladder
         self.level = self._check_expert_level()
+        self.version += 1
 
     def _check_expert_level(self):
-        match self.xp_level:
-            case xp if xp <= self.NOVICE:
-                return "New"
-            case xp if xp < self.ADAVANCED_BEGINNER and xp >= self.NOVICE:
-                return "Novice"
-            case xp if xp < self.COMPETENT and xp >= self.ADAVANCED_BEGINNER:
-                return "Advanced Beginner"
-            case xp if xp < self.PROFICIENT and xp >= self.COMPETENT:
-                return "Competent"
-            case xp if xp < self.EXPERT and xp >= self.PROFICIENT:
-                return "Proficient"
-            case xp if xp < self.MASTERY and xp >= self.EXPERT:
-                return "Expert"
-            case _:
-                return "Mastery"
+        return self.ladder.level_for(self.hours)
             
-def make_new_container(name):
-    new_container = MasteryContainer(name=name)
+def make_new_container(name, ladder = DEFAULT_LADDER):
+    new_container = MasteryContainer(name=name, ladder=ladder)
     return new_container
-
-def make_db_container(name, cont_uuid, xp_level, level):
-    db_container = MasteryContainer(name=name, cont_uuid=cont_uuid, xp_level=xp_level, level=level)
-    return db_container
\ No newline at end of file
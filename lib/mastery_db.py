@@ -1,12 +1,208 @@
 import sqlite3 as sql
 import contextlib
+import heapq
 import os
+import threading
+import time
 import uuid
+from array import array
+
+from mastery_app.lib.keys import to_key, new_key
+from mastery_app.lib.levels import LevelLadder, DEFAULT_LADDER
+from mastery_app.lib.goals import PracticeRate, day_number
+from mastery_app.lib.rollups import PERIODS, bucket_for, add_to_totals
+
+# bump with a new entry in MIGRATIONS whenever the layout changes
+SCHEMA_VERSION = 10
+
+# version -> method that upgrades from the previous version, None when the
+# version only adds tables, which the _make_* methods create anyway
+# version 1 is the unversioned layout
+MIGRATIONS = {
+    2: "_migrate_blob_keys",
+    3: None,  # per user level ladders
+    4: None,  # milestone crossings
+    5: "_migrate_practice_rates",
+    6: "_migrate_rollups",
+    7: None,  # process watch rules
+    8: "_migrate_integer_seconds",
+    9: "_migrate_sync_stamps",
+    10: "_migrate_recompute_levels",
+}
+
+USERS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id BLOB PRIMARY KEY,
+        username TEXT UNIQUE,
+        seq INTEGER,
+        origin BLOB
+    )
+'''
+
+CONTAINERS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id BLOB PRIMARY KEY,
+        xp_seconds INTEGER NOT NULL DEFAULT 0,
+        level TEXT,
+        name TEXT,
+        user_uuid BLOB,
+        seq INTEGER,
+        origin BLOB,
+        FOREIGN KEY (user_uuid) REFERENCES users(id)
+    )
+'''
+
+# containers as schemas 2 to 7 had them, float hours, for the migrations in between
+CONTAINERS_TABLE_V2 = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id BLOB PRIMARY KEY,
+        xp_level REAL,
+        level TEXT,
+        name TEXT,
+        user_uuid BLOB,
+        FOREIGN KEY (user_uuid) REFERENCES users(id)
+    )
+'''
+
+SESSIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id BLOB PRIMARY KEY,
+        container_id BLOB NOT NULL,
+        start_time REAL,
+        end_time REAL,
+        seconds REAL NOT NULL,
+        source TEXT NOT NULL CHECK (source IN ('manual', 'timer', 'import')),
+        open INTEGER NOT NULL DEFAULT 0,
+        seq INTEGER,
+        origin BLOB,
+        FOREIGN KEY (container_id) REFERENCES containers(id) ON DELETE CASCADE
+    )
+'''
+
+# synced table -> columns whose change counts as a new version of the row,
+# xp totals and levels are derived from sessions and never synced
+SYNCED_COLUMNS = {
+    "users": ("username",),
+    "containers": ("name", "user_uuid"),
+    "sessions": ("container_id", "start_time", "end_time", "seconds", "source", "open"),
+}
+
+# every insert or update of a synced row takes the next change sequence and
+# the origin of whoever wrote it, see _make_sync_triggers. Bulk inserts
+# reserve a range with _reserve_seqs and stamp rows themselves.
+SYNC_STAMP = '''
+    UPDATE sync_clock SET seq = seq + 1;
+    UPDATE {table} SET seq = (SELECT seq FROM sync_clock), origin = (SELECT write_origin FROM sync_clock)
+    WHERE rowid = NEW.rowid;
+'''
+
+SYNC_TOMBSTONE = '''
+    UPDATE sync_clock SET seq = seq + 1;
+    INSERT INTO sync_tombstones (seq, tbl, id, origin) SELECT seq, '{table}', OLD.id, write_origin FROM sync_clock;
+'''
+
+# pragma profiles applied to every pooled connection
+# safe trades speed for durability, fast is meant for scripted bulk logging
+PRAGMA_PROFILES = {
+    "safe": {
+        "synchronous": "FULL",
+        "cache_size": -2000,      # negative means KiB
+        "mmap_size": 0,
+        "busy_timeout": 5000,     # ms
+    },
+    "balanced": {
+        "synchronous": "NORMAL",
+        "cache_size": -8000,
+        "mmap_size": 64 * 1024 * 1024,
+        "busy_timeout": 5000,
+    },
+    "fast": {
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "busy_timeout": 1000,
+    },
+}
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+class ConnectionManager:
+    """
+    Keeps one long-lived connection per thread, opened lazily with WAL
+    journaling and the pragmas of the chosen profile.
+    """
+    def __init__(self, db_path, profile = "balanced", **pragmas):
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown pragma profile: {profile}")
+
+        self.db_path = db_path
+        self.pragmas = {**PRAGMA_PROFILES[profile], **pragmas}
+        if str(self.pragmas["synchronous"]).upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Invalid synchronous mode: {self.pragmas['synchronous']}")
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _connect(self):
+        # check_same_thread is off only so close_all can run from any thread,
+        # each connection is still used by the thread that opened it
+        conn = sql.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sql.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {str(self.pragmas['synchronous']).upper()}")
+        conn.execute(f"PRAGMA cache_size = {int(self.pragmas['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.pragmas['mmap_size'])}")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.pragmas['busy_timeout'])}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def release(self):
+        """
+        Close the calling thread's connection, e.g. when a worker thread exits.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    @property
+    def depth(self):
+        return getattr(self._local, "depth", 0)
+
+    @depth.setter
+    def depth(self, value):
+        self._local.depth = value
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        # other threads notice the closed connection on their next get()
+        self._local = threading.local()
+
 
 class MasteryDB:
     # TODO: scrub data before running sql commands
-    def __init__(self, db_path = ""):
+    def __init__(self, db_path = "", profile = "balanced", **pragmas):
         self.db_path = db_path
+        self.connections = ConnectionManager(db_path, profile, **pragmas)
 
         if os.path.exists(self.db_path):
             self.new_db = False
@@ -19,82 +215,684 @@ class MasteryDB:
     @contextlib.contextmanager
     def get_cursor(self):
         """
-        A context manager to safely open a connection and yield a cursor.
+        A context manager that yields a cursor on this thread's pooled connection.
+        Nested calls share the outer transaction, only the outermost one commits.
         """
-        conn = sql.connect(self.db_path)
-        conn.row_factory = sql.Row
+        conn = self.connections.get()
+        outermost = self.connections.depth == 0
+        self.connections.depth += 1
+        cursor = conn.cursor()
 
         try:
-            cursor = conn.cursor()
             yield cursor
-            conn.commit() # Commit automatically if no errors occur within the 'with' block
+            if outermost:
+                conn.commit() # Commit automatically if no errors occur within the 'with' block
         except Exception:
-            conn.rollback() # Rollback if an error occurs
+            if outermost:
+                conn.rollback() # Rollback if an error occurs
             raise
         finally:
-            conn.close()
+            cursor.close()
+            self.connections.depth -= 1
+
+    def close(self):
+        self.connections.close_all()
 
     def _make_user_table(self):
+        with self.get_cursor() as cursor:
+            cursor.execute(USERS_TABLE.format(name="users"))
+
+    def _make_container_table(self):
+        with self.get_cursor() as cursor:
+            cursor.execute(CONTAINERS_TABLE.format(name="containers"))
+            # every profile load filters on the owner
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_containers_user ON containers(user_uuid, name)")
+
+    def _make_levels_table(self):
         with self.get_cursor() as cursor:
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id TEXT PRIMARY KEY,
-                    username TEXT UNIQUE
+                CREATE TABLE IF NOT EXISTS levels (
+                    user_id BLOB NOT NULL,
+                    position INTEGER NOT NULL,
+                    threshold REAL NOT NULL,
+                    name TEXT NOT NULL,
+                    PRIMARY KEY (user_id, position),
+                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
                 )
             ''')
 
-    def _make_container_table(self):
+    def _make_milestones_table(self):
         with self.get_cursor() as cursor:
-            cursor.execute("PRAGMA foreign_keys = ON;")
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS containers (
-                    id TEXT PRIMARY KEY,
-                    xp_level REAL,
-                    level TEXT,
-                    name TEXT,
-                    user_uuid TEXT,
-                    FOREIGN KEY (user_uuid) REFERENCES users(id)
+                CREATE TABLE IF NOT EXISTS milestones (
+                    container_id BLOB NOT NULL,
+                    hours REAL NOT NULL,
+                    reached_at REAL NOT NULL,
+                    PRIMARY KEY (container_id, hours),
+                    FOREIGN KEY (container_id) REFERENCES containers(id) ON DELETE CASCADE
                 )
             ''')
 
-    def fetch_existing_db_data(self) -> tuple:
-        if not self.new_db:
-            with self.get_cursor() as cursor:
-                cursor.execute("SELECT * FROM users")
-                user_rows = cursor.fetchall()
-                user_rows = [dict(row) for row in user_rows]
+    def _make_goals_table(self):
+        with self.get_cursor() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS goals (
+                    container_id BLOB PRIMARY KEY,
+                    target_hours REAL NOT NULL,
+                    due REAL NOT NULL,
+                    FOREIGN KEY (container_id) REFERENCES containers(id) ON DELETE CASCADE
+                )
+            ''')
 
-                cursor.execute("SELECT * FROM containers")
-                container_rows = cursor.fetchall()
-                container_rows = [dict(row) for row in container_rows]
+    def _make_rates_table(self):
+        """
+        Practice rate per container, an EMA of hours per day that every
+        session write folds into. See PracticeRate.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rates (
+                    container_id BLOB PRIMARY KEY,
+                    ema REAL NOT NULL,
+                    day INTEGER,
+                    day_hours REAL NOT NULL,
+                    FOREIGN KEY (container_id) REFERENCES containers(id) ON DELETE CASCADE
+                )
+            ''')
 
-            if not user_rows:
-                return ()
-            return user_rows, container_rows
+    def _make_rollups_table(self):
+        """
+        Seconds practiced per container per day, week and month. Every session
+        write adds to its three buckets, so a chart reads a few hundred rows
+        no matter how long the ledger gets.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS rollups (
+                    container_id BLOB NOT NULL,
+                    period TEXT NOT NULL CHECK (period IN ('day', 'week', 'month')),
+                    bucket INTEGER NOT NULL,
+                    seconds REAL NOT NULL,
+                    PRIMARY KEY (container_id, period, bucket),
+                    FOREIGN KEY (container_id) REFERENCES containers(id) ON DELETE CASCADE
+                ) WITHOUT ROWID
+            ''')
+
+    def _make_watch_rules_table(self):
+        with self.get_cursor() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS watch_rules (
+                    container_id BLOB NOT NULL,
+                    kind TEXT NOT NULL CHECK (kind IN ('exe', 'cmdline')),
+                    pattern TEXT NOT NULL,
+                    PRIMARY KEY (container_id, kind, pattern),
+                    FOREIGN KEY (container_id) REFERENCES containers(id) ON DELETE CASCADE
+                )
+            ''')
+
+    def _make_sync_tables(self):
+        """
+        Change tracking for delta sync. sync_clock is one row: the last change
+        sequence handed out, this database's origin, and the origin stamped on
+        writes (the local one, except while merging a peer's changes).
+        Deleted rows leave a tombstone, ids a peer knows under another id map
+        through sync_aliases.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_clock (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    seq INTEGER NOT NULL,
+                    local_origin BLOB NOT NULL,
+                    write_origin BLOB NOT NULL
+                )
+            ''')
+            origin = new_key()
+            cursor.execute("INSERT OR IGNORE INTO sync_clock (id, seq, local_origin, write_origin) VALUES (1, 0, ?, ?)", (origin, origin))
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_tombstones (
+                    seq INTEGER PRIMARY KEY,
+                    tbl TEXT NOT NULL,
+                    id BLOB NOT NULL,
+                    origin BLOB NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sync_aliases (
+                    remote BLOB PRIMARY KEY,
+                    local BLOB NOT NULL
+                ) WITHOUT ROWID
+            ''')
+
+    def _make_sync_triggers(self):
+        """
+        Indexes and triggers for the seq and origin columns, made after the
+        migrations since older layouts lack the columns and table rebuilds
+        drop triggers.
+        """
+        with self.get_cursor() as cursor:
+            for table, columns in SYNCED_COLUMNS.items():
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_seq ON {table}(seq)")
+                stamp = SYNC_STAMP.format(table=table)
+                cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_sync_insert AFTER INSERT ON {table} WHEN NEW.seq IS NULL BEGIN {stamp} END")
+                cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_sync_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN {stamp} END")
+
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS containers_sync_delete AFTER DELETE ON containers BEGIN {SYNC_TOMBSTONE.format(table='containers')} END")
+            # sessions going with their container are covered by its tombstone
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS sessions_sync_delete AFTER DELETE ON sessions
+                WHEN EXISTS (SELECT 1 FROM containers WHERE id = OLD.container_id)
+                BEGIN {SYNC_TOMBSTONE.format(table='sessions')} END
+            """)
+
+    def _make_settings_table(self):
+        with self.get_cursor() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+    def _make_session_table(self):
+        """
+        Append-only ledger of practice time. containers.xp_seconds is kept as the
+        running total of this table so startup never has to sum it.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions'")
+            existed = cursor.fetchone() is not None
+
+            cursor.execute(SESSIONS_TABLE.format(name="sessions"))
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_container ON sessions(container_id, start_time)")
+
+            # timer checkpoints, added after the ledger first shipped
+            self._add_column_if_missing(cursor, "sessions", "open", "INTEGER NOT NULL DEFAULT 0")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_open ON sessions(open) WHERE open = 1")
+
+            # only unversioned databases lack the ledger, and those still count float hours
+            if not existed and "xp_level" in self._columns(cursor, "containers"):
+                # seed the ledger with what older databases already hold so the
+                # ledger and the materialized totals agree
+                now = time.time()
+                cursor.execute("SELECT id, xp_level FROM containers WHERE xp_level > 0")
+                seed = [(new_key(), row["id"], None, now, round(row["xp_level"] * 3600), "import") for row in cursor.fetchall()]
+                cursor.executemany("INSERT INTO sessions (id, container_id, start_time, end_time, seconds, source) VALUES (?,?,?,?,?,?)", seed)
+
+    def _columns(self, cursor, table) -> list:
+        cursor.execute(f"PRAGMA table_info({table})")
+        return [row["name"] for row in cursor.fetchall()]
+
+    def _add_column_if_missing(self, cursor, table, column, decl):
+        if column not in self._columns(cursor, table):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    def fetch_existing_db_data(self, user_id = None) -> tuple:
+        if not self.new_db:
+            return self.fetch_user_data(user_id)
         return ()
 
+    def fetch_user_data(self, user_id = None) -> tuple:
+        """
+        Rows for one profile: the given user, else the last one used, else any.
+        Only that user's containers are read, through idx_containers_user.
+        """
+        with self.get_cursor() as cursor:
+            user_row = self.fetch_default_user_db(user_id)
+            if user_row is None:
+                return ()
+
+            cursor.execute("SELECT * FROM containers WHERE user_uuid = ?", (user_row["id"],))
+            container_rows = [dict(row) for row in cursor.fetchall()]
+
+        return [user_row], container_rows
+
+    def iter_container_rows_db(self, user_id):
+        """
+        Stream (id, name, xp_seconds, level) tuples for one user's containers
+        straight off the cursor, no fetchall and no dict per row.
+        """
+        with self.get_cursor() as cursor:
+            cursor.row_factory = None
+            cursor.execute("SELECT id, name, xp_seconds, level FROM containers WHERE user_uuid = ?", (to_key(user_id),))
+            yield from cursor
+
+    def fetch_default_user_db(self, user_id = None):
+        with self.get_cursor() as cursor:
+            if user_id is None:
+                user_id = self.get_setting_db("last_user")
+
+            user_row = None
+            if user_id is not None:
+                cursor.execute("SELECT * FROM users WHERE id = ?", (to_key(user_id),))
+                user_row = cursor.fetchone()
+            if user_row is None:
+                cursor.execute("SELECT * FROM users LIMIT 1")
+                user_row = cursor.fetchone()
+            return dict(user_row) if user_row else None
+
+    def search_users_db(self, prefix = "", limit = 50) -> list:
+        """
+        (id, username) pairs whose username starts with prefix, using the unique index.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT id, username FROM users
+                WHERE username >= ? AND username < ?
+                ORDER BY username LIMIT ?
+            """, (prefix, prefix + "\U0010ffff", limit))
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def fetch_user_by_name_db(self, username):
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def fetch_level_ladder_db(self, user_id) -> LevelLadder:
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT threshold, name FROM levels WHERE user_id = ? ORDER BY position", (to_key(user_id),))
+            rows = cursor.fetchall()
+        if not rows:
+            return DEFAULT_LADDER
+        return LevelLadder([tuple(row) for row in rows])
+
+    def set_level_ladder_db(self, user_id, ladder):
+        """
+        Store a user's ladder and recompute every one of their container levels.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("DELETE FROM levels WHERE user_id = ?", (to_key(user_id),))
+            cursor.executemany("INSERT INTO levels (user_id, position, threshold, name) VALUES (?,?,?,?)",
+                               [(to_key(user_id), position, hours, name) for position, (hours, name) in enumerate(ladder.levels())])
+            self.recompute_levels_db(user_id, ladder)
+
+    def recompute_levels_db(self, user_id, ladder = None) -> int:
+        """
+        Batch recompute of stored levels for one user, for when thresholds
+        change or data is imported. Returns how many rows changed.
+        """
+        if ladder is None:
+            ladder = self.fetch_level_ladder_db(user_id)
+
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT id, xp_seconds, level FROM containers WHERE user_uuid = ?", (to_key(user_id),))
+            rows = cursor.fetchall()
+            levels = ladder.levels_for([row["xp_seconds"] / 3600.0 for row in rows])
+
+            changed = [(level, row["id"]) for row, level in zip(rows, levels) if row["level"] != level]
+            cursor.executemany("UPDATE containers SET level = ? WHERE id = ?", changed)
+            return len(changed)
+
+    def get_setting_db(self, key, default = None):
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            return row["value"] if row else default
+
+    def set_setting_db(self, key, value):
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO settings (key, value) VALUES (?,?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (key, None if value is None else str(value)))
+
+    def fetch_settings_db(self, prefix) -> dict:
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT key, value FROM settings WHERE key >= ? AND key < ?", (prefix, prefix + "\U0010ffff"))
+            return {row["key"]: row["value"] for row in cursor.fetchall()}
+
     def delete_db(self):
+        self.close()
         if os.path.exists(self.db_path):
             os.remove(self.db_path)
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(f"{self.db_path}{suffix}"):
+                    os.remove(f"{self.db_path}{suffix}")
             print(f"{self.db_path} has been deleted.")
         else:
             print(f"{self.db_path} does not exist.")
 
     def insert_user_db(self, id, username):
         with self.get_cursor() as cursor:
-            cursor.execute("INSERT INTO users (id, username) VALUES (?,?)", (id, username))
+            cursor.execute("INSERT INTO users (id, username) VALUES (?,?)", (to_key(id), username))
     
-    def insert_container_db(self, cont_uuid,  name, user_id):
+    def insert_container_db(self, cont_uuid,  name, user_id, level = None):
+        if level is None:
+            level = DEFAULT_LADDER.level_for(0.0)
         with self.get_cursor() as cursor:
-            cursor.execute("INSERT INTO containers (id, xp_level, level, name, user_uuid) VALUES (?,?,?,?,?)", (str(cont_uuid),0, 'Novice', name, user_id))
+            cursor.execute("INSERT INTO containers (id, xp_seconds, level, name, user_uuid) VALUES (?,?,?,?,?)", (to_key(cont_uuid),0, level, name, to_key(user_id)))
 
-    def update_container_db(self, id, xp_level, level):
+    def insert_containers_bulk_db(self, containers, user_id):
+        """
+        containers are (id, name, level) tuples, all starting at 0 hours.
+        """
+        with self.get_cursor() as cursor:
+            seq, origin = self._reserve_seqs(cursor, len(containers))
+            cursor.executemany("INSERT INTO containers (id, xp_seconds, level, name, user_uuid, seq, origin) VALUES (?,0,?,?,?,?,?)",
+                               ((to_key(id), level, name, to_key(user_id), seq + i, origin) for i, (id, name, level) in enumerate(containers)))
+
+    def update_container_db(self, id, xp_seconds, level):
         with self.get_cursor() as cursor:
             cursor.execute("""
                 UPDATE containers
-                SET xp_level = ?, level = ?
+                SET xp_seconds = ?, level = ?
                 WHERE id = ?
-            """, (xp_level, level, id))
+            """, (int(xp_seconds), level, to_key(id)))
+
+    def add_session_db(self, cont_uuid, seconds, level, source = "manual", start = None, end = None):
+        """
+        Record a practice session and add it to the container's running total
+        in the same transaction. seconds are rounded to whole seconds.
+        """
+        seconds = round(seconds)
+        if end is None:
+            end = time.time()
+        if start is None:
+            start = end - seconds
+
+        with self.get_cursor() as cursor:
+            cursor.execute("INSERT INTO sessions (id, container_id, start_time, end_time, seconds, source) VALUES (?,?,?,?,?,?)",
+                           (new_key(), to_key(cont_uuid), start, end, seconds, source))
+            cursor.execute("""
+                UPDATE containers
+                SET xp_seconds = xp_seconds + ?, level = ?
+                WHERE id = ?
+            """, (seconds, level, to_key(cont_uuid)))
+            self._record_practice(cursor, to_key(cont_uuid), seconds, end)
+
+    def add_sessions_db(self, entries, source = "manual", end = None):
+        """
+        Several add_session_db calls in one transaction, either all of them
+        land or none do. entries are (container id, seconds, level).
+        """
+        with self.get_cursor():
+            for cont_uuid, seconds, level in entries:
+                self.add_session_db(cont_uuid, seconds, level, source=source, end=end)
+
+    def add_sessions_bulk_db(self, sessions):
+        """
+        Bulk version of add_session_db for imports. sessions are (id, container
+        key, start, end, seconds, source) tuples, all written in the caller's
+        transaction with one executemany per table. Rollups, levels and
+        practice rates are left to add_rollups_bulk_db, recompute_levels_db
+        and rebuild_rates_db afterwards.
+        """
+        totals = {}
+        for _, cont_key, _, _, seconds, _ in sessions:
+            totals[cont_key] = totals.get(cont_key, 0) + seconds
+
+        with self.get_cursor() as cursor:
+            seq, origin = self._reserve_seqs(cursor, len(sessions))
+            cursor.executemany("INSERT INTO sessions (id, container_id, start_time, end_time, seconds, source, seq, origin) VALUES (?,?,?,?,?,?,?,?)",
+                               ((*session, seq + i, origin) for i, session in enumerate(sessions)))
+            cursor.executemany("UPDATE containers SET xp_seconds = xp_seconds + ? WHERE id = ?",
+                               ((round(seconds), cont_key) for cont_key, seconds in totals.items()))
+
+    def add_rollups_bulk_db(self, totals):
+        """
+        totals is {(container key, period, bucket): seconds}, see add_to_totals.
+        """
+        with self.get_cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO rollups (container_id, period, bucket, seconds) VALUES (?,?,?,?)
+                ON CONFLICT(container_id, period, bucket) DO UPDATE SET seconds = seconds + excluded.seconds
+            """, ((*key, seconds) for key, seconds in totals.items()))
+
+    def rebuild_rates_db(self, cont_keys):
+        """
+        Recompute practice rates for some containers from their daily rollups,
+        for when history was added out of order.
+        """
+        with self.get_cursor() as cursor:
+            for cont_key in cont_keys:
+                cursor.execute("SELECT bucket, seconds FROM rollups WHERE container_id = ? AND period = 'day' ORDER BY bucket",
+                               (to_key(cont_key),))
+                rate = PracticeRate()
+                for day, seconds in cursor.fetchall():
+                    rate.add(seconds / 3600.0, day)
+                cursor.execute("INSERT OR REPLACE INTO rates (container_id, ema, day, day_hours) VALUES (?,?,?,?)",
+                               (to_key(cont_key), *rate.row()))
+
+    def iter_sessions_db(self, user_id):
+        """
+        Stream (container name, start, end, seconds, source) for every session
+        of a user, oldest first per container, straight off the cursor.
+        """
+        with self.get_cursor() as cursor:
+            cursor.row_factory = None
+            cursor.execute("""
+                SELECT containers.name, sessions.start_time, sessions.end_time, sessions.seconds, sessions.source
+                FROM sessions JOIN containers ON containers.id = sessions.container_id
+                WHERE containers.user_uuid = ?
+                ORDER BY containers.name, sessions.start_time
+            """, (to_key(user_id),))
+            yield from cursor
+
+    def open_session_db(self, session_id, cont_uuid, start, source = "timer"):
+        """
+        Start a session that is filled in by checkpoints while the timer runs.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("INSERT INTO sessions (id, container_id, start_time, end_time, seconds, source, open) VALUES (?,?,?,?,?,?,1)",
+                           (to_key(session_id), to_key(cont_uuid), start, start, 0.0, source))
+
+    def checkpoint_session_db(self, session_id, end, seconds, level):
+        """
+        Set an open session's total so far and add only the new part to the
+        container total. Safe to repeat with the same values.
+        """
+        seconds = round(seconds)
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT container_id, seconds FROM sessions WHERE id = ?", (to_key(session_id),))
+            row = cursor.fetchone()
+            if row is None:
+                return
+
+            cursor.execute("UPDATE sessions SET end_time = ?, seconds = ? WHERE id = ?", (end, seconds, to_key(session_id)))
+            delta = seconds - round(row["seconds"])
+            cursor.execute("""
+                UPDATE containers
+                SET xp_seconds = xp_seconds + ?, level = ?
+                WHERE id = ?
+            """, (delta, level, row["container_id"]))
+            self._record_practice(cursor, row["container_id"], delta, end)
+
+    def checkpoint_sessions_db(self, entries):
+        """
+        Checkpoint several running sessions in one transaction.
+        entries are (session id, end, seconds, level).
+        """
+        with self.get_cursor():
+            for session_id, end, seconds, level in entries:
+                self.checkpoint_session_db(session_id, end, seconds, level)
+
+    def close_session_db(self, session_id, end, seconds, level):
+        with self.get_cursor():
+            self.checkpoint_session_db(session_id, end, seconds, level)
+            self.finish_session_db(session_id)
+
+    def finish_session_db(self, session_id):
+        with self.get_cursor() as cursor:
+            cursor.execute("UPDATE sessions SET open = 0 WHERE id = ?", (to_key(session_id),))
+
+    def discard_session_db(self, session_id, level):
+        """
+        Drop a session and take its time back off the container total.
+
+        Rollups and the practice rate get the whole session taken off the
+        day of its last checkpoint. A timer session checkpointed across
+        midnight put part of its time in the earlier day, which stays there,
+        while the later day is clamped at 0. Only crash recovery discards
+        sessions, so this is left as is rather than tracking every
+        checkpoint's bucket.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT container_id, seconds, end_time FROM sessions WHERE id = ?", (to_key(session_id),))
+            row = cursor.fetchone()
+            if row is None:
+                return
+
+            self._record_practice(cursor, row["container_id"], -row["seconds"], row["end_time"])
+            cursor.execute("DELETE FROM sessions WHERE id = ?", (to_key(session_id),))
+            cursor.execute("""
+                UPDATE containers
+                SET xp_seconds = xp_seconds - ?, level = ?
+                WHERE id = ?
+            """, (round(row["seconds"]), level, row["container_id"]))
+
+    def _record_practice(self, cursor, cont_key, seconds, when):
+        """
+        Fold practice time into the derived per container stats, inside the
+        caller's transaction so they never drift from the ledger.
+        """
+        if not seconds:
+            return
+        cursor.executemany("""
+            INSERT INTO rollups (container_id, period, bucket, seconds) VALUES (?,?,?,?)
+            ON CONFLICT(container_id, period, bucket) DO UPDATE SET seconds = max(0, seconds + excluded.seconds)
+        """, [(cont_key, period, bucket_for(period, when), seconds) for period in PERIODS])
+
+        cursor.execute("SELECT ema, day, day_hours FROM rates WHERE container_id = ?", (cont_key,))
+        row = cursor.fetchone()
+        rate = PracticeRate(*row) if row else PracticeRate()
+        rate.add(seconds / 3600.0, day_number(when))
+        cursor.execute("INSERT OR REPLACE INTO rates (container_id, ema, day, day_hours) VALUES (?,?,?,?)",
+                       (cont_key, *rate.row()))
+
+    def fetch_rates_db(self, user_id) -> dict:
+        """
+        name -> PracticeRate for every container of a user that has practice.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT containers.name, rates.ema, rates.day, rates.day_hours
+                FROM rates JOIN containers ON containers.id = rates.container_id
+                WHERE containers.user_uuid = ?
+            """, (to_key(user_id),))
+            return {row[0]: PracticeRate(row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+    def fetch_rollup_db(self, period, first, last, cont_uuid = None, user_id = None) -> array:
+        """
+        Hours per bucket from first to last inclusive, zero filled, for one
+        container or summed over every container of a user.
+        """
+        if cont_uuid is not None:
+            query = """
+                SELECT bucket, seconds FROM rollups
+                WHERE container_id = ? AND period = ? AND bucket BETWEEN ? AND ?
+            """
+            params = (to_key(cont_uuid), period, first, last)
+        else:
+            query = """
+                SELECT bucket, sum(rollups.seconds) FROM rollups
+                JOIN containers ON containers.id = rollups.container_id
+                WHERE containers.user_uuid = ? AND period = ? AND bucket BETWEEN ? AND ?
+                GROUP BY bucket
+            """
+            params = (to_key(user_id), period, first, last)
+
+        hours = array("d", bytes(8 * max(0, last - first + 1)))
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            for bucket, seconds in cursor.fetchall():
+                hours[bucket - first] = seconds / 3600.0
+        return hours
+
+    def fetch_watch_rules_db(self, user_id) -> list:
+        """
+        (container name, kind, pattern) for every process watch rule of a user.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT containers.name, watch_rules.kind, watch_rules.pattern
+                FROM watch_rules JOIN containers ON containers.id = watch_rules.container_id
+                WHERE containers.user_uuid = ?
+                ORDER BY containers.name, watch_rules.kind, watch_rules.pattern
+            """, (to_key(user_id),))
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def set_watch_rules_db(self, user_id, rules):
+        """
+        Replace a user's watch rules with (container name, kind, pattern) triples.
+        Names without a container are skipped.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("DELETE FROM watch_rules WHERE container_id IN (SELECT id FROM containers WHERE user_uuid = ?)", (to_key(user_id),))
+            cursor.executemany("""
+                INSERT OR IGNORE INTO watch_rules (container_id, kind, pattern)
+                SELECT id, ?, ? FROM containers WHERE user_uuid = ? AND name = ?
+            """, [(kind, pattern, to_key(user_id), name) for name, kind, pattern in rules])
+
+    def fetch_goals_db(self, user_id) -> dict:
+        """
+        name -> (target_hours, due) for every container of a user with a goal.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT containers.name, goals.target_hours, goals.due
+                FROM goals JOIN containers ON containers.id = goals.container_id
+                WHERE containers.user_uuid = ?
+            """, (to_key(user_id),))
+            return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    def set_goal_db(self, cont_uuid, target_hours, due):
+        with self.get_cursor() as cursor:
+            cursor.execute("INSERT OR REPLACE INTO goals (container_id, target_hours, due) VALUES (?,?,?)",
+                           (to_key(cont_uuid), target_hours, due))
+
+    def delete_goal_db(self, cont_uuid):
+        with self.get_cursor() as cursor:
+            cursor.execute("DELETE FROM goals WHERE container_id = ?", (to_key(cont_uuid),))
+
+    def fetch_open_sessions_db(self, user_id = None) -> list:
+        query = """
+            SELECT sessions.*, containers.name
+            FROM sessions JOIN containers ON containers.id = sessions.container_id
+            WHERE sessions.open = 1
+        """
+        params = ()
+        if user_id is not None:
+            query += " AND containers.user_uuid = ?"
+            params = (to_key(user_id),)
+
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def fetch_container_by_name_db(self, name, user_id):
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT * FROM containers WHERE user_uuid = ? AND name = ?", (to_key(user_id), name))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def fetch_container_summary_db(self, user_id) -> list:
+        """
+        (name, xp_seconds, level) for every container of a user, without building model objects.
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT name, xp_seconds, level FROM containers WHERE user_uuid = ? ORDER BY name", (to_key(user_id),))
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def record_milestones_db(self, crossings):
+        """
+        crossings are (container key, hours, reached_at). A milestone is only
+        recorded the first time, so losing time and regaining it is harmless.
+        """
+        with self.get_cursor() as cursor:
+            cursor.executemany("INSERT OR IGNORE INTO milestones (container_id, hours, reached_at) VALUES (?,?,?)",
+                               [(to_key(key), hours, reached_at) for key, hours, reached_at in crossings])
+
+    def fetch_milestones_db(self, cont_uuid) -> list:
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT hours, reached_at FROM milestones WHERE container_id = ? ORDER BY hours", (to_key(cont_uuid),))
+            return [tuple(row) for row in cursor.fetchall()]
+
+    def fetch_sessions_db(self, cont_uuid) -> list:
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT * FROM sessions WHERE container_id = ? ORDER BY start_time", (to_key(cont_uuid),))
+            return [dict(row) for row in cursor.fetchall()]
 
     def update_user_db(self, id, name):
         with self.get_cursor() as cursor:
@@ -102,16 +900,395 @@ class MasteryDB:
                 UPDATE users
                 SET username = ?
                 WHERE id = ?
-            """, (name, id))
+            """, (name, to_key(id)))
     
     def delete_container_db(self, id):
         with self.get_cursor() as cursor:
-            cursor.execute("DELETE FROM containers WHERE id = ?", (id,))
+            cursor.execute("DELETE FROM containers WHERE id = ?", (to_key(id),))
 
-    def setup_mastery_db(self) -> tuple:
-        self._make_user_table()
+    # sync: changes are (table, seq, origin, *fields) tuples
+    #   ("users", seq, origin, id, username)
+    #   ("containers", seq, origin, id, user id, name)
+    #   ("sessions", seq, origin, id, container id, start, end, seconds, source)
+    #   ("deleted", seq, origin, table, id)
+    def fetch_sync_clock_db(self) -> tuple:
+        """
+        (this database's origin, last change sequence handed out).
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT local_origin, seq FROM sync_clock")
+            return tuple(cursor.fetchone())
+
+    def reset_sync_origin_db(self) -> bytes:
+        """
+        Give this database a new origin, for when it started as a copy of
+        another one. Rows written so far keep the old origin, which the copy
+        already has.
+        """
+        origin = new_key()
+        with self.get_cursor() as cursor:
+            cursor.execute("UPDATE sync_clock SET local_origin = ?, write_origin = ?", (origin, origin))
+        return origin
+
+    def _reserve_seqs(self, cursor, count) -> tuple:
+        """
+        Take count change sequences at once for rows stamped by the caller,
+        which skips the per row trigger. Returns (first seq, origin).
+        """
+        cursor.execute("UPDATE sync_clock SET seq = seq + ?", (count,))
+        cursor.execute("SELECT seq, write_origin FROM sync_clock")
+        last, origin = cursor.fetchone()
+        return last - count + 1, origin
+
+    def iter_changes_db(self, since = 0, exclude_origin = None):
+        """
+        Stream every change after sequence since, skipping rows last written
+        by exclude_origin (the peer already has those). Each table is read
+        through its seq index, so this costs the number of changes, not the
+        size of the database. Users come first so everything after can refer
+        to them, the rest is in sequence order. Open timer sessions wait
+        until they are closed.
+        """
+        with self.get_cursor() as cursor:
+            def changes(query):
+                read = cursor.connection.cursor()
+                read.row_factory = None
+                read.execute(f"{query} AND (? IS NULL OR origin IS NOT ?) ORDER BY seq", (since, exclude_origin, exclude_origin))
+                return read
+
+            yield from changes("SELECT 'users', seq, origin, id, username FROM users WHERE seq > ?")
+            yield from heapq.merge(
+                changes("SELECT 'containers', seq, origin, id, user_uuid, name FROM containers WHERE seq > ?"),
+                changes("SELECT 'sessions', seq, origin, id, container_id, start_time, end_time, seconds, source FROM sessions WHERE seq > ? AND open = 0"),
+                changes("SELECT 'deleted', seq, origin, tbl, id FROM sync_tombstones WHERE seq > ?"),
+                key=lambda change: change[1],
+            )
+
+    def merge_changes_db(self, changes) -> tuple:
+        """
+        Apply a peer's changes in one transaction. Merging is idempotent:
+        sessions are matched by id and only the difference from what is
+        already here is added to container totals, rollups and rates, so
+        totals are summed from both sides and never overwritten. Users and
+        containers the peer made under a name that exists here become aliases
+        of the local row. Writes are stamped with the origin of the change, so
+        they are not sent back to it. Returns (applied, skipped) counts,
+        skipped being changes that refer to rows this side does not have.
+        """
+        merges = {
+            "users": self._merge_user,
+            "containers": self._merge_container,
+            "sessions": self._merge_session,
+            "deleted": self._merge_deleted,
+        }
+        applied = skipped = 0
+        touched = set()  # containers whose level may have changed
+
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT write_origin FROM sync_clock")
+            current = cursor.fetchone()[0]
+            try:
+                for table, _, origin, *fields in changes:
+                    if origin != current:
+                        cursor.execute("UPDATE sync_clock SET write_origin = ?", (origin,))
+                        current = origin
+
+                    result = merges[table](cursor, touched, *fields)
+                    if result is False:
+                        skipped += 1
+                    elif result:
+                        applied += 1
+            finally:
+                cursor.execute("UPDATE sync_clock SET write_origin = local_origin")
+
+            users = set()
+            for cont_key in touched:
+                cursor.execute("SELECT user_uuid FROM containers WHERE id = ?", (cont_key,))
+                row = cursor.fetchone()
+                if row is not None:
+                    users.add(row[0])
+            for user_id in users:
+                self.recompute_levels_db(user_id)
+        return applied, skipped
+
+    def _sync_local_id(self, cursor, table, remote):
+        cursor.execute(f"SELECT 1 FROM {table} WHERE id = ?", (remote,))
+        if cursor.fetchone() is not None:
+            return remote
+        cursor.execute("SELECT local FROM sync_aliases WHERE remote = ?", (remote,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    # each _merge_* returns True when it wrote something, None when the change
+    # was already here and False when it had to be skipped
+    def _merge_user(self, cursor, touched, user_id, username):
+        local = self._sync_local_id(cursor, "users", user_id)
+        if local is not None:
+            if local != user_id:
+                return None
+            cursor.execute("UPDATE users SET username = ? WHERE id = ? AND username IS NOT ? AND NOT EXISTS (SELECT 1 FROM users WHERE username = ?)",
+                           (username, user_id, username, username))
+            return cursor.rowcount > 0 or None
+
+        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+        row = cursor.fetchone()
+        if row is not None:
+            cursor.execute("INSERT INTO sync_aliases (remote, local) VALUES (?,?)", (user_id, row[0]))
+            return True
+        cursor.execute("INSERT INTO users (id, username) VALUES (?,?)", (user_id, username))
+        return True
+
+    def _merge_container(self, cursor, touched, cont_key, user_id, name):
+        if self._sync_local_id(cursor, "containers", cont_key) is not None:
+            return None
+
+        user = self._sync_local_id(cursor, "users", user_id)
+        if user is None:
+            return False
+
+        cursor.execute("SELECT id FROM containers WHERE user_uuid = ? AND name = ?", (user, name))
+        row = cursor.fetchone()
+        if row is not None:
+            cursor.execute("INSERT INTO sync_aliases (remote, local) VALUES (?,?)", (cont_key, row[0]))
+            return True
+
+        level = self.fetch_level_ladder_db(user).level_for(0.0)
+        cursor.execute("INSERT INTO containers (id, xp_seconds, level, name, user_uuid) VALUES (?,0,?,?,?)", (cont_key, level, name, user))
+        return True
+
+    def _merge_session(self, cursor, touched, session_id, cont_key, start, end, seconds, source):
+        seconds = round(seconds)
+        cursor.execute("SELECT container_id, seconds, open FROM sessions WHERE id = ?", (session_id,))
+        row = cursor.fetchone()
+
+        if row is not None:
+            local = row["container_id"]
+            delta = seconds - round(row["seconds"])
+            if not delta and not row["open"]:
+                return None
+            cursor.execute("UPDATE sessions SET start_time = ?, end_time = ?, seconds = ?, open = 0 WHERE id = ?",
+                           (start, end, seconds, session_id))
+        else:
+            local = self._sync_local_id(cursor, "containers", cont_key)
+            if local is None:
+                return False
+            cursor.execute("INSERT INTO sessions (id, container_id, start_time, end_time, seconds, source) VALUES (?,?,?,?,?,?)",
+                           (session_id, local, start, end, seconds, source))
+            delta = seconds
+
+        cursor.execute("UPDATE containers SET xp_seconds = xp_seconds + ? WHERE id = ?", (delta, local))
+        if end is not None:
+            self._record_practice(cursor, local, delta, end)
+        touched.add(local)
+        return True
+
+    def _merge_deleted(self, cursor, touched, table, item_id):
+        if table == "containers":
+            local = self._sync_local_id(cursor, "containers", item_id)
+            if local is None:
+                return None
+            cursor.execute("DELETE FROM sync_aliases WHERE local = ?", (local,))
+            cursor.execute("DELETE FROM containers WHERE id = ?", (local,))
+            return True
+
+        if table == "sessions":
+            cursor.execute("SELECT container_id, seconds, end_time FROM sessions WHERE id = ?", (item_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            if row["end_time"] is not None:
+                self._record_practice(cursor, row["container_id"], -row["seconds"], row["end_time"])
+            cursor.execute("DELETE FROM sessions WHERE id = ?", (item_id,))
+            cursor.execute("UPDATE containers SET xp_seconds = xp_seconds - ? WHERE id = ?", (round(row["seconds"]), row["container_id"]))
+            touched.add(row["container_id"])
+            return True
+        return False
+
+    def ensure_schema(self):
+        """
+        Create missing tables and run pending migrations in one transaction.
+        The layout version lives in PRAGMA user_version, so an up to date
+        database costs a single header read.
+        """
+        conn = self.connections.get()
+        if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+            return
+
+        # table rebuilds need foreign keys off, which only works outside a transaction
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            with self.get_cursor() as cursor:
+                # take the write lock first so two processes never migrate at once
+                cursor.execute("BEGIN IMMEDIATE")
+
+                version = cursor.execute("PRAGMA user_version").fetchone()[0]
+                if version == SCHEMA_VERSION:
+                    return
+                if version > SCHEMA_VERSION:
+                    raise RuntimeError(f"{self.db_path} uses schema {version}, newer than this app ({SCHEMA_VERSION})")
+
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'")
+                fresh = cursor.fetchone() is None
+
+                self._make_user_table()
+                self._make_container_table()
+                self._make_session_table()
+                self._make_settings_table()
+                self._make_levels_table()
+                self._make_milestones_table()
+                self._make_goals_table()
+                self._make_rates_table()
+                self._make_rollups_table()
+                self._make_watch_rules_table()
+                self._make_sync_tables()
+
+                # a fresh database is created in the latest layout already
+                if not fresh:
+                    for target in range(max(version, 1) + 1, SCHEMA_VERSION + 1):
+                        if MIGRATIONS[target]:
+                            getattr(self, MIGRATIONS[target])(cursor)
+
+                    cursor.execute("PRAGMA foreign_key_check")
+                    if cursor.fetchone() is not None:
+                        raise sql.IntegrityError("Migration left rows with dangling foreign keys")
+
+                self._make_sync_triggers()
+                cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+
+    def _migrate_blob_keys(self, cursor):
+        """
+        Schema 2: ids move from 36 char TEXT uuids to 16 byte BLOBs, which
+        roughly halves the primary key and user_uuid indexes. Tables are rebuilt
+        so the declared column types match.
+        """
+        cursor.execute(USERS_TABLE.format(name="users_new"))
+        cursor.execute(CONTAINERS_TABLE_V2.format(name="containers_new"))
+        cursor.execute(SESSIONS_TABLE.format(name="sessions_new"))
+
+        read = cursor.connection.cursor()
+        read.row_factory = None
+
+        read.execute("SELECT id, username FROM users")
+        cursor.executemany("INSERT INTO users_new (id, username) VALUES (?,?)",
+                           ((legacy_key(id), username) for id, username in read))
+
+        read.execute("SELECT id, xp_level, level, name, user_uuid FROM containers")
+        cursor.executemany("INSERT INTO containers_new (id, xp_level, level, name, user_uuid) VALUES (?,?,?,?,?)",
+                           ((legacy_key(id), xp, level, name, legacy_key(user) if user is not None else None)
+                            for id, xp, level, name, user in read))
+
+        read.execute("SELECT id, container_id, start_time, end_time, seconds, source, open FROM sessions")
+        cursor.executemany("INSERT INTO sessions_new (id, container_id, start_time, end_time, seconds, source, open) VALUES (?,?,?,?,?,?,?)",
+                           ((legacy_key(id), legacy_key(cont), *rest) for id, cont, *rest in read))
+        read.close()
+
+        for table in ("sessions", "containers", "users"):
+            cursor.execute(f"DROP TABLE {table}")
+        for table in ("users", "containers", "sessions"):
+            cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+        # the indexes went with the old tables
+        self._make_container_table()
+        self._make_session_table()
+
+        # settings refer to users by uuid string, keep them pointing at the same rows
+        last_user = self.get_setting_db("last_user")
+        if last_user is not None:
+            self.set_setting_db("last_user", str(uuid.UUID(bytes=legacy_key(last_user))))
+
+    def _migrate_practice_rates(self, cursor):
+        """
+        Schema 5: practice rates. Replay the existing ledger once, oldest
+        first, so goals have a forecast from day one. Seeded import sessions
+        carry no real dates and are left out.
+        """
+        read = cursor.connection.cursor()
+        read.row_factory = None
+        read.execute("""
+            SELECT container_id, seconds, end_time FROM sessions
+            WHERE source != 'import' AND end_time IS NOT NULL
+            ORDER BY container_id, end_time
+        """)
+
+        rates = {}
+        for cont_key, seconds, end in read:
+            rates.setdefault(cont_key, PracticeRate()).add(seconds / 3600.0, day_number(end))
+
+        cursor.executemany("INSERT OR REPLACE INTO rates (container_id, ema, day, day_hours) VALUES (?,?,?,?)",
+                           ((cont_key, *rate.row()) for cont_key, rate in rates.items()))
+
+    def _migrate_rollups(self, cursor):
+        """
+        Schema 6: rollups. Built from the ledger once, like the practice rates.
+        """
+        read = cursor.connection.cursor()
+        read.row_factory = None
+        read.execute("SELECT container_id, seconds, end_time FROM sessions WHERE source != 'import' AND end_time IS NOT NULL")
+
+        totals = {}
+        for cont_key, seconds, end in read:
+            add_to_totals(totals, cont_key, seconds, end)
+
+        cursor.execute("DELETE FROM rollups")
+        self.add_rollups_bulk_db(totals)
+
+    def _migrate_integer_seconds(self, cursor):
+        """
+        Schema 8: container totals move from REAL hours to INTEGER seconds so
+        adding time is exact. Rounded once here, never again after.
+        """
+        cursor.execute(CONTAINERS_TABLE.format(name="containers_new"))
+        cursor.execute("""
+            INSERT INTO containers_new (id, xp_seconds, level, name, user_uuid)
+            SELECT id, CAST(round(coalesce(xp_level, 0) * 3600) AS INTEGER), level, name, user_uuid FROM containers
+        """)
+        cursor.execute("DROP TABLE containers")
+        cursor.execute("ALTER TABLE containers_new RENAME TO containers")
         self._make_container_table()
+
+    def _migrate_sync_stamps(self, cursor):
+        """
+        Schema 9: change sequence and origin on synced rows. Existing rows are
+        stamped in rowid order as local changes, so a first sync sends everything.
+        """
+        cursor.execute("SELECT local_origin FROM sync_clock")
+        origin = cursor.fetchone()[0]
+
+        seq = 0
+        for table in SYNCED_COLUMNS:
+            self._add_column_if_missing(cursor, table, "seq", "INTEGER")
+            self._add_column_if_missing(cursor, table, "origin", "BLOB")
+            cursor.execute(f"UPDATE {table} SET seq = ? + rowid, origin = ?", (seq, origin))
+            cursor.execute(f"SELECT coalesce(max(rowid), 0) FROM {table}")
+            seq += cursor.fetchone()[0]
+        cursor.execute("UPDATE sync_clock SET seq = ?", (seq,))
+
+    def _migrate_recompute_levels(self, cursor):
+        """
+        Schema 10: stored levels were never recomputed when the default ladder
+        replaced the old match chain (0h was written as 'Novice'), so bars from
+        before then disagree with new ones. Recompute them once per user.
+        """
+        cursor.execute("SELECT id FROM users")
+        for user_id in [row[0] for row in cursor.fetchall()]:
+            self.recompute_levels_db(user_id)
+
+    def setup_mastery_db(self, user_id = None) -> tuple:
+        self.ensure_schema()
         if self.new_db:
             return ()
         else:
-            return self.fetch_existing_db_data()
+            return self.fetch_existing_db_data(user_id)
+
+
+def legacy_key(value) -> bytes:
+    """
+    Key for an id written before schema 2. Ids that are not uuids (hand made
+    rows, tests) map to a stable uuid5 so every reference to them still matches.
+    """
+    try:
+        return to_key(value)
+    except ValueError:
+        return uuid.uuid5(uuid.NAMESPACE_OID, str(value)).bytes
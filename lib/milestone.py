@@ -1,8 +1,84 @@
+import bisect
+import math
+import time
+
+# hours → message, on top of one every `interval` hours
+DEFAULT_MILESTONES = {
+    10.0: "10 hours in, the habit is forming",
+    100.0: "100 hours, past the beginner stage",
+}
 
 
 class Milestone:
-    def __init__(self):
-        self.interval = 1000 # hours
-        self.milestones = {}
+    def __init__(self, milestones = None, interval = 1000):
+        self.interval = interval # hours
+        self.milestones = dict(DEFAULT_MILESTONES if milestones is None else milestones)
+        self._sorted = sorted(self.milestones)
         # if milestones empty, then use interval with default hurray 
 
+    def message(self, hours):
+        return self.milestones.get(hours, f"{hours:g} hours, hurray!")
+
+    def next_after(self, hours):
+        """
+        The first milestone strictly above hours.
+        """
+        i = bisect.bisect_right(self._sorted, hours)
+        explicit = self._sorted[i] if i < len(self._sorted) else math.inf
+        if not self.interval:
+            return explicit
+        step = (math.floor(hours / self.interval) + 1) * self.interval
+        return min(explicit, float(step))
+
+    def crossed(self, start, hours) -> list:
+        """
+        Every milestone in [start, hours], start being a milestone itself.
+        """
+        reached = []
+        threshold = start
+        while threshold <= hours:
+            reached.append(threshold)
+            threshold = self.next_after(threshold)
+        return reached
+
+
+class MilestoneTracker:
+    """
+    Caches the next milestone for every container it has seen, so checking a
+    timer tick is one float compare no matter how many milestones or
+    containers there are. Crossings queue up in pending until the UI drains
+    them, so several at once become one notification and one db write.
+    """
+    def __init__(self, milestone = None):
+        self.milestone = milestone or Milestone()
+        self.next_due = {}  # container name -> next milestone in hours
+        self.pending = []   # (name, container key, hours, reached_at)
+
+    def check(self, name, key, before, after) -> bool:
+        """
+        Call after a container's hours went from before to after.
+        Returns True when at least one milestone was crossed.
+        """
+        due = self.next_due.get(name)
+        if due is None:
+            due = self.milestone.next_after(before)
+
+        if after < due:
+            if after < before:
+                # time was taken away, the next milestone may be lower now
+                due = self.milestone.next_after(after)
+            self.next_due[name] = due
+            return False
+
+        now = time.time()
+        for hours in self.milestone.crossed(due, after):
+            self.pending.append((name, key, hours, now))
+        self.next_due[name] = self.milestone.next_after(after)
+        return True
+
+    def forget(self, name):
+        self.next_due.pop(name, None)
+
+    def drain(self) -> list:
+        pending, self.pending = self.pending, []
+        return pending
@@ -0,0 +1,54 @@
+import bisect
+
+
+class PrefixIndex:
+    """
+    Sorted, case-insensitive index of container names for type-ahead lookups.
+    Adds and removes are a bisect plus a list insert, searches are a bisect
+    plus a walk over the matches.
+    """
+    def __init__(self, names = ()):
+        self._keys = sorted((name.casefold(), name) for name in names)
+        self.version = 0  # bumped whenever the set of names changes
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, name):
+        key = (name.casefold(), name)
+        i = bisect.bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    def add(self, name):
+        key = (name.casefold(), name)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return
+        self._keys.insert(i, key)
+        self.version += 1
+
+    def remove(self, name):
+        key = (name.casefold(), name)
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+            self.version += 1
+
+    def search(self, prefix, limit = 50) -> list:
+        """
+        Names starting with prefix (ignoring case) in sorted order, at most limit of them.
+        """
+        folded = prefix.casefold()
+        # (folded,) sorts before every (folded, name) tuple
+        i = bisect.bisect_left(self._keys, (folded,))
+        matches = []
+        while i < len(self._keys) and len(matches) < limit:
+            key, name = self._keys[i]
+            if not key.startswith(folded):
+                break
+            matches.append(name)
+            i += 1
+        return matches
+
+    def first(self):
+        return self._keys[0][1] if self._keys else None
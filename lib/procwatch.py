@@ -0,0 +1,161 @@
+# watch /proc for programs that should be timed against a container (Linux only)
+import os
+import re
+
+KINDS = ("exe", "cmdline")
+
+# seconds between scans, stretched while nothing changes
+MIN_INTERVAL = 2.0
+MAX_INTERVAL = 15.0
+BACKOFF = 1.5
+
+
+class WatchRule:
+    """
+    exe rules match the program name exactly (comm or the basename of
+    argv[0]), cmdline rules are a regex searched in the full command line.
+    """
+    __slots__ = ("container", "kind", "pattern", "_regex")
+
+    def __init__(self, container, kind, pattern):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown rule kind {kind!r}, expected one of {', '.join(KINDS)}")
+        if not container or not pattern:
+            raise ValueError("A rule needs a container and a pattern")
+        self.container = container
+        self.kind = kind
+        self.pattern = pattern
+        # raises re.error for a bad pattern
+        self._regex = re.compile(pattern) if kind == "cmdline" else None
+
+    def matches(self, comm, argv) -> bool:
+        if self.kind == "exe":
+            return self.pattern == comm or (bool(argv) and self.pattern == os.path.basename(argv[0]))
+        return self._regex.search(" ".join(argv)) is not None
+
+    def __eq__(self, other):
+        return isinstance(other, WatchRule) and (self.container, self.kind, self.pattern) == (other.container, other.kind, other.pattern)
+
+    def __hash__(self):
+        return hash((self.container, self.kind, self.pattern))
+
+
+class ProcWatcher:
+    """
+    Tracks which containers have a matching process running. Each scan lists
+    the pid directories and diffs them against the previous scan; a pid that
+    matched is never read again, only new pids and ones that matched nothing
+    (they may have exec'd since) get their comm and cmdline read.
+    The interval backs off while nothing changes and snaps back on activity.
+
+    proc_root can point at a fake tree of <pid>/comm and <pid>/cmdline files.
+    """
+    def __init__(self, rules = (), proc_root = "/proc", min_interval = MIN_INTERVAL, max_interval = MAX_INTERVAL):
+        self.proc_root = proc_root
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.rules = []
+        self.pids = {}      # pid -> tuple of container names it matched
+        self.running = {}   # container name -> number of matching pids
+        self.set_rules(rules)
+
+    @staticmethod
+    def available(proc_root = "/proc") -> bool:
+        return os.path.isdir(proc_root)
+
+    def set_rules(self, rules):
+        """
+        New rules need every process matched again, so the next scan starts over.
+        """
+        self.rules = list(rules)
+        self.pids = {}
+        self.running = {}
+        self.interval = self.min_interval
+
+    def active(self) -> set:
+        return set(self.running)
+
+    def scan(self) -> tuple:
+        """
+        Returns (started, stopped): container names that gained their first
+        matching process or lost their last one since the previous scan.
+        """
+        before = set(self.running)
+
+        try:
+            with os.scandir(self.proc_root) as entries:
+                current = {entry.name for entry in entries if entry.name.isdigit()}
+        except OSError:
+            current = set()
+
+        for pid in self.pids.keys() - current:
+            for name in self.pids.pop(pid):
+                self.running[name] -= 1
+                if not self.running[name]:
+                    del self.running[name]
+
+        if self.rules:
+            for pid in current:
+                # a pid keeps its match until it exits, one that matched
+                # nothing is read again since an exec may have changed it
+                if self.pids.get(pid):
+                    continue
+                names = self.match(pid)
+                self.pids[pid] = names
+                for name in names:
+                    self.running[name] = self.running.get(name, 0) + 1
+        else:
+            # nothing to match, only remember the pids so they are not read later
+            self.pids.update(dict.fromkeys(current - self.pids.keys(), ()))
+
+        after = set(self.running)
+        started, stopped = after - before, before - after
+
+        if started or stopped:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * BACKOFF)
+        return started, stopped
+
+    def match(self, pid) -> tuple:
+        comm, argv = self.read_process(pid)
+        if comm is None:
+            return ()
+        return tuple({rule.container for rule in self.rules if rule.matches(comm, argv)})
+
+    def read_process(self, pid):
+        base = os.path.join(self.proc_root, pid)
+        try:
+            with open(os.path.join(base, "comm"), "rb") as f:
+                comm = f.read().decode(errors="replace").strip()
+            with open(os.path.join(base, "cmdline"), "rb") as f:
+                argv = [arg.decode(errors="replace") for arg in f.read().split(b"\0") if arg]
+        except OSError:
+            # gone already or not ours to read
+            return None, []
+        return comm, argv
+
+
+def parse_rules(text) -> list:
+    """
+    'container | kind | pattern' lines → WatchRules. Raises ValueError with the line number.
+    """
+    rules = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        parts = [part.strip() for part in line.split("|", 2)]
+        try:
+            if len(parts) != 3:
+                raise ValueError("expected 'container | exe or cmdline | pattern'")
+            rules.append(WatchRule(*parts))
+        except (ValueError, re.error) as e:
+            raise ValueError(f"Line {number}: {e}") from None
+    return rules
+
+
+def format_rules(rules) -> str:
+    return "\n".join(f"{rule.container} | {rule.kind} | {rule.pattern}" for rule in rules)
@@ -0,0 +1,53 @@
+# practice totals per container per day, week and month, kept next to the
+# session ledger so charts never have to scan it
+import datetime
+
+PERIODS = ("day", "week", "month")
+
+
+def bucket_for(period, timestamp) -> int:
+    """
+    Bucket number of a unix timestamp: days and weeks (starting Monday)
+    count from the proleptic ordinal, months count from year 0.
+    """
+    date = datetime.date.fromtimestamp(timestamp)
+    return date_bucket(period, date)
+
+
+def date_bucket(period, date) -> int:
+    if period == "day":
+        return date.toordinal()
+    if period == "week":
+        # ordinal 1 is a Monday
+        return (date.toordinal() - 1) // 7
+    if period == "month":
+        return date.year * 12 + date.month - 1
+    raise ValueError(f"Unknown period {period!r}")
+
+
+def add_to_totals(totals, cont_key, seconds, when):
+    """
+    Sum seconds into a {(container key, period, bucket): seconds} dict, for
+    writing many sessions' rollups in one go.
+    """
+    date = datetime.date.fromtimestamp(when)
+    for period in PERIODS:
+        key = (cont_key, period, date_bucket(period, date))
+        totals[key] = totals.get(key, 0.0) + seconds
+
+
+def bucket_start(period, bucket) -> datetime.date:
+    if period == "day":
+        return datetime.date.fromordinal(bucket)
+    if period == "week":
+        return datetime.date.fromordinal(bucket * 7 + 1)
+    if period == "month":
+        return datetime.date(bucket // 12, bucket % 12 + 1, 1)
+    raise ValueError(f"Unknown period {period!r}")
+
+
+def bucket_label(period, bucket) -> str:
+    start = bucket_start(period, bucket)
+    if period == "month":
+        return start.strftime("%b %Y")
+    return start.strftime("%b %d")
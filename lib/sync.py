@@ -0,0 +1,188 @@
+# delta sync between two copies of the app, over a file or a pipe
+#
+# A change file is JSONL: a header line, then one line per changed row in
+# the order MasteryDB.iter_changes_db gives them. The header says who wrote
+# it (origin), up to which change (seq), and which changes of other origins
+# the writer had merged (seen). Merging a file records the writer's seq as
+# seen, and the writer's seen entry for us as acked, so the next export to
+# that peer starts after what it is known to have. Merges are idempotent,
+# so sending something twice is always safe.
+import json
+
+from mastery_app.lib.keys import to_key, from_key
+from mastery_app.lib.transfer import SOURCES, chunked
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 5000
+
+# record fields after table, seq and origin, per table
+FIELDS = {
+    "users": ("id", "username"),
+    "containers": ("id", "user", "name"),
+    "sessions": ("id", "container", "start", "end", "seconds", "source"),
+    "deleted": ("kind", "id"),
+}
+KEY_FIELDS = {"id", "user", "container"}
+DELETABLE = ("containers", "sessions")
+
+
+# ===============================================================
+# Peers
+# ===============================================================
+def peers(db) -> dict:
+    """
+    origin uuid string -> {"seen": their last change merged here, "acked": our last change they merged}
+    """
+    known = {}
+    for key, value in db.fetch_settings_db("sync_").items():
+        kind, _, origin = key.partition(":")
+        if kind in ("sync_seen", "sync_acked") and origin:
+            known.setdefault(origin, {"seen": 0, "acked": 0})[kind[5:]] = int(value)
+    return known
+
+
+def pick_peer(db, peer = None):
+    """
+    The peer an export is meant for: the one named (a uuid or a unique
+    prefix), else the only known one, else None for a first sync.
+    """
+    known = peers(db)
+    if peer is None:
+        if len(known) > 1:
+            raise ValueError("Several peers are known, pick one with --peer: " + ", ".join(sorted(known)))
+        return next(iter(known), None)
+
+    matches = [origin for origin in known if origin.startswith(peer)]
+    if len(matches) == 1:
+        return matches[0]
+    if len(matches) > 1:
+        raise ValueError(f"Peer '{peer}' is ambiguous: " + ", ".join(sorted(matches)))
+    try:
+        # a peer never synced with yet, known by its full origin
+        return str(from_key(peer))
+    except ValueError:
+        raise ValueError(f"Unknown peer '{peer}'") from None
+
+
+def raise_setting(db, key, value):
+    # watermarks only move forward, old files merged late must not move them back
+    current = db.get_setting_db(key)
+    if current is None or int(current) < value:
+        db.set_setting_db(key, value)
+
+
+# ===============================================================
+# Writing
+# ===============================================================
+def encode(change) -> dict:
+    table, seq, origin, *fields = change
+    record = {"table": table, "seq": seq, "origin": str(from_key(origin))}
+    for field, value in zip(FIELDS[table], fields):
+        record[field] = str(from_key(value)) if field in KEY_FIELDS and value is not None else value
+    return record
+
+
+def write_changes(db, out, peer = None, full = False) -> int:
+    """
+    Write every change the peer does not have yet. full starts from the
+    beginning instead of the last acknowledged change. Returns the number of
+    changes written.
+    """
+    origin, seq = db.fetch_sync_clock_db()
+    peer = pick_peer(db, peer)
+    known = peers(db)
+
+    since = 0 if full or peer is None else known.get(peer, {}).get("acked", 0)
+    header = {
+        "sync": FORMAT_VERSION,
+        "origin": str(from_key(origin)),
+        "seq": seq,
+        "since": since,
+        "seen": {other: marks["seen"] for other, marks in known.items() if marks["seen"]},
+    }
+    out.write(json.dumps(header) + "\n")
+
+    count = 0
+    for change in db.iter_changes_db(since, to_key(peer) if peer else None):
+        out.write(json.dumps(encode(change)) + "\n")
+        count += 1
+    return count
+
+
+# ===============================================================
+# Reading
+# ===============================================================
+def decode(record) -> tuple:
+    table = record["table"]
+    if table not in FIELDS:
+        raise ValueError(f"unknown table {table!r}")
+
+    fields = []
+    for field in FIELDS[table]:
+        value = record[field]
+        if field in KEY_FIELDS:
+            value = to_key(value)
+        fields.append(value)
+
+    if table == "sessions":
+        if not isinstance(fields[4], (int, float)) or fields[4] < 0:
+            raise ValueError("seconds must be a number of at least 0")
+        if fields[5] not in SOURCES:
+            raise ValueError(f"unknown source {fields[5]!r}")
+    elif table == "deleted" and fields[0] not in DELETABLE:
+        raise ValueError(f"cannot delete from {fields[0]!r}")
+    return (table, int(record["seq"]), to_key(record["origin"]), *fields)
+
+
+def read_header(line) -> dict:
+    try:
+        header = json.loads(line)
+        if header.get("sync") != FORMAT_VERSION:
+            raise ValueError
+        header["origin"] = str(from_key(header["origin"]))
+        header["seq"] = int(header["seq"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        raise ValueError(f"Not a version {FORMAT_VERSION} change file") from None
+    return header
+
+
+def read_changes(lines):
+    """
+    Decoded changes after the header line, raises ValueError naming the first bad line.
+    """
+    for number, line in enumerate(lines, start=2):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield decode(json.loads(line))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Line {number}: {e}") from None
+
+
+def merge_changes(db, lines, chunk_size = CHUNK_SIZE) -> tuple:
+    """
+    Merge a change file, each chunk of changes in its own transaction.
+    Watermarks move only once the whole file is in. Returns (peer origin,
+    applied, skipped).
+    """
+    lines = iter(lines)
+    header = read_header(next(lines, ""))
+    local = str(from_key(db.fetch_sync_clock_db()[0]))
+    if header["origin"] == local:
+        raise ValueError("This file came from this database or a copy of it. "
+                         "If the two started as copies, run 'sync reset-origin' on one of them first.")
+
+    applied = skipped = 0
+    for chunk in chunked(read_changes(lines), chunk_size):
+        done, missed = db.merge_changes_db(chunk)
+        applied += done
+        skipped += missed
+
+    peer = header["origin"]
+    with db.get_cursor():
+        raise_setting(db, f"sync_seen:{peer}", header["seq"])
+        acked = header.get("seen", {}).get(local)
+        if acked is not None:
+            raise_setting(db, f"sync_acked:{peer}", int(acked))
+    return peer, applied, skipped
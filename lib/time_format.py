@@ -0,0 +1,38 @@
+# hours.minutes parsing and formatting shared by the gui and the cli
+# xp is kept in whole seconds, hours only exist on the way in and out
+
+
+def parse_seconds(text):
+    """
+    Parse user input like '4000.45' meaning 4000 hours + 45 minutes.
+    Returns whole seconds, exact for hours.minutes input.
+    """
+    try:
+        if "." not in text:
+            # Whole number → pure hours
+            return round(float(text) * 3600)
+
+        hours_str, mins_str = text.split(".", 1)
+
+        hours = int(hours_str)
+        minutes = int(mins_str)
+
+        # Clamp minutes 0–59 (normalize overflow)
+        if minutes >= 60:
+            hours += minutes // 60
+            minutes = minutes % 60
+
+        return hours * 3600 + minutes * 60
+
+    except Exception:
+        raise ValueError("Invalid hours.minutes format")
+
+
+def format_seconds(seconds):
+    """
+    Whole seconds → "1.75h (1h 45m)", the minutes cut from the integer so
+    they never round up to a wrong hour.
+    """
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{seconds / 3600.0:.2f}h ({hours}h {rest // 60}m)"
+
@@ -0,0 +1,149 @@
+# any number of concurrent timers driven by one scheduler, no threads
+import heapq
+import itertools
+import time
+
+from mastery_app.lib.keys import new_key
+
+TICK_INTERVAL = 1.0         # seconds between display updates
+CHECKPOINT_INTERVAL = 30.0  # seconds between saves, at most this much is lost on a crash
+
+
+class RunningTimer:
+    __slots__ = ("name", "key", "session_id", "start_time", "start_mono", "applied", "saved")
+
+    def __init__(self, name, key, start_time, start_mono):
+        self.name = name
+        self.key = key                  # container key
+        self.session_id = new_key()
+        self.start_time = start_time    # wall clock, for the session row
+        self.start_mono = start_mono    # elapsed time only ever comes from here
+        self.applied = 0                # whole seconds already added to the container
+        self.saved = 0                  # whole seconds in the last checkpoint
+
+    def elapsed(self, now) -> float:
+        return now - self.start_mono
+
+
+class TimerEngine:
+    """
+    Runs every active timer off one heap of due events. The tick event
+    updates all timers at once and the checkpoint event saves all of them in
+    one batch, so N timers cost one wakeup, not N. The owner asks
+    next_delay() when to call run_due() again, which keeps the engine free of
+    any GUI toolkit.
+
+    on_update(updates) gets [(timer, new whole seconds)] after every tick,
+    the fraction carries over to the next one so nothing is lost to rounding.
+    on_checkpoint(timers) gets every timer whose elapsed time should be saved.
+    """
+    def __init__(self, on_update, on_checkpoint, tick_interval = TICK_INTERVAL,
+                 checkpoint_interval = CHECKPOINT_INTERVAL, clock = time.monotonic, wall = time.time):
+        self.on_update = on_update
+        self.on_checkpoint = on_checkpoint
+        self.tick_interval = tick_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.clock = clock
+        self.wall = wall
+
+        self.timers = {}        # container name -> RunningTimer
+        self.events = []        # heap of (due, seq, kind)
+        self.scheduled = set()  # kinds currently in the heap
+        self.seq = itertools.count()
+        self.paused = False
+
+    def __contains__(self, name):
+        return name in self.timers
+
+    def __len__(self):
+        return len(self.timers)
+
+    # ===============================================================
+    # Timers
+    # ===============================================================
+    def start(self, name, key) -> RunningTimer:
+        if name in self.timers:
+            return self.timers[name]
+
+        timer = RunningTimer(name, key, self.wall(), self.clock())
+        self.timers[name] = timer
+
+        # the grid starts with the first timer, later ones join the same wakeups
+        now = self.clock()
+        if not self.paused:
+            self.schedule("tick", now + self.tick_interval)
+        self.schedule("checkpoint", now + self.checkpoint_interval)
+        return timer
+
+    def stop(self, name):
+        """
+        Apply a timer's last seconds and drop it. Returns the timer, whose
+        elapsed time the caller saves as the session's final value.
+        """
+        timer = self.timers.pop(name, None)
+        if timer is None:
+            return None
+
+        self.update([timer], self.clock())
+        if not self.timers:
+            self.events.clear()
+            self.scheduled.clear()
+        return timer
+
+    def set_paused(self, paused):
+        """
+        While paused (window minimized) only checkpoints wake the engine up.
+        """
+        self.paused = paused
+        if not paused and self.timers:
+            self.run_kind("tick", self.clock())
+
+    # ===============================================================
+    # Scheduling
+    # ===============================================================
+    def schedule(self, kind, due):
+        if kind in self.scheduled:
+            return
+        self.scheduled.add(kind)
+        heapq.heappush(self.events, (due, next(self.seq), kind))
+
+    def next_delay(self):
+        """
+        Seconds until run_due() has work, None when nothing is scheduled.
+        """
+        if not self.events:
+            return None
+        return max(0.0, self.events[0][0] - self.clock())
+
+    def run_due(self):
+        now = self.clock()
+        while self.events and self.events[0][0] <= now:
+            due, _, kind = heapq.heappop(self.events)
+            self.scheduled.discard(kind)
+            self.run_kind(kind, now, due)
+
+    def run_kind(self, kind, now, due = None):
+        if kind == "tick":
+            self.update(self.timers.values(), now)
+            if self.timers and not self.paused:
+                # stay on the grid, skipping ticks missed while busy
+                due = now if due is None else due
+                self.schedule("tick", due + self.tick_interval * (int((now - due) / self.tick_interval) + 1))
+        elif kind == "checkpoint":
+            self.update(self.timers.values(), now)
+            timers = [timer for timer in self.timers.values() if timer.applied != timer.saved]
+            if timers:
+                self.on_checkpoint(timers)
+                for timer in timers:
+                    timer.saved = timer.applied
+            if self.timers:
+                self.schedule("checkpoint", (due or now) + self.checkpoint_interval)
+
+    def update(self, timers, now):
+        updates = []
+        for timer in timers:
+            elapsed = int(timer.elapsed(now))
+            updates.append((timer, elapsed - timer.applied))
+            timer.applied = elapsed
+        if updates:
+            self.on_update(updates)
@@ -0,0 +1,155 @@
+# streaming import and export of practice history as CSV or JSONL
+#
+# one record per session: container, hours, start, end, source
+# start and end are unix timestamps or ISO dates and may be empty, source
+# defaults to "import". Records go through generators end to end, so memory
+# stays flat no matter how long the file is.
+import csv
+import datetime
+import itertools
+import json
+
+from mastery_app.lib.keys import new_key, new_keys
+from mastery_app.lib.rollups import add_to_totals
+
+FIELDS = ("container", "hours", "start", "end", "source")
+SOURCES = ("manual", "timer", "import")
+CHUNK_SIZE = 10000
+
+
+def format_for(path) -> str:
+    return "jsonl" if str(path).endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+
+# ===============================================================
+# Reading
+# ===============================================================
+def read_csv(lines):
+    yield from csv.DictReader(lines)
+
+
+def read_jsonl(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def parse_time(value):
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(str(value)).timestamp()
+
+
+def parse_records(rows):
+    """
+    Validate raw rows into (name, start, end, seconds, source) tuples.
+    Raises ValueError naming the record number of the first bad one.
+    """
+    for number, row in enumerate(rows, start=1):
+        try:
+            name = str(row["container"]).strip()
+            if not name:
+                raise ValueError("empty container name")
+            seconds = round(float(row["hours"]) * 3600)
+            if seconds < 0:
+                raise ValueError("negative hours")
+            start = parse_time(row.get("start"))
+            end = parse_time(row.get("end"))
+            source = row.get("source") or "import"
+            if source not in SOURCES:
+                raise ValueError(f"unknown source {source!r}")
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Record {number}: {e}") from None
+
+        if end is None and start is not None:
+            end = start + seconds
+        yield name, start, end, seconds, source
+
+
+def chunked(iterable, size = CHUNK_SIZE):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def import_records(db, user_id, records, chunk_size = CHUNK_SIZE) -> int:
+    """
+    Write parsed records for one user, creating missing containers. Each chunk
+    is one transaction of executemany calls; container names resolve through
+    one dict loaded up front. Rollups are summed in memory (they grow with the
+    span of history, not the number of records) and written once at the end,
+    along with a single recompute of levels and practice rates. Returns the
+    number of sessions imported.
+    """
+    ladder = db.fetch_level_ladder_db(user_id)
+    first_level = ladder.level_for(0.0)
+    ids = {name: cont_key for cont_key, name, _, _ in db.iter_container_rows_db(user_id)}
+    rollups = {}
+
+    count = 0
+    try:
+        for chunk in chunked(records, chunk_size):
+            sessions = []
+            new_containers = []
+            for session_id, (name, start, end, seconds, source) in zip(new_keys(len(chunk)), chunk):
+                cont_key = ids.get(name)
+                if cont_key is None:
+                    cont_key = ids[name] = new_key()
+                    new_containers.append((cont_key, name, first_level))
+                sessions.append((session_id, cont_key, start, end, seconds, source))
+
+            with db.get_cursor():
+                db.insert_containers_bulk_db(new_containers, user_id)
+                db.add_sessions_bulk_db(sessions)
+            count += len(sessions)
+
+            for _, cont_key, _, end, seconds, _ in sessions:
+                if end is not None:
+                    add_to_totals(rollups, cont_key, seconds, end)
+    finally:
+        # a bad record stops the import, but what was committed stays consistent
+        with db.get_cursor():
+            db.add_rollups_bulk_db(rollups)
+            db.rebuild_rates_db({cont_key for cont_key, _, _ in rollups})
+            db.recompute_levels_db(user_id, ladder)
+    return count
+
+
+def import_file(db, user_id, lines, fmt = "csv", chunk_size = CHUNK_SIZE) -> int:
+    rows = read_jsonl(lines) if fmt == "jsonl" else read_csv(lines)
+    return import_records(db, user_id, parse_records(rows), chunk_size)
+
+
+# ===============================================================
+# Writing
+# ===============================================================
+def export_records(db, user_id):
+    for name, start, end, seconds, source in db.iter_sessions_db(user_id):
+        yield {"container": name, "hours": seconds / 3600.0, "start": start, "end": end, "source": source}
+
+
+def write_csv(records, out) -> int:
+    writer = csv.DictWriter(out, fieldnames=FIELDS)
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def write_jsonl(records, out) -> int:
+    count = 0
+    for record in records:
+        out.write(json.dumps(record) + "\n")
+        count += 1
+    return count
+
+
+def export_file(db, user_id, out, fmt = "csv") -> int:
+    records = export_records(db, user_id)
+    return write_jsonl(records, out) if fmt == "jsonl" else write_csv(records, out)
@@ -1,5 +1,9 @@
 from mastery_app.lib.mastery_container import MasteryContainer, make_new_container 
 from mastery_app.lib.mastery_db import MasteryDB
+from mastery_app.lib.prefix_index import PrefixIndex
+from mastery_app.lib.lazy_containers import LazyContainers
+from mastery_app.lib.keys import from_key
+from mastery_app.lib.levels import DEFAULT_LADDER
 import uuid
 from pathlib import Path
 
@@ -7,21 +11,28 @@ SCRIPT_DIR = Path(__file__).resolve().parent
 DB_PATH = SCRIPT_DIR / ".." / "db" / "my_database.db"
 
 class User:
-    def __init__(self, username, user_uuid = None, containers: dict[str, MasteryContainer] = {}, db = MasteryDB(DB_PATH)):
+    def __init__(self, username, user_uuid = None, containers: dict[str, MasteryContainer] | None = None, db = None, ladder = DEFAULT_LADDER):
         self.uuid = user_uuid
         self.username = username
-        self.containers: dict[str, MasteryContainer] = containers
-        self.db = db
+        # fresh dict per user, a shared default would leak containers between profiles
+        self.containers: dict[str, MasteryContainer] = containers if containers is not None else {}
+        # opened lazily so importing this module never creates a database file
+        self.db = db if db is not None else MasteryDB(DB_PATH)
+        self.index = PrefixIndex(self.containers)  # name lookups for the pickers
+        self.ladder = ladder
 
         if not self.uuid:
             self.uuid = uuid.uuid4()
+        else:
+            self.uuid = from_key(self.uuid)
 
     def new_container(self, name: str):
-        new_container = make_new_container(name=name)
+        new_container = make_new_container(name=name, ladder=self.ladder)
         if name in self.containers:
             print("XP Container already exists")
             return None
         self.containers[name] = new_container
+        self.index.add(name)
         return new_container
 
     def delete_container(self, name):
@@ -30,25 +41,70 @@ class User:
             return -1
         else:
             del self.containers[name]
+            self.index.remove(name)
             return 0
 
     def update_username(self, name):
         self.username = name
 
+    def set_ladder(self, ladder):
+        """
+        Use new level thresholds, recomputing every container's level in one batch.
+        """
+        self.ladder = ladder
+        xp_seconds = self.xp_seconds()
+        levels = dict(zip(xp_seconds, ladder.levels_for([seconds / 3600.0 for seconds in xp_seconds.values()])))
+
+        if isinstance(self.containers, LazyContainers):
+            self.containers.set_ladder(ladder, levels)
+            return
+
+        for name, container in self.containers.items():
+            container.ladder = ladder
+            container.level = levels[name]
+            container.version += 1
+
+    def xp_seconds(self) -> dict[str, int]:
+        # lazy profiles can answer this without building any containers
+        if isinstance(self.containers, LazyContainers):
+            return {name: self.containers.xp_seconds(name) for name in self.containers}
+        return {name: container.xp_seconds for name, container in self.containers.items()}
+
 def add_container_db(cont_uuid, user, name, db):
-    db.insert_container_db(cont_uuid, name, str(user.uuid))
+    db.insert_container_db(cont_uuid, name, user.uuid, user.ladder.level_for(0.0))
 
 def make_new_user(name, db) -> User:
-    new_user = User(username=name)
-    db.insert_user_db(str(new_user.uuid), name)
+    new_user = User(username=name, db=db)
+    db.insert_user_db(new_user.uuid, name)
     return new_user
 
 def make_user_from_db(user_rows, container_rows, db):
-    # just support one user right now
-    user = User(user_uuid=user_rows[0]["id"], username=user_rows[0]["username"], db=db)
-
+    # rows come from MasteryDB.fetch_user_data, one user and only their containers
+    ladder = db.fetch_level_ladder_db(user_rows[0]["id"])
+    containers = {}
     for cont in container_rows:
-        temp_container = MasteryContainer(name=cont['name'], cont_uuid=cont['id'], xp_level=cont['xp_level'], level=cont['level'])
-        user.containers[cont['name']] = temp_container
-    
+        temp_container = MasteryContainer(name=cont['name'], cont_uuid=cont['id'], xp_seconds=cont['xp_seconds'], level=cont['level'], ladder=ladder)
+        containers[cont['name']] = temp_container
+
+    user = User(user_uuid=user_rows[0]["id"], username=user_rows[0]["username"], containers=containers, db=db, ladder=ladder)
     return user
+
+def make_lazy_user_from_db(user_row, db):
+    ladder = db.fetch_level_ladder_db(user_row["id"])
+    containers = LazyContainers(db.iter_container_rows_db(user_row["id"]), ladder)
+    return User(user_uuid=user_row["id"], username=user_row["username"], containers=containers, db=db, ladder=ladder)
+
+def load_user(db, user_id = None, lazy = False) -> User | None:
+    """
+    Build one profile from the db, None if there are no users yet.
+    With lazy, containers are only built when first looked up.
+    """
+    if lazy:
+        user_row = db.fetch_default_user_db(user_id)
+        return make_lazy_user_from_db(user_row, db) if user_row else None
+
+    db_data = db.fetch_user_data(user_id)
+    if not db_data:
+        return None
+    user_rows, container_rows = db_data
+    return make_user_from_db(user_rows, container_rows, db)
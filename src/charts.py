@@ -0,0 +1,79 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from ..lib.rollups import PERIODS, bucket_for, bucket_label
+
+# buckets shown per period, years of months still only means 60 rows
+SPANS = {
+    "day": 30,
+    "week": 52,
+    "month": 60,
+}
+
+
+class PracticeChart(ttk.Frame):
+    """
+    Bar chart of hours per day, week or month drawn on a Canvas. The data
+    comes from fetch(period, first, last), which returns one value per bucket,
+    so the chart never sees individual sessions.
+    """
+    PAD = 30
+
+    def __init__(self, parent, fetch, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.fetch = fetch
+        self.values = ()
+        self.first = 0
+
+        controls = ttk.Frame(self)
+        controls.pack(fill="x")
+
+        self.period = tk.StringVar(value="week")
+        for period in PERIODS:
+            ttk.Radiobutton(controls, text=period.title(), value=period,
+                            variable=self.period, command=self.reload).pack(side="left", padx=5)
+
+        self.total_label = ttk.Label(controls, text="")
+        self.total_label.pack(side="right", padx=5)
+
+        self.canvas = tk.Canvas(self, height=220, background="white", highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda e: self.draw())
+
+    def reload(self):
+        period = self.period.get()
+        last = bucket_for(period, time.time())
+        self.first = last - SPANS[period] + 1
+        self.values = self.fetch(period, self.first, last)
+        self.total_label.config(text=f"{sum(self.values):.1f} h shown")
+        self.draw()
+
+    def draw(self):
+        self.canvas.delete("all")
+        if not self.values:
+            return
+
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        pad = self.PAD
+        peak = max(self.values) or 1.0
+
+        slot = (width - 2 * pad) / len(self.values)
+        base = height - pad
+        scale = (height - 2 * pad) / peak
+
+        self.canvas.create_line(pad, base, width - pad, base)
+        self.canvas.create_text(pad, pad / 2, text=f"{peak:.1f} h", anchor="w")
+
+        # about six labels whatever the span
+        label_every = max(1, len(self.values) // 6)
+        period = self.period.get()
+
+        for i, hours in enumerate(self.values):
+            x = pad + i * slot
+            if hours > 0:
+                self.canvas.create_rectangle(x + 1, base - hours * scale, x + slot - 1, base,
+                                             fill="#4a90d9", outline="")
+            if i % label_every == 0:
+                self.canvas.create_text(x, base + 4, text=bucket_label(period, self.first + i), anchor="nw")
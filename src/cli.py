@@ -0,0 +1,421 @@
+"""
+Headless command line for logging XP without loading tkinter or the full user.
+
+    python3 -m mastery_app.src.cli log Piano 1.30
+    python3 -m mastery_app.src.cli list
+    python3 -m mastery_app.src.cli show Piano
+    python3 -m mastery_app.src.cli start Piano
+    python3 -m mastery_app.src.cli stop
+    python3 -m mastery_app.src.cli batch today.txt
+    python3 -m mastery_app.src.cli import old_tracker.csv
+    python3 -m mastery_app.src.cli export history.jsonl
+    python3 -m mastery_app.src.cli sync export - | ssh desktop python3 -m mastery_app.src.cli sync import -
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DB_PATH = SCRIPT_DIR / ".." / "db" / "mastery.db"
+
+
+def open_db(path, **pragmas):
+    # imported here so --help and argument errors never touch sqlite
+    from ..lib.mastery_db import MasteryDB
+
+    db = MasteryDB(path, **pragmas)
+    db.ensure_schema()
+    return db
+
+
+def next_level(row, seconds, ladder):
+    from ..lib.mastery_container import MasteryContainer
+
+    container = MasteryContainer(name=row["name"], cont_uuid=row["id"], xp_seconds=row["xp_seconds"], level=row["level"], ladder=ladder)
+    container.update_xp_seconds(seconds)
+    return container
+
+
+def find_user(db, username):
+    """
+    The named user, or the last one used by the app when no name is given.
+    """
+    if username:
+        user = db.fetch_user_by_name_db(username)
+        if user is None:
+            print(f"User '{username}' does not exist")
+        return user
+
+    user = db.fetch_default_user_db()
+    if user is None:
+        print("No user in database, start the app once first")
+    return user
+
+
+def log_time(db, username, name, seconds, source, start = None, end = None, create = False):
+    """
+    Add seconds to a container in a single transaction. Returns the container or None.
+    """
+    with db.get_cursor():
+        user = find_user(db, username)
+        if user is None:
+            return None
+
+        row = db.fetch_container_by_name_db(name, user["id"])
+        if row is None and create:
+            import uuid
+
+            ladder = db.fetch_level_ladder_db(user["id"])
+            db.insert_container_db(uuid.uuid4(), name, user["id"], ladder.level_for(0.0))
+            row = db.fetch_container_by_name_db(name, user["id"])
+
+        if row is None:
+            print(f"XP container '{name}' does not exist")
+            return None
+
+        container = next_level(row, seconds, db.fetch_level_ladder_db(user["id"]))
+        db.add_session_db(row["id"], seconds, container.level, source=source, start=start, end=end)
+        return container
+
+
+# ===============================================================
+# Commands
+# ===============================================================
+def cmd_log(args):
+    from ..lib.time_format import parse_seconds, format_seconds
+
+    try:
+        seconds = parse_seconds(args.value)
+    except ValueError:
+        print("Invalid number format")
+        return 1
+
+    # Clamp to 0–10,000 hours increment, same as the app
+    seconds = max(0, min(10000 * 3600, seconds))
+
+    container = log_time(open_db(args.db), args.user, args.name, seconds, "manual", create=args.create)
+    if container is None:
+        return 1
+    print(f"{args.name}: {format_seconds(container.xp_seconds)} {container.level}")
+    return 0
+
+
+def cmd_batch(args):
+    from ..lib.batch import parse_batch
+    from ..lib.time_format import format_seconds
+
+    text = sys.stdin.read() if args.file == "-" else Path(args.file).read_text()
+
+    db = open_db(args.db)
+    with db.get_cursor():
+        user = find_user(db, args.user)
+        if user is None:
+            return 1
+
+        try:
+            entries = parse_batch(text)
+        except ValueError as e:
+            print(e)
+            return 1
+
+        # check every name before writing anything
+        rows = {}
+        for name, _ in entries:
+            if name not in rows:
+                rows[name] = db.fetch_container_by_name_db(name, user["id"])
+        missing = [name for name, row in rows.items() if row is None]
+        if missing:
+            print("XP containers do not exist: " + ", ".join(missing))
+            return 1
+
+        ladder = db.fetch_level_ladder_db(user["id"])
+        containers = {name: next_level(row, 0, ladder) for name, row in rows.items()}
+
+        sessions = []
+        for name, seconds in entries:
+            container = containers[name]
+            container.update_xp_seconds(seconds)
+            sessions.append((container.key, seconds, container.level))
+        db.add_sessions_db(sessions, source="manual")
+
+    for name, container in containers.items():
+        print(f"{name}: {format_seconds(container.xp_seconds)} {container.level}")
+    return 0
+
+
+def cmd_list(args):
+    from ..lib.time_format import format_seconds
+
+    db = open_db(args.db)
+    user = find_user(db, args.user)
+    if user is None:
+        return 1
+
+    for name, xp_seconds, level in db.fetch_container_summary_db(user["id"]):
+        print(f"{name:<20} {format_seconds(xp_seconds):<22} {level}")
+    return 0
+
+
+def cmd_show(args):
+    from ..lib.time_format import format_seconds
+
+    db = open_db(args.db)
+    user = find_user(db, args.user)
+    if user is None:
+        return 1
+
+    row = db.fetch_container_by_name_db(args.name, user["id"])
+    if row is None:
+        print(f"XP container '{args.name}' does not exist")
+        return 1
+
+    print(f"{row['name']}: {format_seconds(row['xp_seconds'])} {row['level']}")
+    sessions = db.fetch_sessions_db(row["id"])
+    for session in sessions[-args.sessions:] if args.sessions else []:
+        if session["end_time"] is None:
+            # sessions imported without dates have no end, localtime(None) would print now
+            ended = "-"
+        else:
+            ended = time.strftime("%Y-%m-%d %H:%M", time.localtime(session["end_time"]))
+        print(f"  {ended:<16}  {format_seconds(session['seconds']):<22} {session['source']}")
+    return 0
+
+
+def state_path(args):
+    return Path(args.state) if args.state else Path(args.db).with_name("cli_timer.json")
+
+
+def cmd_start(args):
+    import json
+
+    path = state_path(args)
+    if path.exists():
+        state = json.loads(path.read_text())
+        print(f"Timer already running for '{state['name']}'")
+        return 1
+
+    db = open_db(args.db)
+    user = find_user(db, args.user)
+    if user is None:
+        return 1
+
+    if db.fetch_container_by_name_db(args.name, user["id"]) is None:
+        print(f"XP container '{args.name}' does not exist")
+        return 1
+
+    path.write_text(json.dumps({"name": args.name, "user": user["username"], "start": time.time()}))
+    print(f"Timer started for '{args.name}'")
+    return 0
+
+
+def cmd_stop(args):
+    import json
+    from ..lib.time_format import format_seconds
+
+    path = state_path(args)
+    if not path.exists():
+        print("No timer running")
+        return 1
+
+    state = json.loads(path.read_text())
+    end = time.time()
+    seconds = round(max(0.0, end - state["start"]))
+
+    container = log_time(open_db(args.db), state.get("user"), state["name"], seconds, "timer", start=state["start"], end=end)
+    if container is None:
+        return 1
+    path.unlink()
+    print(f"{state['name']}: +{format_seconds(seconds)} → {format_seconds(container.xp_seconds)} {container.level}")
+    return 0
+
+
+def cmd_status(args):
+    import json
+    from ..lib.time_format import format_seconds
+
+    path = state_path(args)
+    if not path.exists():
+        print("No timer running")
+        return 0
+
+    state = json.loads(path.read_text())
+    print(f"{state['name']}: running for {format_seconds(round(time.time() - state['start']))}")
+    return 0
+
+
+def cmd_levels(args):
+    from ..lib.levels import parse_levels, format_levels
+
+    db = open_db(args.db)
+    user = find_user(db, args.user)
+    if user is None:
+        return 1
+
+    if args.set:
+        text = sys.stdin.read() if args.set == "-" else Path(args.set).read_text()
+        try:
+            ladder = parse_levels(text)
+        except ValueError as e:
+            print(e)
+            return 1
+        db.set_level_ladder_db(user["id"], ladder)
+
+    print(format_levels(db.fetch_level_ladder_db(user["id"])))
+    return 0
+
+
+def cmd_import(args):
+    from ..lib.transfer import import_file, format_for
+
+    # sessions ids are random, a bigger page cache keeps the index inserts in memory
+    db = open_db(args.db, cache_size=-64000)
+    user = find_user(db, args.user)
+    if user is None:
+        return 1
+
+    fmt = args.format or format_for(args.file)
+    start = time.perf_counter()
+    try:
+        if args.file == "-":
+            count = import_file(db, user["id"], sys.stdin, fmt)
+        else:
+            with open(args.file, newline="", encoding="utf-8") as lines:
+                count = import_file(db, user["id"], lines, fmt)
+    except ValueError as e:
+        # chunks before the bad record are already committed
+        print(e)
+        return 1
+
+    print(f"Imported {count} sessions in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def cmd_export(args):
+    from ..lib.transfer import export_file, format_for
+
+    db = open_db(args.db)
+    user = find_user(db, args.user)
+    if user is None:
+        return 1
+
+    fmt = args.format or format_for(args.file)
+    if args.file == "-":
+        export_file(db, user["id"], sys.stdout, fmt)
+    else:
+        with open(args.file, "w", newline="", encoding="utf-8") as out:
+            count = export_file(db, user["id"], out, fmt)
+        print(f"Exported {count} sessions")
+    return 0
+
+
+def cmd_sync(args):
+    from ..lib.keys import from_key
+    from ..lib import sync
+
+    db = open_db(args.db)
+
+    if args.action == "status":
+        origin, seq = db.fetch_sync_clock_db()
+        print(f"origin {from_key(origin)} at change {seq}")
+        for peer, marks in sorted(sync.peers(db).items()):
+            print(f"peer   {peer} seen up to {marks['seen']}, has ours up to {marks['acked']}")
+        return 0
+
+    if args.action == "reset-origin":
+        print(f"origin {from_key(db.reset_sync_origin_db())}")
+        return 0
+
+    try:
+        if args.action == "export":
+            if args.file == "-":
+                sync.write_changes(db, sys.stdout, args.peer, args.full)
+            else:
+                with open(args.file, "w", encoding="utf-8") as out:
+                    count = sync.write_changes(db, out, args.peer, args.full)
+                print(f"Exported {count} changes")
+            return 0
+
+        if args.file == "-":
+            peer, applied, skipped = sync.merge_changes(db, sys.stdin)
+        else:
+            with open(args.file, encoding="utf-8") as lines:
+                peer, applied, skipped = sync.merge_changes(db, lines)
+    except ValueError as e:
+        # merged chunks stay, importing the same file again is safe
+        print(e)
+        return 1
+
+    print(f"Merged {applied} changes from {peer}" + (f", skipped {skipped} for rows this side does not have" if skipped else ""))
+    return 0
+
+
+def cmd_users(args):
+    for _, username in open_db(args.db).search_users_db(limit=-1):
+        print(username)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="mastery", description="Log XP without the GUI")
+    parser.add_argument("--db", default=str(DB_PATH), help="path to mastery.db")
+    parser.add_argument("--state", default=None, help="timer state file (default: next to the db)")
+    parser.add_argument("--user", default=None, help="username (default: last one used)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    log = commands.add_parser("log", help="add hh.mm of XP to a container")
+    log.add_argument("name")
+    log.add_argument("value", help="hours.minutes, e.g. 1.30")
+    log.add_argument("--create", action="store_true", help="create the container if missing")
+    log.set_defaults(func=cmd_log)
+
+    batch = commands.add_parser("batch", help="apply many 'name hh.mm' lines in one go")
+    batch.add_argument("file", help="path, - for stdin")
+    batch.set_defaults(func=cmd_batch)
+
+    commands.add_parser("list", help="list containers").set_defaults(func=cmd_list)
+
+    show = commands.add_parser("show", help="show one container")
+    show.add_argument("name")
+    show.add_argument("--sessions", type=int, default=10, help="recent sessions to show")
+    show.set_defaults(func=cmd_show)
+
+    start = commands.add_parser("start", help="start a timer for a container")
+    start.add_argument("name")
+    start.set_defaults(func=cmd_start)
+
+    commands.add_parser("stop", help="stop the timer and log its time").set_defaults(func=cmd_stop)
+    commands.add_parser("status", help="show the running timer").set_defaults(func=cmd_status)
+    commands.add_parser("users", help="list users").set_defaults(func=cmd_users)
+
+    levels = commands.add_parser("levels", help="show or set the level thresholds")
+    levels.add_argument("--set", metavar="FILE", help="'hours name' lines to use, - for stdin")
+    levels.set_defaults(func=cmd_levels)
+
+    for name, func, help in (("import", cmd_import, "import sessions from CSV or JSONL"),
+                             ("export", cmd_export, "export sessions as CSV or JSONL")):
+        transfer = commands.add_parser(name, help=help)
+        transfer.add_argument("file", help="path, - for stdin/stdout")
+        transfer.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file extension")
+        transfer.set_defaults(func=func)
+
+    sync = commands.add_parser("sync", help="exchange changes with another copy of the database")
+    actions = sync.add_subparsers(dest="action", required=True)
+    sync_export = actions.add_parser("export", help="write the changes a peer does not have yet")
+    sync_export.add_argument("file", help="path, - for stdout")
+    sync_export.add_argument("--peer", help="origin (or its prefix) of the peer, see 'sync status'")
+    sync_export.add_argument("--full", action="store_true", help="send everything, not just what the peer lacks")
+    actions.add_parser("import", help="merge a peer's changes").add_argument("file", help="path, - for stdin")
+    actions.add_parser("status", help="show this database's origin and known peers")
+    actions.add_parser("reset-origin", help="new origin for a database that started as a copy")
+    sync.set_defaults(func=cmd_sync)
+    return parser
+
+
+def main(argv = None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,52 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
 import time
-from ..lib.user import User, make_new_user, make_user_from_db, add_container_db
+from ..lib.user import User, make_new_user, make_user_from_db, add_container_db, load_user
 from ..lib.mastery_container import MasteryContainer
 from ..lib.mastery_db import MasteryDB
+from ..lib.db_writer import DBWriter
+from ..lib.time_format import parse_seconds, format_seconds
+from ..lib.keys import from_key
+from ..lib.timer_engine import TimerEngine, CHECKPOINT_INTERVAL
+from ..lib.levels import parse_levels, format_levels
+from ..lib.milestone import MilestoneTracker
+from ..lib.batch import parse_batch
+from ..lib.procwatch import ProcWatcher, WatchRule, parse_rules, format_rules
+from ..lib.goals import PracticeRate, day_number, forecast, parse_due_date, format_date
+from .progress_list import ProgressList
+from .picker import ContainerPicker
+from .charts import PracticeChart
+from .heatmap import CalendarHeatmap, TileCache
 
 
 class App:
-    def __init__(self, root, db, user = None):
+    def __init__(self, root, db, user = None, writer = None, checkpoint_interval = CHECKPOINT_INTERVAL):
         if user is None:
             user = make_new_user("Default", db)
+        if writer is None:
+            writer = DBWriter(db)
 
         self.root = root
         self.root.title("Mastery Tracker")
 
-        self.progress_values = {} 
-        self.timer_running = False
-        self.timer_start_time = None
+        self.picker_version = None
+        self.timers = TimerEngine(self.apply_timer_updates, self.checkpoint_timers, checkpoint_interval=checkpoint_interval)
+        self.timer_after_id = None
+        self.timer_label_text = None
+        self.auto_timers = set()  # started by the process watcher, which may stop them again
+        self.watcher = ProcWatcher() if ProcWatcher.available() else None
+        self.watch_after_id = None
+        self.milestones = MilestoneTracker()
+        self.milestone_after_id = None
+        self.tile_cache = TileCache()  # heatmap month tiles, kept across History popups
+        self.practice_version = 0
         self.user = user
         self.db = db
+        self.writer = writer  # all writes from the UI go through the background writer
         self.max_hours = 10000.0
+        self.max_seconds = 10000 * 3600
 
-        for key,val in user.containers.items():
-            self.progress_values[key] = val.xp_level
+        self.load_goals()
 
         # Build UI
         self.create_user_section()
@@ -31,168 +54,58 @@ class App:
         self.create_timer_section()
         self.create_add_bar_section()
         self.create_delete_bar_section()
+        self.create_goal_section()
         self.create_progress_section()
 
+        self.writer.set_setting_db("last_user", str(self.user.uuid))
+        self.recover_open_sessions()
         self.refresh_ui()
+        self.load_watch_rules()
+
+        # the timer only redraws while the window is visible
+        self.root.bind("<Map>", self.on_map_change, add="+")
+        self.root.bind("<Unmap>", self.on_map_change, add="+")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     # ===============================================================
     # Dynamic Progress Bars
     # ===============================================================
 
     def create_progress_section(self):
-        # Frame for all progress bars
+        # Frame for all progress bars, only the visible rows have widgets
         self.progress_frame = ttk.LabelFrame(self.root, text="Progress Bars")
-        self.progress_frame.pack(fill="x", padx=10, pady=10)
-
-        # Store widgets for each bar
-        self.bar_widgets = {}
-
-        # Clear dropdown menus so we can repopulate them
-        manual_menu = self.update_bar_dropdown["menu"]
-        manual_menu.delete(0, "end")
-
-        timer_menu = self.timer_target_dropdown["menu"]
-        timer_menu.delete(0, "end")
-
-        for key, val in self.progress_values.items():
-
-            # Row frame for each progress bar
-            row = ttk.Frame(self.progress_frame)
-            row.pack(fill="x", pady=5)
-
-            # Label with bar name
-            name_label = ttk.Label(row, text=key, width=15)
-            name_label.pack(side="left")
+        self.progress_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
-            # Progress bar widget
-            bar = ttk.Progressbar(row, maximum=10000.0)
-            bar.pack(side="left", fill="x", expand=True)
-
-            # Clamp value 0–100 (or higher if you use hour/min conversion)
-            normalized = max(0.0, min(100.0, float(val)))
-            bar["value"] = normalized * 100  # multiplied by 100 for precision
-
-            level_text = self.user.containers[key].level if key in self.user.containers else "Novice"
-            level_label = ttk.Label(row, text=level_text, width=12)
-            level_label.pack(side="left", padx=5)
-
-            # Value label showing hours/minutes/float
-            value_label = ttk.Label(row, text=f"{val:.2f}")
-            value_label.pack(side="right", padx=5)
-
-            # Save widgets for later updates
-            self.bar_widgets[key] = {
-                "frame": row,
-                "label": name_label,
-                "bar": bar,
-                "value_label": value_label,
-                "level_label": level_label,
-            }
-
-            # Add to manual dropdown
-            manual_menu.add_command(
-                label=key, command=lambda v=key: self.selected_bar.set(v)
-            )
-
-            # Add to timer dropdown
-            timer_menu.add_command(
-                label=key, command=lambda v=key: self.timer_target.set(v)
-            )
-
-            # Default timer target if none selected
-            if not self.timer_target.get():
-                self.timer_target.set(key)
-            
-        # === Delete bar dropdown ===
-        delete_menu = self.delete_bar_dropdown["menu"]
-        delete_menu.delete(0, "end")
-
-        for key in self.progress_values.keys():
-            delete_menu.add_command(
-                label=key,
-                command=lambda v=key: self.delete_bar_var.set(v)
-            )
-
-        # Set default if none
-        if not self.delete_bar_var.get() and self.progress_values:
-            first = list(self.progress_values.keys())[0]
-            self.delete_bar_var.set(first)
+        self.progress_list = ProgressList(self.progress_frame, self.describe_bar)
+        self.progress_list.pack(fill="both", expand=True)
+        self.progress_list.set_names(self.user.containers)
 
+        self.sync_pickers()
 
+    def describe_bar(self, name):
+        # the container is the only copy of the total, the bar just reads it
+        container = self.user.containers[name]
+        seconds = min(self.max_seconds, max(0, container.xp_seconds))
+        return seconds / 3600.0, self.format_seconds(seconds), container.level, container.version
 
     def add_progress_bar(self, name):
-        if name in self.progress_values:
+        if name in self.user.containers:
             print("Bar already exists.")
             return
 
-        # Initialize value
-        self.progress_values[name] = 0.0
-
-        # === Match layout of create_progress_section ===
-        row = ttk.Frame(self.progress_frame)
-        row.pack(fill="x", pady=5)
-
-        # Name label (left)
-        name_label = ttk.Label(row, text=name, width=15)
-        name_label.pack(side="left")
-
-        # Progress bar (middle)
-        bar = ttk.Progressbar(row, maximum=10000.0)
-        bar.pack(side="left", fill="x", expand=True)
-
-        level_lbl = ttk.Label(row, text="Novice", width=12)
-        level_lbl.pack(side="left", padx=5)
-
-        # Value label (right)
-        value_label = ttk.Label(row, text="0h 0m")
-        value_label.pack(side="right", padx=5)
-
-        # Store widgets
-        self.bar_widgets[name] = {
-            "frame": row,
-            "label": name_label,
-            "bar": bar,
-            "value_label": value_label,
-            "level_label": level_lbl,
-        }
-
-        # Add to dropdowns
-        manual_menu = self.update_bar_dropdown["menu"]
-        manual_menu.add_command(
-            label=name, command=lambda v=name: self.selected_bar.set(v)
-        )
-
-        timer_menu = self.timer_target_dropdown["menu"]
-        timer_menu.add_command(
-            label=name, command=lambda v=name: self.timer_target.set(v)
-        )
-
-        # Default timer target if none set
-        if not self.timer_target.get():
-            self.timer_target.set(name)
-
         # Add to user model
         container : MasteryContainer | None = self.user.new_container(name)
         if container:
-            add_container_db(container.uuid, self.user, name, self.db)
+            add_container_db(container.key, self.user, name, self.writer)
+
+        self.progress_list.set_names(self.user.containers)
 
         # Refresh UI
         self.refresh_ui()
 
 
-    def format_hours_minutes(self, value_float):
-        """
-        Converts a float into:
-        - decimal hours
-        - hours + minutes (rounded)
-
-        Example:
-            1.75 → "1.75h (1h 45m)"
-        """
-        hours = int(value_float)
-        minutes = int((value_float - hours) * 60)
-
-        return f"{value_float:.2f}h ({hours}h {minutes}m)"
+    def format_seconds(self, seconds):
+        return format_seconds(seconds)
 
 
     # ===============================================================
@@ -226,8 +139,8 @@ class App:
 
         self.delete_bar_var = tk.StringVar(value="")
 
-        self.delete_bar_dropdown = tk.OptionMenu(frame, self.delete_bar_var, "")
-        self.delete_bar_dropdown.pack(side="left", padx=5)
+        self.delete_bar_picker = ContainerPicker(frame, self.delete_bar_var, self.user.index)
+        self.delete_bar_picker.pack(side="left", padx=5)
 
         ttk.Button(frame, text="Delete", command=self.delete_selected_bar).pack(side="left")
 
@@ -238,69 +151,154 @@ class App:
             messagebox.showerror("Error", "No bar selected.")
             return
 
-        if name not in self.progress_values:
+        if name not in self.user.containers:
             messagebox.showerror("Error", "Bar not found.")
             return
 
-        uuid_to_delete = self.user.containers[name].uuid
+        key_to_delete = self.user.containers[name].key
 
-        # Remove UI
-        widgets = self.bar_widgets.pop(name)
-        widgets["frame"].destroy()
+        # Close out a running timer first so its session is not left open
+        self.stop_timer(name)
+        self.auto_timers.discard(name)
 
         # Remove backend data
-        self.progress_values.pop(name, None)
-        self.user.containers.pop(name, None)
+        self.milestones.forget(name)
+        self.goals.pop(name, None)
+        self.rates.pop(name, None)
+        self.practice_version += 1
+        self.user.delete_container(name)
+
+        # Remove UI, the list rebinds its rows to the remaining bars
+        self.progress_list.set_names(self.user.containers)
 
         # Remove from database
-        self.db.delete_container_db(str(uuid_to_delete))
+        self.writer.delete_container_db(key_to_delete)
 
-        self.rebuild_all_dropdowns()
-        
         self.refresh_ui()
 
 
 
-    def rebuild_all_dropdowns(self):
-        # --- Manual update dropdown ---
-        manual_menu = self.update_bar_dropdown["menu"]
-        manual_menu.delete(0, "end")
+    def sync_pickers(self):
+        # Remember which index version the selections were checked against
+        self.picker_version = self.user.index.version
 
-        # --- Timer dropdown ---
-        timer_menu = self.timer_target_dropdown["menu"]
-        timer_menu.delete(0, "end")
-
-        # --- Delete dropdown ---
-        delete_menu = self.delete_bar_dropdown["menu"]
-        delete_menu.delete(0, "end")
-
-        # Re-add all current bars
-        for name in self.progress_values.keys():
-            manual_menu.add_command(
-                label=name,
-                command=lambda v=name: self.selected_bar.set(v)
-            )
-            timer_menu.add_command(
-                label=name,
-                command=lambda v=name: self.timer_target.set(v)
-            )
-            delete_menu.add_command(
-                label=name,
-                command=lambda v=name: self.delete_bar_var.set(v)
-            )
-
-        # If nothing selected, reset
-        if self.selected_bar.get() not in self.progress_values:
+        # If the selected bar is gone, reset
+        if self.selected_bar.get() not in self.user.containers:
             self.selected_bar.set("")
 
-        if self.timer_target.get() not in self.progress_values:
+        if self.timer_target.get() not in self.user.containers:
             self.timer_target.set("")
 
-        if self.delete_bar_var.get() not in self.progress_values:
+        if self.delete_bar_var.get() not in self.user.containers:
             self.delete_bar_var.set("")
 
+        if self.goal_bar_var.get() not in self.user.containers:
+            self.goal_bar_var.set("")
+
+        # Default timer and delete targets to the first bar
+        first = self.user.index.first()
+        if first is not None:
+            if not self.timer_target.get():
+                self.timer_target.set(first)
+            if not self.delete_bar_var.get():
+                self.delete_bar_var.set(first)
+
 
 
+    # ===============================================================
+    # Goals UI
+    # ===============================================================
+    def load_goals(self):
+        # both only change through this app, so they are read once per user
+        self.goals = self.db.fetch_goals_db(self.user.uuid)
+        self.rates = self.db.fetch_rates_db(self.user.uuid)
+
+    def add_practice(self, name, seconds):
+        # mirrors what the db does for the same write, so forecasts never need a reload
+        rate = self.rates.get(name)
+        if rate is None:
+            rate = self.rates[name] = PracticeRate()
+        rate.add(seconds / 3600.0, day_number(time.time()))
+        self.practice_version += 1
+
+    def create_goal_section(self):
+        frame = ttk.LabelFrame(self.root, text="Goal (hours by YYYY-MM-DD)")
+        frame.pack(fill="x", padx=10, pady=10)
+
+        self.goal_bar_var = tk.StringVar(value="")
+
+        self.goal_bar_picker = ContainerPicker(frame, self.goal_bar_var, self.user.index)
+        self.goal_bar_picker.pack(side="left", padx=5)
+
+        self.goal_hours_entry = ttk.Entry(frame, width=8)
+        self.goal_hours_entry.pack(side="left", padx=5)
+
+        self.goal_due_entry = ttk.Entry(frame, width=12)
+        self.goal_due_entry.pack(side="left", padx=5)
+
+        ttk.Button(frame, text="Set", command=self.set_goal_clicked).pack(side="left")
+        ttk.Button(frame, text="Clear", command=self.clear_goal_clicked).pack(side="left")
+        ttk.Button(frame, text="Forecast", command=self.open_goals_popup).pack(side="right", padx=10)
+
+    def set_goal_clicked(self):
+        name = self.goal_bar_var.get()
+        if name not in self.user.containers:
+            print("Bar not found")
+            return
+
+        try:
+            target = float(self.goal_hours_entry.get())
+            due = parse_due_date(self.goal_due_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Goal needs hours and a date like 2027-01-31.")
+            return
+
+        self.goals[name] = (target, due)
+        self.writer.set_goal_db(self.user.containers[name].key, target, due)
+
+    def clear_goal_clicked(self):
+        name = self.goal_bar_var.get()
+        if self.goals.pop(name, None) is not None:
+            self.writer.delete_goal_db(self.user.containers[name].key)
+
+    def open_goals_popup(self):
+        popup = tk.Toplevel(self.root)
+        popup.title("Forecast")
+        popup.geometry("720x360")
+
+        columns = ("hours", "rate", "goal", "due", "eta", "mastery")
+        tree = ttk.Treeview(popup, columns=columns)
+        tree.heading("#0", text="XP Bar")
+        for column, title in zip(columns, ("Hours", "h/day", "Goal", "Due", "Goal ETA", "Mastery ETA")):
+            tree.heading(column, text=title)
+            tree.column(column, width=90, anchor="e")
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # every number comes from cached totals and rates, nothing is read from the db
+        now = time.time()
+        today = day_number(now)
+        mastery = self.max_hours
+
+        for name, seconds in sorted(self.user.xp_seconds().items()):
+            hours = min(self.max_hours, seconds / 3600.0)
+            rate = self.rates.get(name)
+            per_day = rate.per_day(today) if rate else 0.0
+
+            goal = self.goals.get(name)
+            if goal:
+                target, due = goal
+                eta = forecast(hours, target, per_day, now)
+                goal_cells = (f"{target:g}", format_date(due), format_date(eta))
+            else:
+                goal_cells = ("", "", "")
+
+            tree.insert("", "end", text=name, values=(
+                self.format_seconds(min(self.max_seconds, seconds)),
+                f"{per_day:.2f}",
+                *goal_cells,
+                format_date(forecast(hours, mastery, per_day, now)),
+            ))
+
     # ===============================================================
     # Manual Update UI
     # ===============================================================
@@ -310,13 +308,14 @@ class App:
 
         self.selected_bar = tk.StringVar(value="")
 
-        self.update_bar_dropdown = tk.OptionMenu(frame, self.selected_bar, "")
-        self.update_bar_dropdown.pack(side="left", padx=5)
+        self.update_bar_picker = ContainerPicker(frame, self.selected_bar, self.user.index)
+        self.update_bar_picker.pack(side="left", padx=5)
 
         self.value_entry = ttk.Entry(frame, width=10)
         self.value_entry.pack(side="left", padx=5)
 
         ttk.Button(frame, text="Update", command=self.manual_update).pack(side="left")
+        ttk.Button(frame, text="Batch", command=self.open_batch_popup).pack(side="left", padx=5)
 
     def manual_update(self):
         bar_name = self.selected_bar.get()
@@ -324,28 +323,73 @@ class App:
             print("No bar selected")
             return
 
+        if bar_name not in self.user.containers:
+            print("Bar not found")
+            return
+
         try:
-            # Convert "4000.45" → 4000h + 45m → float hours
-            hours_to_add = self.parse_hours_minutes(self.value_entry.get())
+            # Convert "4000.45" → 4000h + 45m → whole seconds
+            seconds_to_add = self.parse_seconds(self.value_entry.get())
         except ValueError:
             print("Invalid number format")
             return
 
         # Clamp to 0–10,000 hours increment
-        hours_to_add = max(0.0, min(10000.0, hours_to_add))
-
-        # Apply increment to progress bar
-        self.progress_values[bar_name] += hours_to_add
-        self.progress_values[bar_name] = min(10000.0, self.progress_values[bar_name])
+        seconds_to_add = max(0, min(self.max_seconds, seconds_to_add))
 
-        # Apply to your user object
-        self.user.containers[bar_name].update_xp_level(hours_to_add)
-        self.db.update_container_db(str(self.user.containers[bar_name].uuid), self.user.containers[bar_name].xp_level ,self.user.containers[bar_name].level)
+        # Apply to your user object, the bar reads it from there
+        container = self.user.containers[bar_name]
+        before = container.hours
+        container.update_xp_seconds(seconds_to_add)
+        self.writer.add_session_db(container.key, seconds_to_add, container.level, source="manual")
+        self.add_practice(bar_name, seconds_to_add)
+        self.check_milestones(bar_name, container, before)
 
         # Refresh UI
         self.refresh_ui()
 
 
+    def open_batch_popup(self):
+        popup = tk.Toplevel(self.root)
+        popup.title("Batch Update")
+        popup.geometry("360x320")
+        popup.grab_set()   # make the window modal
+
+        ttk.Label(popup, text="One update per line: name hh.mm").pack(pady=10)
+
+        text = tk.Text(popup, width=40, height=12)
+        text.pack(fill="both", expand=True, padx=10)
+        text.focus()
+
+        def apply_and_close():
+            try:
+                entries = parse_batch(text.get("1.0", "end"), self.user.containers)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
+            popup.destroy()
+            self.apply_batch(entries)
+
+        ttk.Button(popup, text="Apply", command=apply_and_close).pack(pady=10)
+
+    def apply_batch(self, entries):
+        """
+        Apply already validated (name, seconds) updates: one db transaction and
+        one refresh for the whole batch.
+        """
+        sessions = []
+        for name, seconds in entries:
+            container = self.user.containers[name]
+            before = container.hours
+            container.update_xp_seconds(seconds)
+            self.add_practice(name, seconds)
+            self.check_milestones(name, container, before)
+            sessions.append((container.key, seconds, container.level))
+
+        self.writer.add_sessions_db(sessions, source="manual")
+        self.refresh_ui()
+
     def create_user_section(self):
         frame = ttk.LabelFrame(self.root, text="User")
         frame.pack(fill="x", padx=10, pady=10)
@@ -359,6 +403,30 @@ class App:
             command=self.open_username_popup
         ).pack(side="right", padx=10)
 
+        ttk.Button(
+            frame,
+            text="Switch User",
+            command=self.open_switch_user_popup
+        ).pack(side="right", padx=10)
+
+        ttk.Button(
+            frame,
+            text="Edit Levels",
+            command=self.open_levels_popup
+        ).pack(side="right", padx=10)
+
+        ttk.Button(
+            frame,
+            text="Watch",
+            command=self.open_watch_popup
+        ).pack(side="right", padx=10)
+
+        ttk.Button(
+            frame,
+            text="History",
+            command=self.open_history_popup
+        ).pack(side="right", padx=10)
+
     def open_username_popup(self):
         popup = tk.Toplevel(self.root)
         popup.title("Change Username")
@@ -377,9 +445,16 @@ class App:
                 messagebox.showerror("Error", "Username cannot be empty.")
                 return
 
+            # usernames are unique, check against everything already written
+            self.writer.flush()
+            existing = self.db.fetch_user_by_name_db(new_name)
+            if existing and from_key(existing["id"]) != self.user.uuid:
+                messagebox.showerror("Error", "Username already taken.")
+                return
+
             # Update user object
             self.user.update_username(new_name)
-            self.db.update_user_db(self.user.uuid, new_name)
+            self.writer.update_user_db(self.user.uuid, new_name)
 
             # Refresh UI label
             self.username_label.config(text=new_name)
@@ -390,157 +465,444 @@ class App:
 
         popup.bind("<Return>", lambda e: save_and_close())
 
-    # ===============================================================
-    # Timer UI + Timer Linking to Bar
-    # ===============================================================
-    def create_timer_section(self):
-        frame = ttk.LabelFrame(self.root, text="Timer")
-        frame.pack(fill="x", padx=10, pady=10)
+    def open_levels_popup(self):
+        popup = tk.Toplevel(self.root)
+        popup.title("Edit Levels")
+        popup.geometry("320x300")
+        popup.grab_set()   # make the window modal
 
-        self.timer_label = ttk.Label(frame, text="00:00")
-        self.timer_label.pack(side="left", padx=10)
+        ttk.Label(popup, text="One level per line: hours name").pack(pady=10)
 
-        ttk.Button(frame, text="Start", command=self.start_timer).pack(side="left")
-        ttk.Button(frame, text="Stop", command=self.stop_timer).pack(side="left")
+        text = tk.Text(popup, width=32, height=10)
+        text.pack(fill="both", expand=True, padx=10)
+        text.insert("1.0", format_levels(self.user.ladder))
 
-        ttk.Label(frame, text="XP bar:").pack(side="left", padx=10)
+        def save_and_close():
+            try:
+                ladder = parse_levels(text.get("1.0", "end"))
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
 
-        # Dropdown of which bar the timer updates
-        self.timer_target = tk.StringVar(value="")
-        self.timer_target_dropdown = tk.OptionMenu(frame, self.timer_target, "")
-        self.timer_target_dropdown.pack(side="left")
+            # every level is recomputed at once, in memory and in the db
+            self.user.set_ladder(ladder)
+            self.writer.set_level_ladder_db(self.user.uuid, ladder)
+            self.progress_list.refresh()
+
+            popup.destroy()
+
+        ttk.Button(popup, text="Save", command=save_and_close).pack(pady=10)
+
+    def open_history_popup(self):
+        popup = tk.Toplevel(self.root)
+        popup.title("History")
+        popup.geometry("640x560")
+
+        top = ttk.Frame(popup)
+        top.pack(fill="x", padx=10, pady=5)
+        ttk.Label(top, text="XP bar (empty for all):").pack(side="left")
+
+        bar_var = tk.StringVar(value="")
+        ContainerPicker(top, bar_var, self.user.index).pack(side="left", padx=5)
+
+        def fetch(period, first, last):
+            # rollups are written by the background writer, catch up first
+            self.writer.flush()
+            name = bar_var.get()
+            if name in self.user.containers:
+                return self.db.fetch_rollup_db(period, first, last, cont_uuid=self.user.containers[name].key)
+            return self.db.fetch_rollup_db(period, first, last, user_id=self.user.uuid)
+
+        chart = PracticeChart(popup, fetch)
+        chart.pack(fill="both", expand=True, padx=10, pady=5)
+
+        heatmap = CalendarHeatmap(popup, lambda first, last: fetch("day", first, last), self.tile_cache)
+        heatmap.pack(fill="x", padx=10, pady=5)
+
+        def show_heatmap():
+            # tiles are keyed by the data version, so only changed bars get re-rendered
+            name = bar_var.get()
+            if name in self.user.containers:
+                container = self.user.containers[name]
+                heatmap.show(container.key, container.version)
+            else:
+                heatmap.show(self.user.uuid, self.practice_version)
+
+        def on_bar(*_):
+            name = bar_var.get()
+            if not name or name in self.user.containers:
+                chart.reload()
+                show_heatmap()
+
+        bar_var.trace_add("write", on_bar)
+        chart.reload()
+        show_heatmap()
+
+    def open_switch_user_popup(self):
+        popup = tk.Toplevel(self.root)
+        popup.title("Switch User")
+        popup.geometry("300x320")
+        popup.grab_set()   # make the window modal
+
+        ttk.Label(popup, text="Find or create a user:").pack(pady=10)
+
+        query = tk.StringVar(value="")
+        entry = ttk.Entry(popup, width=25, textvariable=query)
+        entry.pack()
+        entry.focus()
+
+        listbox = tk.Listbox(popup, height=10, exportselection=False)
+        listbox.pack(fill="both", expand=True, padx=10, pady=10)
+        matches = []
+
+        def search(*_):
+            # one indexed range query per keystroke, however many users there are
+            matches[:] = self.db.search_users_db(query.get().strip(), limit=50)
+            listbox.delete(0, "end")
+            listbox.insert("end", *[username for _, username in matches])
+
+        def choose(*_):
+            selection = listbox.curselection()
+            if not selection:
+                return
+            user_id = matches[selection[0]][0]
+            popup.destroy()
+            self.switch_user(user_id)
+
+        def create():
+            name = query.get().strip()
+            if not name:
+                messagebox.showerror("Error", "Username cannot be empty.")
+                return
+            self.writer.flush()
+            if self.db.fetch_user_by_name_db(name):
+                messagebox.showerror("Error", "Username already taken.")
+                return
+            user = make_new_user(name, self.db)
+            popup.destroy()
+            self.switch_user(user.uuid)
+
+        query.trace_add("write", search)
+        listbox.bind("<Double-Button-1>", choose)
+        listbox.bind("<Return>", choose)
+
+        buttons = ttk.Frame(popup)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="Open", command=choose).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Create", command=create).pack(side="left", padx=5)
+
+        search()
 
-    def start_timer(self):
-        if self.timer_running:
+    def switch_user(self, user_id):
+        if from_key(user_id) == self.user.uuid:
             return
 
-        if not self.timer_target.get():
-            print("No bar selected for timer!")
+        # close out the current profile before loading the next one
+        self.stop_all_timers()
+        self.writer.flush()
+
+        user = load_user(self.db, user_id, lazy=True)
+        if user is None:
+            messagebox.showerror("Error", "User not found.")
             return
 
-        self.timer_running = True
-        self.timer_start_time = time.time()
+        self.user = user
+        self.milestones.next_due.clear()
+        self.load_goals()
+        for picker in (self.update_bar_picker, self.timer_target_picker, self.delete_bar_picker, self.goal_bar_picker):
+            picker.index = user.index
+        self.picker_version = None
 
-        threading.Thread(target=self.timer_loop, daemon=True).start()
+        self.progress_list.set_names(user.containers)
+        self.writer.set_setting_db("last_user", str(user.uuid))
 
-    def timer_loop(self):
-        last_update = time.time()
+        self.recover_open_sessions()
+        self.refresh_ui()
+        self.load_watch_rules()
 
-        while self.timer_running:
-            now = time.time()
+    # ===============================================================
+    # Process Watching
+    # ===============================================================
+    def load_watch_rules(self):
+        if self.watcher is None:
+            return
+        rules = []
+        for name, kind, pattern in self.db.fetch_watch_rules_db(self.user.uuid):
+            try:
+                rules.append(WatchRule(name, kind, pattern))
+            except Exception as e:
+                print(f"Skipping watch rule for '{name}': {e}")
+        self.set_watch_rules(rules)
+
+    def set_watch_rules(self, rules):
+        self.watcher.set_rules(rules)
+        if self.watch_after_id is not None:
+            self.root.after_cancel(self.watch_after_id)
+            self.watch_after_id = None
+        # nothing to watch, no scans at all
+        if rules:
+            self.watch_tick()
+
+        # the reset forgot what was running, so a timer whose rule is gone
+        # would never see its stop, end the ones nothing matches any more
+        for name in self.auto_timers - self.watcher.active():
+            self.stop_timer(name)
+
+    def watch_tick(self):
+        self.watch_after_id = None
+        started, stopped = self.watcher.scan()
+
+        for name in stopped & self.auto_timers:
+            self.stop_timer(name)
+
+        # a bar someone is already timing by hand is left alone
+        for name in started:
+            if name in self.user.containers and name not in self.timers:
+                self.start_timer(name)
+                self.auto_timers.add(name)
+
+        self.watch_after_id = self.root.after(int(self.watcher.interval * 1000), self.watch_tick)
+
+    def open_watch_popup(self):
+        if self.watcher is None:
+            messagebox.showinfo("Watch", "Process watching needs Linux /proc.")
+            return
 
-            # Seconds passed since last iteration
-            delta = now - last_update
-            last_update = now
+        popup = tk.Toplevel(self.root)
+        popup.title("Watch Programs")
+        popup.geometry("420x300")
+        popup.grab_set()   # make the window modal
 
-            # Timer display HH:MM:SS
-            total_elapsed = int(now - self.timer_start_time)
+        ttk.Label(popup, text="One rule per line: XP bar | exe or cmdline | pattern").pack(pady=10)
 
-            hrs = total_elapsed // 3600
-            mins = (total_elapsed % 3600) // 60
-            secs = total_elapsed % 60
+        text = tk.Text(popup, width=48, height=10)
+        text.pack(fill="both", expand=True, padx=10)
+        text.insert("1.0", format_rules(self.watcher.rules))
 
-            self.timer_label.config(text=f"{hrs:02d}:{mins:02d}:{secs:02d}")
+        def save_and_close():
+            try:
+                rules = parse_rules(text.get("1.0", "end"))
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
 
-            target = self.timer_target.get()
-            if target:
+            missing = sorted({rule.container for rule in rules if rule.container not in self.user.containers})
+            if missing:
+                messagebox.showerror("Error", "No XP bar named: " + ", ".join(missing))
+                return
 
-                # Convert *this chunk of time* to hours
-                hours_increment = delta / 3600.0
+            self.writer.set_watch_rules_db(self.user.uuid, [(rule.container, rule.kind, rule.pattern) for rule in rules])
+            self.set_watch_rules(rules)
+            popup.destroy()
 
-                # Add it to the bar's stored hours
-                self.progress_values[target] += hours_increment
-                self.user.containers[target].xp_level += hours_increment
+        ttk.Button(popup, text="Save", command=save_and_close).pack(pady=10)
 
-                # Ensure in 0–10,000 range
-                self.progress_values[target] = min(10000.0, max(0.0, self.progress_values[target]))
+    # ===============================================================
+    # Timer UI + Timer Linking to Bar
+    # ===============================================================
+    def create_timer_section(self):
+        frame = ttk.LabelFrame(self.root, text="Timers")
+        frame.pack(fill="x", padx=10, pady=10)
 
-                # Update bar + label
-                self.refresh_ui()
+        ttk.Label(frame, text="XP bar:").pack(side="left", padx=5)
 
-            time.sleep(0.2)
-        target = self.timer_target.get()
-        if target:
-            self.db.update_container_db(str(self.user.containers[target].uuid), self.user.containers[target].xp_level ,self.user.containers[target].level)
+        # Picker for which bar Start and Stop apply to
+        self.timer_target = tk.StringVar(value="")
+        self.timer_target_picker = ContainerPicker(frame, self.timer_target, self.user.index)
+        self.timer_target_picker.pack(side="left")
 
+        ttk.Button(frame, text="Start", command=self.start_timer).pack(side="left", padx=5)
+        ttk.Button(frame, text="Stop", command=self.stop_timer).pack(side="left")
+        ttk.Button(frame, text="Stop All", command=self.stop_all_timers).pack(side="left", padx=5)
 
+        self.timer_label = ttk.Label(frame, text="")
+        self.timer_label.pack(side="left", padx=10)
 
-    def stop_timer(self):
-        if not self.timer_running:
+    def start_timer(self, name = None):
+        name = name or self.timer_target.get()
+        if name not in self.user.containers:
+            print("No bar selected for timer!")
+            return
+        if name in self.timers:
             return
 
-        self.timer_running = False
+        # the session row exists from the start so checkpoints can update it
+        timer = self.timers.start(name, self.user.containers[name].key)
+        self.writer.open_session_db(timer.session_id, timer.key, timer.start_time)
+
+        self.set_timer_label()
+        self.schedule_timers()
+
+    def schedule_timers(self):
+        # one after() for every running timer, at the engine's next due event
+        if self.timer_after_id is not None:
+            self.root.after_cancel(self.timer_after_id)
+            self.timer_after_id = None
+
+        delay = self.timers.next_delay()
+        if delay is not None:
+            self.timer_after_id = self.root.after(max(1, int(delay * 1000)), self.timer_wakeup)
+
+    def timer_wakeup(self):
+        self.timer_after_id = None
+        self.timers.run_due()
+        self.schedule_timers()
+
+    def apply_timer_updates(self, updates):
+        for timer, seconds in updates:
+            if timer.name not in self.user.containers:
+                continue
+
+            container = self.user.containers[timer.name]
+            before = container.hours
+            container.update_xp_seconds(seconds)
+            self.add_practice(timer.name, seconds)
+            self.check_milestones(timer.name, container, before)
+
+            if not self.timers.paused:
+                self.refresh_bar(timer.name)
+
+        if not self.timers.paused:
+            self.set_timer_label()
+
+    def checkpoint_timers(self, timers):
+        # Persist progress so a crash loses at most one interval, all timers in one write
+        now = time.time()
+        self.writer.checkpoint_sessions_db([
+            (timer.session_id, now, timer.applied, self.user.containers[timer.name].level)
+            for timer in timers if timer.name in self.user.containers
+        ])
+
+    def set_timer_label(self):
+        now = time.monotonic()
+        parts = []
+        for name, timer in self.timers.timers.items():
+            total_elapsed = int(timer.elapsed(now))
+            hrs = total_elapsed // 3600
+            mins = (total_elapsed % 3600) // 60
+            secs = total_elapsed % 60
+            parts.append(f"{name} {hrs:02d}:{mins:02d}:{secs:02d}")
+        text = "   ".join(parts)
+
+        if text != self.timer_label_text:
+            self.timer_label_text = text
+            self.timer_label.config(text=text)
+
+    def on_map_change(self, event):
+        if event.widget is not self.root:
+            return
+
+        # minimized: nothing to draw, the engine only wakes up for checkpoints
+        paused = self.root.state() == "iconic"
+        if paused == self.timers.paused:
+            return
 
-        elapsed = int(time.time() - self.timer_start_time) # type: ignore
+        # on restore the engine catches the display up straight away
+        self.timers.set_paused(paused)
+        self.schedule_timers()
+
+    def stop_timer(self, name = None):
+        name = name or self.timer_target.get()
+        timer = self.timers.stop(name)
+        if timer is None:
+            return
+        self.auto_timers.discard(name)
 
         # finalize bar value
-        target = self.timer_target.get()
-        # if target:
-        #     self.progress_values[target] += min(100, elapsed)
+        if name in self.user.containers:
+            container = self.user.containers[name]
+            self.writer.close_session_db(timer.session_id, time.time(), timer.applied, container.level)
 
+        self.set_timer_label()
+        self.schedule_timers()
         self.refresh_ui()
 
-    # ===============================================================
-    # Refresh UI
-    # ===============================================================
-    def refresh_ui(self):
-        for name, widgets in self.bar_widgets.items():
-            hours = self.progress_values.get(name, 0.0)
+    def stop_all_timers(self):
+        for name in list(self.timers.timers):
+            self.stop_timer(name)
 
-            # Set bar value directly in hours (progressbar max = 10000)
-            widgets["bar"]["value"] = hours
+    def on_close(self):
+        # stop running timers first so their sessions are closed, not left to recovery
+        self.stop_all_timers()
+        self.root.destroy()
 
-            # Display pretty formatted HHh MMm
-            widgets["value_label"].config(
-                text=self.format_hours_minutes(hours)
+    def recover_open_sessions(self):
+        """
+        Timer sessions still open at startup were cut short by a crash or kill.
+        Their time up to the last checkpoint is already counted, ask whether to keep it.
+        """
+        for session in self.db.fetch_open_sessions_db(self.user.uuid):
+            name = session["name"]
+            seconds = round(session["seconds"])
+            keep = messagebox.askyesno(
+                "Recover Timer",
+                f"An unfinished timer session for '{name}' was found "
+                f"({self.format_seconds(seconds)}).\n\nKeep this time?"
             )
 
-            widgets["level_label"].config(
-                text=self.user.containers[name].level
-            )
+            if keep or name not in self.user.containers:
+                self.writer.finish_session_db(session["id"])
+                continue
 
-        # Show username if you have a User object
-        if self.user:
-            self.username_label.config(text=self.user.username)
+            container = self.user.containers[name]
+            before = container.hours
+            container.update_xp_seconds(-seconds)
+            self.add_practice(name, -seconds)
+            self.check_milestones(name, container, before)
+            self.writer.discard_session_db(session["id"], container.level)
 
-            # ------ Delete Dropdown ------
-        delete_menu = self.delete_bar_dropdown["menu"]
-        delete_menu.delete(0, "end")
+    # ===============================================================
+    # Milestones
+    # ===============================================================
+    def check_milestones(self, name, container, before):
+        # one float compare unless a milestone was actually crossed
+        if not self.milestones.check(name, container.key, before, container.hours):
+            return
 
-        for key in self.progress_values.keys():
-            delete_menu.add_command(
-                label=key,
-                command=lambda v=key: self.delete_bar_var.set(v)
-            )
+        # crossings from the same update or tick end up in one popup
+        if self.milestone_after_id is None:
+            self.milestone_after_id = self.root.after_idle(self.show_milestones)
 
-        if self.progress_values and not self.delete_bar_var.get():
-            self.delete_bar_var.set(next(iter(self.progress_values)))
+    def show_milestones(self):
+        self.milestone_after_id = None
+        crossings = self.milestones.drain()
+        if not crossings:
+            return
 
+        self.writer.record_milestones_db([(key, hours, reached_at) for _, key, hours, reached_at in crossings])
 
-    def parse_hours_minutes(self, text):
-        """
-        Parse user input like '4000.45' meaning 4000 hours + 45 minutes.
-        Returns float hours.
-        """
-        try:
-            if "." not in text:
-                # Whole number → pure hours
-                return float(text)
+        message = self.milestones.milestone.message
+        lines = [f"{name}: {message(hours)}" for name, _, hours, _ in crossings]
+        messagebox.showinfo("Milestone Reached!", "\n".join(lines))
+
+    # ===============================================================
+    # Refresh UI
+    # ===============================================================
+    def refresh_ui(self):
+        # Only visible bars whose container changed since they were last drawn get touched
+        self.progress_list.refresh()
 
-            hours_str, mins_str = text.split(".", 1)
+        # Show username if you have a User object
+        if self.user:
+            self.set_text(self.username_label, self.user.username)
 
-            hours = int(hours_str)
-            minutes = int(mins_str)
+        # Selections only need checking when the set of bars changes
+        if self.user.index.version != self.picker_version:
+            self.sync_pickers()
 
-            # Clamp minutes 0–59 (normalize overflow)
-            if minutes >= 60:
-                hours += minutes // 60
-                minutes = minutes % 60
+    def refresh_bar(self, name):
+        self.progress_list.refresh_name(name)
 
-            return hours + (minutes / 60.0)
+    def set_text(self, widget, text):
+        if widget.cget("text") != text:
+            widget.config(text=text)
 
-        except Exception:
-            raise ValueError("Invalid hours.minutes format")
+    def parse_seconds(self, text):
+        """
+        Parse user input like '4000.45' meaning 4000 hours + 45 minutes.
+        Returns whole seconds.
+        """
+        return parse_seconds(text)
 
 
 # ===============================================================
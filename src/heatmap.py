@@ -0,0 +1,133 @@
+import calendar
+import datetime
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+
+# (minimum hours, colour), fixed so a month's tile never depends on other months
+SHADES = (
+    (0.0, "#ebedf0"),
+    (0.01, "#c6e48b"),
+    (0.5, "#7bc96f"),
+    (1.0, "#239a3b"),
+    (2.0, "#196127"),
+)
+CELL = 11  # px per day, including a 1px gap
+TILE_CACHE_SIZE = 96  # eight years of tiles
+
+
+def shade(hours) -> str:
+    colour = SHADES[0][1]
+    for minimum, value in SHADES[1:]:
+        if hours < minimum:
+            break
+        colour = value
+    return colour
+
+
+class TileCache:
+    """
+    Bounded LRU of rendered month tiles. Keys carry the data version, so a
+    stale tile is never returned, it just ages out.
+    """
+    def __init__(self, size = TILE_CACHE_SIZE):
+        self.size = size
+        self.tiles = OrderedDict()
+
+    def get(self, key):
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+        return tile
+
+    def put(self, key, tile):
+        self.tiles[key] = tile
+        self.tiles.move_to_end(key)
+        while len(self.tiles) > self.size:
+            self.tiles.popitem(last=False)
+
+    def __len__(self):
+        return len(self.tiles)
+
+
+def render_month(master, year, month, hours) -> tk.PhotoImage:
+    """
+    One month as a 7 row (Mon..Sun) by week column grid. hours has one value
+    per day of the month.
+    """
+    offset = calendar.monthrange(year, month)[0]  # weekday of the 1st
+    weeks = (offset + len(hours) + 6) // 7
+
+    tile = tk.PhotoImage(master=master, width=weeks * CELL, height=7 * CELL)
+    tile.put("white", to=(0, 0, weeks * CELL, 7 * CELL))
+    for day, value in enumerate(hours):
+        column, row = divmod(offset + day, 7)
+        x, y = column * CELL, row * CELL
+        tile.put(shade(value), to=(x, y, x + CELL - 1, y + CELL - 1))
+    return tile
+
+
+class CalendarHeatmap(ttk.Frame):
+    """
+    A year of practice as twelve month tiles. Tiles come from a TileCache
+    shared across views, so flipping between years or bars only renders
+    months that were never drawn at their current data version. The days of
+    a view come from one fetch(first_ordinal, last_ordinal) call.
+    """
+    def __init__(self, parent, fetch, cache, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.fetch = fetch
+        self.cache = cache
+        self.year = datetime.date.today().year
+        self.source = None
+        self.version = None
+
+        controls = ttk.Frame(self)
+        controls.pack(fill="x")
+        ttk.Button(controls, text="<", width=3, command=lambda: self.step(-1)).pack(side="left")
+        self.year_label = ttk.Label(controls, text="")
+        self.year_label.pack(side="left", padx=5)
+        ttk.Button(controls, text=">", width=3, command=lambda: self.step(1)).pack(side="left")
+
+        self.grid_frame = ttk.Frame(self)
+        self.grid_frame.pack(fill="both", expand=True)
+
+        self.month_labels = []
+        for month in range(12):
+            label = ttk.Label(self.grid_frame, text=calendar.month_abbr[month + 1], compound="bottom")
+            label.grid(row=month // 6, column=month % 6, padx=4, pady=4)
+            self.month_labels.append(label)
+
+    def show(self, source, version):
+        """
+        source is any hashable naming what is shown (a container key, None
+        for everything), version changes whenever its data does.
+        """
+        self.source = source
+        self.version = version
+        self.draw()
+
+    def step(self, years):
+        self.year += years
+        self.draw()
+
+    def draw(self):
+        self.year_label.config(text=str(self.year))
+
+        keys = [(self.source, self.year, month, self.version) for month in range(1, 13)]
+        tiles = [self.cache.get(key) for key in keys]
+
+        if any(tile is None for tile in tiles):
+            first = datetime.date(self.year, 1, 1).toordinal()
+            hours = self.fetch(first, datetime.date(self.year, 12, 31).toordinal())
+            for i, key in enumerate(keys):
+                if tiles[i] is not None:
+                    continue
+                month = i + 1
+                start = datetime.date(self.year, month, 1).toordinal() - first
+                days = calendar.monthrange(self.year, month)[1]
+                tiles[i] = render_month(self, self.year, month, hours[start:start + days])
+                self.cache.put(key, tiles[i])
+
+        for label, tile in zip(self.month_labels, tiles):
+            label.config(image=tile)
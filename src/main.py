@@ -1,4 +1,4 @@
-from mastery_app.src.display import App, User, MasteryContainer, MasteryDB, make_user_from_db, make_new_user
+from mastery_app.src.display import App, User, MasteryContainer, MasteryDB, DBWriter, make_user_from_db, make_new_user, load_user
 import tkinter as tk
 from pathlib import Path
 
@@ -9,12 +9,11 @@ if __name__ == "__main__":
     db = MasteryDB(DB_PATH)
 
 
-    db_data = db.setup_mastery_db()
-    # call func to build out user
-    if db_data:
-        user_rows, container_rows = db_data
-        user = make_user_from_db(user_rows, container_rows, db)
-    else:
+    db.ensure_schema()
+    # call func to build out user, only the last profile used is loaded and
+    # its containers are built on first use
+    user = load_user(db, lazy=True)
+    if user is None:
         user = make_new_user("Default Name", db)
 
     root = tk.Tk()
@@ -27,5 +26,10 @@ if __name__ == "__main__":
     root.geometry(f"{w}x{h}+{x}+{y}")
 
     root.minsize(800, 600)
-    App(root, db, user)
+    writer = DBWriter(db)
+    App(root, db, user, writer)
     root.mainloop()
+
+    # drain queued writes before exiting
+    writer.close()
+    db.close()
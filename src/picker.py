@@ -0,0 +1,98 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class ContainerPicker(ttk.Frame):
+    """
+    Type-ahead entry for picking a container by name. Matches come from a
+    shared PrefixIndex and are shown in a small popup list under the entry,
+    so nothing here grows with the number of containers.
+    """
+    MAX_MATCHES = 12
+
+    def __init__(self, parent, variable, index, width = 20, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.variable = variable
+        self.index = index
+
+        self.entry = ttk.Entry(self, textvariable=variable, width=width)
+        self.entry.pack(side="left")
+
+        self.popup = None
+        self.listbox = None
+
+        self.entry.bind("<KeyRelease>", self.on_key)
+        self.entry.bind("<Down>", self.focus_list)
+        self.entry.bind("<Return>", self.accept_first)
+        self.entry.bind("<Escape>", lambda e: self.hide())
+        self.entry.bind("<FocusOut>", lambda e: self.after(150, self.hide_unless_focused))
+
+    # ===============================================================
+    # Popup list
+    # ===============================================================
+    def on_key(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+            return
+        self.show(self.index.search(self.variable.get(), self.MAX_MATCHES))
+
+    def show(self, matches):
+        if not matches:
+            self.hide()
+            return
+
+        if self.popup is None:
+            self.popup = tk.Toplevel(self)
+            self.popup.overrideredirect(True)
+            self.listbox = tk.Listbox(self.popup, exportselection=False)
+            self.listbox.pack(fill="both", expand=True)
+            self.listbox.bind("<ButtonRelease-1>", self.accept_selected)
+            self.listbox.bind("<Return>", self.accept_selected)
+            self.listbox.bind("<Escape>", lambda e: self.hide())
+            self.listbox.bind("<FocusOut>", lambda e: self.after(150, self.hide_unless_focused))
+
+        self.listbox.delete(0, "end")
+        self.listbox.insert("end", *matches)
+        self.listbox.configure(height=len(matches))
+
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        self.popup.geometry(f"{self.entry.winfo_width()}x{self.listbox.winfo_reqheight()}+{x}+{y}")
+        self.popup.deiconify()
+        self.popup.lift()
+
+    def hide(self):
+        if self.popup is not None:
+            self.popup.withdraw()
+
+    def hide_unless_focused(self):
+        focus = self.focus_get()
+        if focus is not self.entry and focus is not self.listbox:
+            self.hide()
+
+    # ===============================================================
+    # Choosing
+    # ===============================================================
+    def focus_list(self, event):
+        if self.popup is None or not self.popup.winfo_viewable():
+            self.show(self.index.search(self.variable.get(), self.MAX_MATCHES))
+        if self.listbox is not None and self.listbox.size():
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, "end")
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+        return "break"
+
+    def accept_selected(self, event = None):
+        selection = self.listbox.curselection()
+        if selection:
+            self.variable.set(self.listbox.get(selection[0]))
+        self.hide()
+        self.entry.focus_set()
+        self.entry.icursor("end")
+
+    def accept_first(self, event = None):
+        matches = self.index.search(self.variable.get(), 1)
+        if matches and self.variable.get() not in self.index:
+            self.variable.set(matches[0])
+            self.entry.icursor("end")
+        self.hide()
@@ -0,0 +1,165 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class ProgressList(ttk.Frame):
+    """
+    Scrollable list of progress bars that only builds widgets for the rows on
+    screen. Row widgets are recycled and rebound to other containers as the
+    list scrolls, so the widget count depends on the window height, not on
+    how many containers there are.
+
+    describe(name) must return (hours, value_text, level_text, version).
+    """
+    ROW_HEIGHT = 34
+
+    def __init__(self, parent, describe, row_height = ROW_HEIGHT, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.describe = describe
+        self.row_height = row_height
+
+        self.names = []
+        self.index_of = {}
+        self.rows = []  # recycled widget sets
+        self.first = 0  # index of the name bound to rows[0]
+
+        self.canvas = tk.Canvas(self, highlightthickness=0, yscrollincrement=1)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", self.on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(sequence, self.on_wheel)
+
+    # ===============================================================
+    # Data
+    # ===============================================================
+    def set_names(self, names):
+        self.names = list(names)
+        self.index_of = {name: i for i, name in enumerate(self.names)}
+        # names may now belong to different containers, redraw every row
+        for row in self.rows:
+            row["version"] = None
+        self.canvas.configure(scrollregion=(0, 0, 0, len(self.names) * self.row_height))
+        self.layout(force=True)
+
+    def refresh(self):
+        for row in self.rows:
+            if row["name"] is not None:
+                self.draw_row(row)
+
+    def refresh_name(self, name):
+        index = self.index_of.get(name)
+        if index is None:
+            return
+
+        slot = index - self.first
+        if 0 <= slot < len(self.rows):
+            self.draw_row(self.rows[slot])
+
+    # ===============================================================
+    # Scrolling + recycling
+    # ===============================================================
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.layout()
+
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            step = -3
+        else:
+            step = 3
+        self.canvas.yview_scroll(step * self.row_height, "units")
+        self.layout()
+
+    def on_resize(self, event):
+        # enough rows to cover the visible height plus one partly shown row
+        needed = event.height // self.row_height + 2
+        while len(self.rows) < needed:
+            self.rows.append(self.make_row())
+
+        for row in self.rows:
+            self.canvas.itemconfigure(row["item"], width=event.width)
+        self.layout(force=True)
+
+    def layout(self, force = False):
+        first = max(0, int(self.canvas.canvasy(0)) // self.row_height)
+        if first == self.first and not force:
+            return
+        self.first = first
+
+        for slot, row in enumerate(self.rows):
+            index = first + slot
+            name = self.names[index] if index < len(self.names) else None
+
+            if name is None:
+                self.canvas.itemconfigure(row["item"], state="hidden")
+                row["name"] = None
+                continue
+
+            self.canvas.coords(row["item"], 0, index * self.row_height)
+            self.canvas.itemconfigure(row["item"], state="normal")
+            if row["name"] != name:
+                row["name"] = name
+                row["version"] = None
+                self.set_row_text(row, "label", name)
+            self.draw_row(row)
+
+    # ===============================================================
+    # Rows
+    # ===============================================================
+    def make_row(self):
+        frame = ttk.Frame(self.canvas)
+
+        name_label = ttk.Label(frame, width=15)
+        name_label.pack(side="left")
+
+        bar = ttk.Progressbar(frame, maximum=10000.0)
+        bar.pack(side="left", fill="x", expand=True)
+
+        level_label = ttk.Label(frame, width=12)
+        level_label.pack(side="left", padx=5)
+
+        value_label = ttk.Label(frame)
+        value_label.pack(side="right", padx=5)
+
+        # scrolling over a row should scroll the list
+        for widget in (frame, name_label, bar, level_label, value_label):
+            for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                widget.bind(sequence, self.on_wheel)
+
+        item = self.canvas.create_window(0, 0, window=frame, anchor="nw",
+                                         height=self.row_height, state="hidden")
+        return {
+            "item": item,
+            "frame": frame,
+            "label": name_label,
+            "bar": bar,
+            "value_label": value_label,
+            "level_label": level_label,
+            "name": None,
+            "version": None,
+            "shown": {},
+        }
+
+    def draw_row(self, row):
+        hours, value_text, level_text, version = self.describe(row["name"])
+        if row["version"] == version:
+            return
+        row["version"] = version
+
+        shown = row["shown"]
+        if shown.get("bar") != hours:
+            shown["bar"] = hours
+            row["bar"]["value"] = hours
+
+        self.set_row_text(row, "value_label", value_text)
+        self.set_row_text(row, "level_label", level_text)
+
+    def set_row_text(self, row, key, text):
+        if row["shown"].get(key) != text:
+            row["shown"][key] = text
+            row[key].config(text=text)
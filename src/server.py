@@ -0,0 +1,420 @@
+"""
+HTTP/JSON service over the same database as the app, for logging XP from
+other machines on the network.
+
+    python3 -m mastery_app.src.server --host 0.0.0.0 --port 8765
+
+    GET  /users                                   every user
+    POST /users                                   {"username": ...}
+    GET  /users/{user}/containers                 name, seconds and level of every bar
+    POST /users/{user}/containers                 {"name": ...}
+    GET  /users/{user}/containers/{name}          one bar
+    POST /users/{user}/containers/{name}/log      {"value": "1.30"} or {"seconds": 5400}
+    GET  /users/{user}/timers                     running timers
+    POST /users/{user}/containers/{name}/start    start a timer
+    POST /users/{user}/containers/{name}/stop     stop it and log the time
+
+GET responses carry an ETag, a matching If-None-Match gets an empty 304.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from ..lib.keys import from_key, new_key
+from ..lib.time_format import parse_seconds
+from ..lib.user import make_new_user
+from .cli import open_db, next_level
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DB_PATH = SCRIPT_DIR / ".." / "db" / "mastery.db"
+
+READ_WORKERS = 4            # each keeps one pooled connection for its whole life
+MAX_HEADERS = 100
+MAX_LINE = 8 * 1024
+MAX_BODY = 64 * 1024
+KEEPALIVE_TIMEOUT = 30.0    # seconds an idle connection stays open
+MAX_SECONDS = 10000 * 3600  # same clamp as a manual update
+
+
+# (method, path pattern with None for each argument, read or write, MasteryService method, takes the body)
+ROUTES = (
+    ("GET", ("users",), "read", "list_users", False),
+    ("POST", ("users",), "write", "create_user", True),
+    ("GET", ("users", None, "containers"), "read", "list_containers", False),
+    ("POST", ("users", None, "containers"), "write", "create_container", True),
+    ("GET", ("users", None, "containers", None), "read", "show_container", False),
+    ("POST", ("users", None, "containers", None, "log"), "write", "log", True),
+    ("POST", ("users", None, "containers", None, "start"), "write", "start_timer", False),
+    ("POST", ("users", None, "containers", None, "stop"), "write", "stop_timer", False),
+    ("GET", ("users", None, "timers"), "read", "list_timers", False),
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def not_found(what):
+    return HTTPError(HTTPStatus.NOT_FOUND, f"{what} does not exist")
+
+
+def etag_for(body) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(header, etag) -> bool:
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    # weak validators are fine for a GET, compare without the W/
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class MasteryService:
+    """
+    The endpoints as plain blocking functions over MasteryDB, each one
+    transaction. They run on the server's worker threads and return
+    (status, payload) or raise HTTPError.
+    """
+    def __init__(self, db):
+        self.db = db
+
+    # ===============================================================
+    # Lookups
+    # ===============================================================
+    def user_row(self, username):
+        user = self.db.fetch_user_by_name_db(username)
+        if user is None:
+            raise not_found(f"User '{username}'")
+        return user
+
+    def container_row(self, user, name):
+        row = self.db.fetch_container_by_name_db(name, user["id"])
+        if row is None:
+            raise not_found(f"XP container '{name}'")
+        return row
+
+    @staticmethod
+    def describe(name, xp_seconds, level):
+        return {"name": name, "seconds": xp_seconds, "hours": xp_seconds / 3600.0, "level": level}
+
+    # ===============================================================
+    # Reads
+    # ===============================================================
+    def list_users(self):
+        users = self.db.search_users_db(limit=-1)
+        return HTTPStatus.OK, [{"id": str(from_key(user_id)), "username": username} for user_id, username in users]
+
+    def list_containers(self, username):
+        with self.db.get_cursor():
+            user = self.user_row(username)
+            summary = self.db.fetch_container_summary_db(user["id"])
+        return HTTPStatus.OK, [self.describe(*row) for row in summary]
+
+    def show_container(self, username, name):
+        with self.db.get_cursor():
+            row = self.container_row(self.user_row(username), name)
+        return HTTPStatus.OK, self.describe(row["name"], row["xp_seconds"], row["level"])
+
+    def list_timers(self, username):
+        with self.db.get_cursor():
+            timers = self.load_timers(self.user_row(username))
+        now = time.time()
+        return HTTPStatus.OK, [{"name": name, "start": start, "seconds": round(max(0.0, now - start))}
+                               for name, start in sorted(timers.items())]
+
+    # ===============================================================
+    # Writes, these only ever run on the single writer thread
+    # ===============================================================
+    def create_user(self, body):
+        username = self.text_field(body, "username")
+        with self.db.get_cursor():
+            if self.db.fetch_user_by_name_db(username) is not None:
+                raise HTTPError(HTTPStatus.CONFLICT, f"User '{username}' already exists")
+            user = make_new_user(username, self.db)
+        return HTTPStatus.CREATED, {"id": str(user.uuid), "username": username}
+
+    def create_container(self, username, body):
+        name = self.text_field(body, "name")
+        with self.db.get_cursor():
+            user = self.user_row(username)
+            if self.db.fetch_container_by_name_db(name, user["id"]) is not None:
+                raise HTTPError(HTTPStatus.CONFLICT, f"XP container '{name}' already exists")
+            level = self.db.fetch_level_ladder_db(user["id"]).level_for(0.0)
+            self.db.insert_container_db(new_key(), name, user["id"], level)
+        return HTTPStatus.CREATED, self.describe(name, 0, level)
+
+    def log(self, username, name, body):
+        try:
+            if "seconds" in body:
+                seconds = body["seconds"]
+                # JSON lets through 1e400 (inf), which int() overflows on
+                if isinstance(seconds, float) and not math.isfinite(seconds):
+                    raise ValueError
+                seconds = int(seconds)
+            else:
+                seconds = parse_seconds(str(body["value"]))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected 'value' as hours.minutes or whole 'seconds'") from None
+
+        seconds = max(0, min(MAX_SECONDS, seconds))
+        with self.db.get_cursor():
+            container = self.add_seconds(self.user_row(username), name, seconds, "manual")
+        return HTTPStatus.OK, self.describe(name, container.xp_seconds, container.level)
+
+    def start_timer(self, username, name):
+        with self.db.get_cursor():
+            user = self.user_row(username)
+            self.container_row(user, name)
+            timers = self.load_timers(user)
+            if name in timers:
+                raise HTTPError(HTTPStatus.CONFLICT, f"Timer already running for '{name}'")
+            timers[name] = time.time()
+            self.save_timers(user, timers)
+        return HTTPStatus.CREATED, {"name": name, "start": timers[name], "seconds": 0}
+
+    def stop_timer(self, username, name):
+        with self.db.get_cursor():
+            user = self.user_row(username)
+            timers = self.load_timers(user)
+            if name not in timers:
+                raise HTTPError(HTTPStatus.CONFLICT, f"No timer running for '{name}'")
+
+            start = timers.pop(name)
+            end = time.time()
+            seconds = round(max(0.0, end - start))
+            container = self.add_seconds(user, name, seconds, "timer", start=start, end=end)
+            self.save_timers(user, timers)
+        return HTTPStatus.OK, {**self.describe(name, container.xp_seconds, container.level), "added": seconds}
+
+    def add_seconds(self, user, name, seconds, source, start = None, end = None):
+        row = self.container_row(user, name)
+        container = next_level(row, seconds, self.db.fetch_level_ladder_db(user["id"]))
+        self.db.add_session_db(row["id"], seconds, container.level, source=source, start=start, end=end)
+        return container
+
+    # ===============================================================
+    # Helpers
+    # ===============================================================
+    @staticmethod
+    def text_field(body, field):
+        value = body.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Expected a non-empty '{field}'")
+        return value.strip()
+
+    # running timers live in settings so they survive a server restart
+    @staticmethod
+    def timers_key(user):
+        return f"server_timers:{from_key(user['id'])}"
+
+    def load_timers(self, user) -> dict:
+        return json.loads(self.db.get_setting_db(self.timers_key(user), "{}"))
+
+    def save_timers(self, user, timers):
+        self.db.set_setting_db(self.timers_key(user), json.dumps(timers))
+
+
+class MasteryServer:
+    """
+    A small HTTP/1.1 server on asyncio streams. The event loop only parses
+    and writes, database work goes to a bounded pool of reader threads and a
+    single writer thread, each holding one long-lived connection from the
+    MasteryDB pool. SQLite takes one writer at a time, so funnelling writes
+    through one thread keeps them off the busy lock while WAL lets the
+    readers run alongside.
+    """
+    def __init__(self, db, read_workers = READ_WORKERS):
+        self.db = db
+        self.service = MasteryService(db)
+        self.readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="mastery-read")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mastery-write")
+        self.server = None
+
+    # ===============================================================
+    # Routing
+    # ===============================================================
+    def route(self, method, path, body):
+        """
+        (executor, function, args) for a request, raises HTTPError otherwise.
+        """
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        allowed = False
+        for route_method, pattern, kind, name, takes_body in ROUTES:
+            if len(pattern) != len(parts) or any(p is not None and p != part for p, part in zip(pattern, parts)):
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+
+            args = [part for p, part in zip(pattern, parts) if p is None]
+            if takes_body:
+                args.append(body)
+            executor = self.writer if kind == "write" else self.readers
+            return executor, getattr(self.service, name), args
+
+        if allowed:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed here")
+        raise HTTPError(HTTPStatus.NOT_FOUND, "No such endpoint")
+
+    # ===============================================================
+    # HTTP
+    # ===============================================================
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader), KEEPALIVE_TIMEOUT)
+                except HTTPError as e:
+                    await self.respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = self.wants_keep_alive(headers)
+                status, payload = await self.dispatch(method, path, body)
+
+                data = json.dumps(payload).encode()
+                extra = {}
+                if method == "GET" and status == HTTPStatus.OK:
+                    extra["ETag"] = etag_for(data)
+                    if etag_matches(headers.get("if-none-match"), extra["ETag"]):
+                        status, data = HTTPStatus.NOT_MODIFIED, b""
+
+                await self.respond(writer, status, data, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        """
+        (method, path, headers, json body) or None when the client hung up.
+        """
+        line = await reader.readline()
+        if not line:
+            return None
+        if len(line) > MAX_LINE:
+            raise HTTPError(HTTPStatus.REQUEST_URI_TOO_LONG, "Request line too long")
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+
+        headers = {"_version": version}
+        for _ in range(MAX_HEADERS):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+
+        if "chunked" in headers.get("transfer-encoding", ""):
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Send a Content-Length body")
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length") from None
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large")
+
+        body = {}
+        if length:
+            raw = await reader.readexactly(length)
+            try:
+                body = json.loads(raw)
+            except ValueError:
+                body = None
+            if not isinstance(body, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        return method.upper(), urlsplit(target).path, headers, body
+
+    async def dispatch(self, method, path, body):
+        try:
+            executor, function, args = self.route(method, path, body)
+            return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            print(f"Error handling {method} {path}: {e!r}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+
+    @staticmethod
+    def wants_keep_alive(headers) -> bool:
+        connection = headers.get("connection", "").lower()
+        if headers["_version"] == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    @staticmethod
+    async def respond(writer, status, data, keep_alive, extra = None):
+        if not isinstance(data, bytes):
+            data = json.dumps(data).encode()
+        status = HTTPStatus(status)
+        lines = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(data)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines += [f"{name}: {value}" for name, value in (extra or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+    # ===============================================================
+    # Lifecycle
+    # ===============================================================
+    async def start(self, host = "127.0.0.1", port = 8765):
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def serve_forever(self, host = "127.0.0.1", port = 8765):
+        await self.start(host, port)
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        # let queued writes finish before the connections go away
+        self.writer.shutdown(wait=True)
+        self.readers.shutdown(wait=True)
+        self.db.close()
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog="mastery-server", description="Serve the XP database over HTTP")
+    parser.add_argument("--db", default=str(DB_PATH), help="database file")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on, 0.0.0.0 for the whole network")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=READ_WORKERS, help="reader threads")
+    args = parser.parse_args(argv)
+
+    server = MasteryServer(open_db(args.db), read_workers=args.workers)
+    print(f"Serving {args.db} on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+import pytest
+
+from mastery_app.lib.batch import MAX_SECONDS, parse_batch
+
+
+def test_parse_batch():
+    text = "# morning\nGuitar 1.30\n\n  Ear training 0.15  \nGuitar 2\n"
+    assert parse_batch(text) == [("Guitar", 5400), ("Ear training", 900), ("Guitar", 7200)]
+
+
+def test_values_are_clamped():
+    assert parse_batch("Guitar 20000\nPiano 0.75") == [("Guitar", MAX_SECONDS), ("Piano", 4500)]
+
+
+def test_every_bad_line_is_reported_with_its_number():
+    text = "Guitar 1.30\n1.30\n\nPiano soon\nDrums 1\n"
+    with pytest.raises(ValueError) as e:
+        parse_batch(text, known={"Guitar", "Piano"})
+    assert str(e.value).splitlines() == [
+        "Line 2: expected 'name hh.mm'",
+        "Line 4: invalid time 'soon'",
+        "Line 5: no XP bar named 'Drums'",
+    ]
+
+
+def test_known_names():
+    assert parse_batch("Guitar 1", known={"Guitar"}) == [("Guitar", 3600)]
+    assert parse_batch("", known=set()) == []
@@ -0,0 +1,94 @@
+import pytest
+
+from mastery_app.src.cli import main, open_db
+
+
+@pytest.fixture
+def cli(tmp_path, capsys):
+    path = str(tmp_path / "mastery.db")
+    db = open_db(path)
+    db.insert_user_db(b"\x01" * 16, "Default Name")
+    db.close()
+
+    def run(*argv):
+        code = main(["--db", path, "--state", str(tmp_path / "timer.json"), "--user", "Default Name", *argv])
+        return code, capsys.readouterr().out
+
+    run.tmp_path = tmp_path
+    return run
+
+
+def test_log(cli):
+    assert cli("log", "Guitar", "1.30") == (1, "XP container 'Guitar' does not exist\n")
+    assert cli("log", "Guitar", "1.30", "--create") == (0, "Guitar: 1.50h (1h 30m) New\n")
+    assert cli("log", "Guitar", "20") == (0, "Guitar: 21.50h (21h 30m) Novice\n")
+    assert cli("log", "Guitar", "lots") == (1, "Invalid number format\n")
+
+
+def test_unknown_user(cli):
+    code, out = cli("--user", "Nobody", "list")
+    assert (code, out) == (1, "User 'Nobody' does not exist\n")
+
+
+def test_batch(cli):
+    cli("log", "Guitar", "0", "--create")
+    cli("log", "Ear training", "0", "--create")
+    batch = cli.tmp_path / "today.txt"
+
+    batch.write_text("Guitar 1.30\n# warmup\nEar training 0.15\nGuitar 0.30\n")
+    code, out = cli("batch", str(batch))
+    assert code == 0
+    assert out.splitlines() == ["Guitar: 2.00h (2h 0m) New", "Ear training: 0.25h (0h 15m) New"]
+
+
+def test_batch_checks_every_name_first(cli):
+    cli("log", "Guitar", "0", "--create")
+    batch = cli.tmp_path / "today.txt"
+    batch.write_text("Guitar 1.30\nPiano 1\nDrums 2\n")
+
+    assert cli("batch", str(batch)) == (1, "XP containers do not exist: Piano, Drums\n")
+    # nothing was written, not even the good line
+    assert cli("list")[1].split() == ["Guitar", "0.00h", "(0h", "0m)", "New"]
+
+
+def test_batch_parse_errors(cli):
+    batch = cli.tmp_path / "today.txt"
+    batch.write_text("Guitar 1.30\n1.30\nPiano x\n")
+    code, out = cli("batch", str(batch))
+    assert code == 1
+    assert out.splitlines() == ["Line 2: expected 'name hh.mm'", "Line 3: invalid time 'x'"]
+
+
+def test_timer(cli):
+    assert cli("start", "Guitar") == (1, "XP container 'Guitar' does not exist\n")
+    cli("log", "Guitar", "0", "--create")
+    assert cli("status") == (0, "No timer running\n")
+
+    assert cli("start", "Guitar") == (0, "Timer started for 'Guitar'\n")
+    assert cli("start", "Guitar") == (1, "Timer already running for 'Guitar'\n")
+    assert cli("status")[1].startswith("Guitar: running for 0.00h")
+
+    code, out = cli("stop")
+    assert code == 0
+    assert out.startswith("Guitar: +0.00h (0h 0m) → 0.00h (0h 0m) New")
+    assert cli("stop") == (1, "No timer running\n")
+    assert not (cli.tmp_path / "timer.json").exists()
+
+
+def test_show(cli):
+    cli("log", "Guitar", "1.30", "--create")
+    history = cli.tmp_path / "old.csv"
+    history.write_text("container,hours,start,end,source\nGuitar,2,,,import\n")
+    assert cli("import", str(history))[0] == 0
+
+    code, out = cli("show", "Guitar")
+    assert code == 0
+    header, *sessions = out.splitlines()
+    assert header == "Guitar: 3.50h (3h 30m) New"
+    assert len(sessions) == 2
+    # the imported session has no end time, it must not show as now
+    assert [line.split()[0] for line in sessions if line.split()[-1] == "import"] == ["-"]
+
+    code, out = cli("show", "Guitar", "--sessions", "0")
+    assert out == "Guitar: 3.50h (3h 30m) New\n"
+    assert cli("show", "Piano") == (1, "XP container 'Piano' does not exist\n")
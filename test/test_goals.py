@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+from mastery_app.lib.goals import (MAX_FORECAST_DAYS, RATE_ALPHA, SECONDS_PER_DAY, PracticeRate,
+                                   format_date, forecast, parse_due_date)
+
+NOW = 1_700_000_000.0
+
+
+# ===============================================================
+# PracticeRate
+# ===============================================================
+def test_today_counts_as_a_full_day():
+    rate = PracticeRate()
+    assert rate.per_day(100) == 0.0
+    rate.add(1.0, 100)
+    rate.add(1.0, 100)
+    assert rate.per_day(100) == pytest.approx(RATE_ALPHA * 2.0)
+
+
+def test_rate_decays_over_a_gap():
+    rate = PracticeRate()
+    rate.add(2.0, 100)
+    folded = RATE_ALPHA * 2.0
+
+    # the next day only folds the practice in, every idle day after decays it
+    assert rate.per_day(101) == pytest.approx(folded)
+    assert rate.per_day(111) == pytest.approx(folded * (1 - RATE_ALPHA) ** 10)
+
+    rate.add(1.0, 111)
+    assert rate.per_day(111) == pytest.approx(RATE_ALPHA * 1.0 + (1 - RATE_ALPHA) * folded * (1 - RATE_ALPHA) ** 10)
+    assert rate.row()[1:] == (111, 1.0)
+
+
+def test_late_and_removed_time():
+    rate = PracticeRate()
+    rate.add(2.0, 100)
+    rate.add(5.0, 99)  # a day already folded in is left alone
+    assert rate.row() == (0.0, 100, 2.0)
+
+    rate.add(-3.0, 100)
+    assert rate.row() == (0.0, 100, 0.0)
+
+
+# ===============================================================
+# Forecasts
+# ===============================================================
+def test_forecast_projects_remaining_days():
+    assert forecast(10.0, 20.0, 2.0, now=NOW) == NOW + 5 * SECONDS_PER_DAY
+
+
+def test_reached_goal_is_due_now():
+    assert forecast(20.0, 20.0, 0.0, now=NOW) == NOW
+    assert forecast(25.0, 20.0, 1.0, now=NOW) == NOW
+
+
+def test_idle_bar_is_never():
+    assert forecast(0.0, 20.0, 0.0, now=NOW) is None
+    # a rate decayed to almost nothing used to overflow the date
+    assert forecast(0.0, 10000.0, 5e-9, now=NOW) is None
+    assert format_date(forecast(0.0, 10000.0, 5e-9, now=NOW)) == "never"
+
+    per_day = 1.0 / MAX_FORECAST_DAYS
+    assert forecast(0.0, 1.0, per_day, now=NOW) is not None
+    assert forecast(0.0, 1.0001, per_day, now=NOW) is None
+
+
+def test_format_date():
+    assert format_date(None) == "never"
+    assert format_date(1e20) == "never"
+    assert format_date(parse_due_date("2030-01-31")) == "2030-01-31"
+
+
+def test_due_date_is_the_end_of_the_day():
+    due = datetime.datetime.fromtimestamp(parse_due_date(" 2030-01-31 "))
+    assert (due.date(), due.time()) == (datetime.date(2030, 1, 31), datetime.time(23, 59, 59))
+    with pytest.raises(ValueError):
+        parse_due_date("31/01/2030")
@@ -0,0 +1,208 @@
+import pytest
+
+from mastery_app.lib.db_writer import DBWriter
+from mastery_app.lib.keys import new_key
+from mastery_app.lib.mastery_db import MasteryDB
+from mastery_app.lib.timer_engine import TimerEngine
+
+
+# ===============================================================
+# DBWriter
+# ===============================================================
+class RecordingDB(MasteryDB):
+    """
+    MasteryDB that remembers which container writes actually ran.
+    """
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.calls = []
+
+    def update_container_db(self, id, xp_seconds, level):
+        self.calls.append(("update", xp_seconds))
+        super().update_container_db(id, xp_seconds, level)
+
+    def delete_container_db(self, id):
+        self.calls.append(("delete",))
+        super().delete_container_db(id)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = RecordingDB(str(tmp_path / "writer.db"))
+    db.ensure_schema()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def bar(db):
+    user_id, cont_id = new_key(), new_key()
+    db.insert_user_db(user_id, "Default Name")
+    db.insert_container_db(cont_id, "Guitar", user_id)
+    return user_id, cont_id
+
+
+@pytest.fixture
+def writer(db):
+    # a long interval so everything submitted lands in one batch
+    writer = DBWriter(db, interval=60)
+    yield writer
+    writer.close()
+
+
+def test_writes_with_the_same_key_coalesce(db, bar, writer):
+    user_id, cont_id = bar
+    for seconds in (60, 120, 180):
+        writer.update_container_db(cont_id, seconds, "New")
+    writer.flush()
+
+    assert db.calls == [("update", 180)]
+    assert db.fetch_container_summary_db(user_id) == [("Guitar", 180, "New")]
+
+
+def test_delete_replaces_a_pending_update(db, bar, writer):
+    user_id, cont_id = bar
+    writer.update_container_db(cont_id, 60, "New")
+    writer.delete_container_db(cont_id)
+    writer.flush()
+
+    assert db.calls == [("delete",)]
+    assert db.fetch_container_summary_db(user_id) == []
+
+
+def test_writes_without_a_key_all_run(db, bar, writer):
+    user_id, cont_id = bar
+    writer.add_session_db(cont_id, 60, "New")
+    writer.add_session_db(cont_id, 60, "New")
+    writer.flush()
+
+    assert len(db.fetch_sessions_db(cont_id)) == 2
+    assert db.fetch_container_summary_db(user_id) == [("Guitar", 120, "New")]
+
+
+def test_failing_write_only_drops_itself(db, bar, writer, capsys):
+    user_id, cont_id = bar
+    writer.add_session_db(cont_id, 60, "New")
+    writer.insert_user_db(new_key(), "Default Name")  # username is taken
+    writer.add_session_db(cont_id, 30, "New")
+    writer.flush()
+
+    assert db.fetch_container_summary_db(user_id) == [("Guitar", 90, "New")]
+    assert "DB write insert_user_db failed" in capsys.readouterr().out
+
+
+def test_close_drains_the_queue(db, bar):
+    user_id, cont_id = bar
+    writer = DBWriter(db, interval=60)
+    writer.add_session_db(cont_id, 60, "New")
+    writer.close()
+
+    assert db.fetch_container_summary_db(user_id) == [("Guitar", 60, "New")]
+    with pytest.raises(RuntimeError):
+        writer.add_session_db(cont_id, 60, "New")
+
+
+# ===============================================================
+# TimerEngine
+# ===============================================================
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def engine(clock):
+    engine = TimerEngine(on_update=lambda updates: engine.updates.extend((timer.name, seconds) for timer, seconds in updates),
+                         on_checkpoint=lambda timers: engine.checkpoints.append(sorted(timer.name for timer in timers)),
+                         tick_interval=1.0, checkpoint_interval=30.0, clock=clock, wall=lambda: 1000.0)
+    engine.updates = []
+    engine.checkpoints = []
+    return engine
+
+
+def test_ticks_add_whole_seconds_and_carry_the_fraction(engine, clock):
+    engine.start("Guitar", new_key())
+    clock.now = 1.5
+    engine.run_due()
+    clock.now = 2.2
+    engine.run_due()
+
+    assert engine.updates == [("Guitar", 1), ("Guitar", 1)]
+    assert engine.timers["Guitar"].applied == 2
+
+
+def test_ticks_stay_on_the_grid(engine, clock):
+    engine.start("Guitar", new_key())
+    clock.now = 1.5
+    engine.run_due()
+    assert engine.next_delay() == 0.5
+
+    # a late wakeup skips the missed ticks instead of running them all
+    clock.now = 4.7
+    engine.run_due()
+    assert engine.updates[-1] == ("Guitar", 3)
+    assert engine.next_delay() == pytest.approx(0.3)
+
+
+def test_timers_share_one_wakeup(engine, clock):
+    engine.start("Guitar", new_key())
+    clock.now = 0.4
+    engine.start("Piano", new_key())
+    assert len(engine) == 2
+    assert len(engine.events) == 2  # one tick and one checkpoint
+
+    clock.now = 1.0
+    engine.run_due()
+    assert engine.updates == [("Guitar", 1), ("Piano", 0)]
+
+
+def test_checkpoint_saves_only_changed_timers(engine, clock):
+    engine.start("Guitar", new_key())
+    clock.now = 29.5
+    engine.start("Piano", new_key())
+    engine.set_paused(True)
+
+    clock.now = 30.0
+    engine.run_due()
+    assert engine.checkpoints == [["Guitar"]]
+    assert engine.timers["Guitar"].saved == 30
+
+    clock.now = 60.0
+    engine.run_due()
+    assert engine.checkpoints == [["Guitar"], ["Guitar", "Piano"]]
+
+
+def test_paused_engine_only_wakes_for_checkpoints(engine, clock):
+    engine.start("Guitar", new_key())
+    engine.set_paused(True)
+    # the tick already queued still runs, but is not scheduled again
+    clock.now = 5.0
+    engine.run_due()
+    clock.now = 10.0
+    engine.run_due()
+    assert engine.updates == [("Guitar", 5)]
+    assert engine.next_delay() == 20.0
+
+    engine.set_paused(False)
+    assert engine.updates == [("Guitar", 5), ("Guitar", 5)]
+    assert engine.next_delay() == 1.0
+
+
+def test_stop_applies_the_last_seconds(engine, clock):
+    engine.start("Guitar", new_key())
+    clock.now = 2.9
+    timer = engine.stop("Guitar")
+
+    assert timer.applied == 2
+    assert engine.updates == [("Guitar", 2)]
+    assert "Guitar" not in engine
+    assert engine.next_delay() is None
+    assert engine.stop("Guitar") is None
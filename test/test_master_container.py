@@ -0,0 +1,90 @@
+import pytest
+
+from mastery_app.lib import levels
+from mastery_app.lib.keys import new_key
+from mastery_app.lib.levels import DEFAULT_LADDER, LevelLadder, format_levels, parse_levels
+from mastery_app.lib.mastery_container import MasteryContainer
+from mastery_app.lib.mastery_db import MasteryDB
+
+
+# ===============================================================
+# LevelLadder
+# ===============================================================
+@pytest.mark.parametrize("hours, level", [
+    (0, "New"),
+    (19.99, "New"),
+    (20, "Novice"),
+    (999.5, "Advanced Beginner"),
+    (1000, "Competent"),
+    (9999, "Expert"),
+    (10000, "Mastery"),
+    (50000, "Mastery"),
+])
+def test_level_starts_at_its_threshold(hours, level):
+    assert DEFAULT_LADDER.level_for(hours) == level
+
+
+@pytest.mark.parametrize("min_values", [levels.NUMPY_MIN_VALUES, 1])
+def test_levels_for_matches_level_for(monkeypatch, min_values):
+    # 1 takes the NumPy path when it is installed
+    monkeypatch.setattr(levels, "NUMPY_MIN_VALUES", min_values)
+    hours = [i * 0.75 for i in range(15000)]
+    assert DEFAULT_LADDER.levels_for(hours) == [DEFAULT_LADDER.level_for(h) for h in hours]
+    assert DEFAULT_LADDER.levels_for([]) == []
+
+
+@pytest.mark.parametrize("bad", [
+    [],
+    [(5, "New"), (20, "Novice")],
+    [(0, "New"), (20, "Novice"), (20, "Again")],
+    [(0, "New"), (20, " ")],
+])
+def test_bad_ladders_are_refused(bad):
+    with pytest.raises(ValueError):
+        LevelLadder(bad)
+
+
+def test_parse_and_format_round_trip():
+    ladder = parse_levels("0 Beginner\n\n1.5 Getting there\n300 Done")
+    assert ladder.levels() == [(0.0, "Beginner"), (1.5, "Getting there"), (300.0, "Done")]
+    assert parse_levels(format_levels(ladder)) == ladder
+    assert parse_levels(format_levels(DEFAULT_LADDER)) == DEFAULT_LADDER
+
+    with pytest.raises(ValueError, match="Line 2"):
+        parse_levels("0 Beginner\nlots Done")
+
+
+# ===============================================================
+# MasteryContainer
+# ===============================================================
+def test_container_levels_up_on_its_ladder():
+    ladder = LevelLadder([(0, "Beginner"), (1, "Done")])
+    container = MasteryContainer("Guitar", ladder=ladder)
+    assert container.level == "Beginner"
+
+    container.update_xp_seconds(3599)
+    assert container.level == "Beginner"
+    container.update_xp_seconds(1)
+    assert (container.xp_seconds, container.level) == (3600, "Done")
+
+    container.set_ladder(DEFAULT_LADDER)
+    assert container.level == "New"
+    assert container.version == 3
+
+
+def test_new_ladder_recomputes_stored_levels(tmp_path):
+    db = MasteryDB(str(tmp_path / "levels.db"))
+    db.ensure_schema()
+    user_id, guitar, piano = new_key(), new_key(), new_key()
+    db.insert_user_db(user_id, "Default Name")
+    db.insert_container_db(guitar, "Guitar", user_id)
+    db.insert_container_db(piano, "Piano", user_id)
+    db.add_session_db(guitar, 25 * 3600, "Novice")
+
+    ladder = LevelLadder([(0, "Beginner"), (10, "Going"), (100, "Done")])
+    db.set_level_ladder_db(user_id, ladder)
+    assert db.fetch_level_ladder_db(user_id) == ladder
+    assert db.fetch_container_summary_db(user_id) == [("Guitar", 90000, "Going"), ("Piano", 0, "Beginner")]
+    # nothing left to change
+    assert db.recompute_levels_db(user_id) == 0
+    db.close()
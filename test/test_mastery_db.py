@@ -0,0 +1,212 @@
+import datetime
+import sqlite3 as sql
+import uuid
+
+import pytest
+
+from mastery_app.lib.goals import day_number
+from mastery_app.lib.mastery_db import MasteryDB, SCHEMA_VERSION, legacy_key
+from mastery_app.lib.rollups import bucket_for
+
+
+USER_ID = str(uuid.uuid4())
+GUITAR_ID = str(uuid.uuid4())
+PIANO_ID = str(uuid.uuid4())
+NOON = datetime.datetime(2024, 3, 1, 12).timestamp()  # local noon, nowhere near a day boundary
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """
+    A database in the layout the app first shipped with: TEXT uuids, float
+    hours in xp_level, no ledger and no user_version.
+    """
+    path = str(tmp_path / "baseline.db")
+    conn = sql.connect(path)
+    conn.executescript('''
+        CREATE TABLE users (
+            id TEXT PRIMARY KEY,
+            username TEXT UNIQUE
+        );
+        CREATE TABLE containers (
+            id TEXT PRIMARY KEY,
+            xp_level REAL,
+            level TEXT,
+            name TEXT,
+            user_uuid TEXT,
+            FOREIGN KEY (user_uuid) REFERENCES users(id)
+        );
+    ''')
+    conn.executemany("INSERT INTO users (id, username) VALUES (?,?)",
+                     [(USER_ID, "Default Name"), ("hand-made", "Tester")])
+    conn.executemany("INSERT INTO containers (id, xp_level, level, name, user_uuid) VALUES (?,?,?,?,?)", [
+        (GUITAR_ID, 1.5, "New", "Guitar", USER_ID),
+        (PIANO_ID, 0.0, "New", "Piano", USER_ID),
+        ("hand-made-bar", 25.25, "Novice", "Drums", "hand-made"),
+    ])
+    conn.commit()
+    conn.close()
+
+    db = MasteryDB(path)
+    yield db
+    db.close()
+
+
+def user_version(db):
+    with db.get_cursor() as cursor:
+        return cursor.execute("PRAGMA user_version").fetchone()[0]
+
+
+def test_fresh_database_gets_latest_schema(tmp_path):
+    db = MasteryDB(str(tmp_path / "fresh.db"))
+    db.ensure_schema()
+    assert user_version(db) == SCHEMA_VERSION
+    db.close()
+
+
+def test_migrate_baseline_keys(baseline_db):
+    baseline_db.ensure_schema()
+    assert user_version(baseline_db) == SCHEMA_VERSION
+
+    user = baseline_db.fetch_user_by_name_db("Default Name")
+    assert user["id"] == uuid.UUID(USER_ID).bytes
+    # ids that were never uuids map to a stable uuid5
+    tester = baseline_db.fetch_user_by_name_db("Tester")
+    assert tester["id"] == legacy_key("hand-made") == uuid.uuid5(uuid.NAMESPACE_OID, "hand-made").bytes
+
+    guitar = baseline_db.fetch_container_by_name_db("Guitar", USER_ID)
+    assert guitar["id"] == uuid.UUID(GUITAR_ID).bytes
+    assert guitar["user_uuid"] == user["id"]
+    assert baseline_db.fetch_container_by_name_db("Drums", tester["id"])["id"] == legacy_key("hand-made-bar")
+
+
+def test_migrate_baseline_totals_to_integer_seconds(baseline_db):
+    baseline_db.ensure_schema()
+
+    assert baseline_db.fetch_container_summary_db(USER_ID) == [("Guitar", 5400, "New"), ("Piano", 0, "New")]
+    assert baseline_db.fetch_container_summary_db(legacy_key("hand-made")) == [("Drums", 90900, "Novice")]
+    with baseline_db.get_cursor() as cursor:
+        cursor.execute("SELECT DISTINCT typeof(xp_seconds) FROM containers")
+        assert [row[0] for row in cursor.fetchall()] == ["integer"]
+
+
+def test_migrate_baseline_seeds_ledger(baseline_db):
+    baseline_db.ensure_schema()
+
+    sessions = baseline_db.fetch_sessions_db(GUITAR_ID)
+    assert len(sessions) == 1
+    assert sessions[0]["seconds"] == 5400
+    assert sessions[0]["source"] == "import"
+    assert sessions[0]["start_time"] is None
+    # nothing to seed for a container without time
+    assert baseline_db.fetch_sessions_db(PIANO_ID) == []
+
+    # the ledger and the materialized totals agree
+    with baseline_db.get_cursor() as cursor:
+        cursor.execute("""
+            SELECT count(*) FROM containers
+            WHERE xp_seconds != (SELECT coalesce(sum(seconds), 0) FROM sessions WHERE container_id = containers.id)
+        """)
+        assert cursor.fetchone()[0] == 0
+
+
+def test_migrate_baseline_stamps_sync_columns(baseline_db):
+    baseline_db.ensure_schema()
+
+    origin, seq = baseline_db.fetch_sync_clock_db()
+    with baseline_db.get_cursor() as cursor:
+        for table in ("users", "containers", "sessions"):
+            cursor.execute(f"SELECT count(*) FROM {table} WHERE seq IS NULL OR origin IS NOT ?", (origin,))
+            assert cursor.fetchone()[0] == 0
+        cursor.execute("SELECT max(seq) FROM containers")
+        assert cursor.fetchone()[0] <= seq
+
+
+def test_ensure_schema_is_a_no_op_once_current(baseline_db):
+    baseline_db.ensure_schema()
+    clock = baseline_db.fetch_sync_clock_db()
+    baseline_db.ensure_schema()
+    assert baseline_db.fetch_sync_clock_db() == clock
+    assert len(baseline_db.fetch_sessions_db(GUITAR_ID)) == 1
+
+
+def test_migrate_baseline_recomputes_stored_levels(baseline_db):
+    # the baseline wrote 'Novice' for new bars and never looked at levels again
+    conn = sql.connect(baseline_db.db_path)
+    conn.executemany("INSERT INTO containers (id, xp_level, level, name, user_uuid) VALUES (?,?,?,?,?)", [
+        (str(uuid.uuid4()), 0.0, "Novice", "Violin", USER_ID),
+        (str(uuid.uuid4()), 20.0, "New", "Voice", USER_ID),
+        (str(uuid.uuid4()), 150.0, "Novice", "Cello", USER_ID),
+    ])
+    conn.commit()
+    conn.close()
+
+    baseline_db.ensure_schema()
+    assert baseline_db.fetch_container_summary_db(USER_ID) == [
+        ("Cello", 540000, "Advanced Beginner"),
+        ("Guitar", 5400, "New"),
+        ("Piano", 0, "New"),
+        ("Violin", 0, "New"),
+        ("Voice", 72000, "Novice"),
+    ]
+    assert baseline_db.recompute_levels_db(USER_ID) == 0
+
+
+# ===============================================================
+# Timer sessions
+# ===============================================================
+@pytest.fixture
+def guitar(tmp_path):
+    db = MasteryDB(str(tmp_path / "timer.db"))
+    db.ensure_schema()
+    user_id, cont_id = uuid.uuid4().bytes, uuid.uuid4().bytes
+    db.insert_user_db(user_id, "Default Name")
+    db.insert_container_db(cont_id, "Guitar", user_id)
+    yield db, user_id, cont_id
+    db.close()
+
+
+def practice(db, user_id, when):
+    day = bucket_for("day", when)
+    rate = db.fetch_rates_db(user_id).get("Guitar")
+    return (db.fetch_container_summary_db(user_id)[0][1],
+            db.fetch_rollup_db("day", day, day, user_id=user_id)[0],
+            rate.per_day(day_number(when)) if rate else 0.0)
+
+
+def test_repeated_checkpoint_is_idempotent(guitar):
+    db, user_id, cont_id = guitar
+    session = uuid.uuid4().bytes
+    start = NOON
+    db.open_session_db(session, cont_id, start)
+
+    db.checkpoint_session_db(session, start + 600, 600, "New")
+    once = practice(db, user_id, start)
+    db.checkpoint_session_db(session, start + 600, 600, "New")
+    assert practice(db, user_id, start) == once
+    assert once[:2] == (600, 600 / 3600)
+
+    db.checkpoint_session_db(session, start + 900, 900.4, "New")
+    db.close_session_db(session, start + 900, 900, "New")
+    assert practice(db, user_id, start)[:2] == (900, 900 / 3600)
+    assert [(row["seconds"], row["open"]) for row in db.fetch_sessions_db(cont_id)] == [(900, 0)]
+
+
+def test_discard_restores_totals_rollups_and_rate(guitar):
+    db, user_id, cont_id = guitar
+    start = NOON
+    db.add_session_db(cont_id, 1800, "New", end=start)
+    before = practice(db, user_id, start)
+
+    session = uuid.uuid4().bytes
+    db.open_session_db(session, cont_id, start)
+    db.checkpoint_session_db(session, start + 600, 600, "New")
+    db.checkpoint_session_db(session, start + 1200, 1200, "New")
+    assert practice(db, user_id, start)[0] == 3000
+
+    db.discard_session_db(session, "New")
+    assert practice(db, user_id, start) == pytest.approx(before)
+    assert len(db.fetch_sessions_db(cont_id)) == 1
+    # gone already, nothing to take off twice
+    db.discard_session_db(session, "New")
+    assert practice(db, user_id, start) == pytest.approx(before)
@@ -0,0 +1,67 @@
+from mastery_app.lib.milestone import Milestone, MilestoneTracker
+
+
+# ===============================================================
+# Milestone
+# ===============================================================
+def test_step_sequence_mixes_explicit_and_interval():
+    milestone = Milestone()
+    steps = [0.0]
+    for _ in range(5):
+        steps.append(milestone.next_after(steps[-1]))
+    assert steps == [0.0, 10.0, 100.0, 1000.0, 2000.0, 3000.0]
+    assert milestone.next_after(1500) == 2000.0
+
+
+def test_interval_only_and_explicit_only():
+    assert Milestone({}, interval=250).crossed(250.0, 1000) == [250.0, 500.0, 750.0, 1000.0]
+    explicit = Milestone({5.0: "five", 50.0: "fifty"}, interval=0)
+    assert explicit.next_after(50) == float("inf")
+    assert explicit.crossed(5.0, 1e6) == [5.0, 50.0]
+
+
+def test_message():
+    milestone = Milestone()
+    assert milestone.message(10.0).startswith("10 hours in")
+    assert milestone.message(3000.0) == "3000 hours, hurray!"
+
+
+# ===============================================================
+# MilestoneTracker
+# ===============================================================
+def test_several_milestones_in_one_update():
+    tracker = MilestoneTracker()
+    assert tracker.check("Guitar", b"k", 5.0, 1500.0)
+    assert [hours for _, _, hours, _ in tracker.drain()] == [10.0, 100.0, 1000.0]
+    assert tracker.next_due["Guitar"] == 2000.0
+    assert tracker.drain() == []
+
+
+def test_ticks_below_the_next_milestone_record_nothing():
+    tracker = MilestoneTracker()
+    assert not tracker.check("Guitar", b"k", 0.0, 9.99)
+    assert tracker.check("Guitar", b"k", 9.99, 10.0)
+    assert [(name, hours) for name, _, hours, _ in tracker.drain()] == [("Guitar", 10.0)]
+    assert not tracker.check("Guitar", b"k", 10.0, 10.5)
+    assert tracker.pending == []
+
+
+def test_removed_time_moves_next_due_back():
+    tracker = MilestoneTracker()
+    tracker.check("Guitar", b"k", 90.0, 150.0)
+    assert tracker.next_due["Guitar"] == 1000.0
+
+    assert not tracker.check("Guitar", b"k", 150.0, 50.0)
+    assert tracker.next_due["Guitar"] == 100.0
+
+    # regaining the time reaches the milestone again, the db ignores repeats
+    tracker.drain()
+    assert tracker.check("Guitar", b"k", 50.0, 120.0)
+    assert [hours for _, _, hours, _ in tracker.drain()] == [100.0]
+
+
+def test_forget():
+    tracker = MilestoneTracker()
+    tracker.check("Guitar", b"k", 0.0, 5.0)
+    tracker.forget("Guitar")
+    assert "Guitar" not in tracker.next_due
@@ -0,0 +1,143 @@
+import pytest
+
+from mastery_app.lib.procwatch import ProcWatcher, WatchRule, parse_rules, format_rules, BACKOFF
+
+
+def add_process(root, pid, comm, argv):
+    proc = root / str(pid)
+    proc.mkdir()
+    (proc / "comm").write_text(comm + "\n")
+    (proc / "cmdline").write_bytes(b"\0".join(arg.encode() for arg in argv) + b"\0")
+
+
+def remove_process(root, pid):
+    proc = root / str(pid)
+    for child in proc.iterdir():
+        child.unlink()
+    proc.rmdir()
+
+
+@pytest.fixture
+def proc(tmp_path):
+    # something that is not a pid, must be ignored
+    (tmp_path / "self").mkdir()
+    return tmp_path
+
+
+# ===============================================================
+# Rules
+# ===============================================================
+def test_exe_rule_matches_comm_or_argv0():
+    rule = WatchRule("Guitar", "exe", "tuxguitar")
+    assert rule.matches("tuxguitar", [])
+    assert rule.matches("java", ["/usr/bin/tuxguitar", "song.gp5"])
+    assert not rule.matches("java", ["/usr/bin/java", "tuxguitar.jar"])
+
+
+def test_cmdline_rule_searches_full_command_line():
+    rule = WatchRule("Piano", "cmdline", r"musescore.*\.mscz")
+    assert rule.matches("mscore", ["musescore", "sonata.mscz"])
+    assert not rule.matches("mscore", ["musescore"])
+
+
+def test_parse_rules_round_trip():
+    text = "Guitar | exe | tuxguitar\n# comment\n\nPiano | cmdline | musescore .*"
+    rules = parse_rules(text)
+    assert rules == [WatchRule("Guitar", "exe", "tuxguitar"), WatchRule("Piano", "cmdline", "musescore .*")]
+    assert parse_rules(format_rules(rules)) == rules
+
+
+@pytest.mark.parametrize("text", ["Guitar | exe", "Guitar | glob | x", "Guitar | cmdline | ("])
+def test_parse_rules_names_bad_line(text):
+    with pytest.raises(ValueError, match="Line 2"):
+        parse_rules("Piano | exe | mscore\n" + text)
+
+
+# ===============================================================
+# Scanning
+# ===============================================================
+def test_scan_reports_started_and_stopped(proc):
+    add_process(proc, 100, "bash", ["bash"])
+    watcher = ProcWatcher([WatchRule("Guitar", "exe", "tuxguitar")], proc_root=str(proc))
+    assert watcher.scan() == (set(), set())
+
+    add_process(proc, 200, "tuxguitar", ["tuxguitar"])
+    assert watcher.scan() == ({"Guitar"}, set())
+    assert watcher.active() == {"Guitar"}
+
+    # a second matching process does not start the container again
+    add_process(proc, 201, "tuxguitar", ["tuxguitar"])
+    assert watcher.scan() == (set(), set())
+
+    # nor does losing one of two stop it
+    remove_process(proc, 200)
+    assert watcher.scan() == (set(), set())
+
+    remove_process(proc, 201)
+    assert watcher.scan() == (set(), {"Guitar"})
+    assert watcher.active() == set()
+
+
+def test_scan_reads_matched_pids_once(proc, monkeypatch):
+    add_process(proc, 100, "bash", ["bash"])
+    add_process(proc, 101, "tuxguitar", ["tuxguitar"])
+    watcher = ProcWatcher([WatchRule("Guitar", "exe", "tuxguitar")], proc_root=str(proc))
+
+    reads = []
+    original = watcher.read_process
+    monkeypatch.setattr(watcher, "read_process", lambda pid: reads.append(pid) or original(pid))
+
+    watcher.scan()
+    assert sorted(reads) == ["100", "101"]
+
+    # the match is cached, only the pid that matched nothing is read again
+    reads.clear()
+    watcher.scan()
+    assert reads == ["100"]
+
+    reads.clear()
+    add_process(proc, 102, "vim", ["vim"])
+    watcher.scan()
+    assert sorted(reads) == ["100", "102"]
+
+
+def test_exec_after_the_first_read_is_matched(proc):
+    add_process(proc, 100, "python3", ["python3"])
+    watcher = ProcWatcher([WatchRule("Piano", "cmdline", r"musescore\.py")], proc_root=str(proc))
+    assert watcher.scan() == (set(), set())
+
+    # same pid, new program
+    (proc / "100" / "cmdline").write_bytes(b"python3\0musescore.py\0")
+    assert watcher.scan() == ({"Piano"}, set())
+    assert watcher.scan() == (set(), set())
+
+
+def test_vanished_process_is_skipped(proc):
+    watcher = ProcWatcher([WatchRule("Guitar", "exe", "tuxguitar")], proc_root=str(proc))
+    # a pid dir without its files, like a process that exited mid-scan
+    (proc / "300").mkdir()
+    assert watcher.scan() == (set(), set())
+
+
+def test_set_rules_starts_over(proc):
+    add_process(proc, 100, "tuxguitar", ["tuxguitar"])
+    watcher = ProcWatcher([WatchRule("Guitar", "exe", "tuxguitar")], proc_root=str(proc))
+    assert watcher.scan() == ({"Guitar"}, set())
+
+    watcher.set_rules([WatchRule("Tabs", "cmdline", "tux")])
+    assert watcher.active() == set()
+    assert watcher.scan() == ({"Tabs"}, set())
+
+
+def test_interval_backs_off_and_resets(proc):
+    watcher = ProcWatcher([WatchRule("Guitar", "exe", "tuxguitar")], proc_root=str(proc),
+                          min_interval=2.0, max_interval=5.0)
+    watcher.scan()
+    assert watcher.interval == 2.0 * BACKOFF
+    watcher.scan()
+    watcher.scan()
+    assert watcher.interval == 5.0
+
+    add_process(proc, 100, "tuxguitar", ["tuxguitar"])
+    watcher.scan()
+    assert watcher.interval == 2.0
@@ -0,0 +1,60 @@
+import datetime
+
+import pytest
+
+from mastery_app.lib.rollups import add_to_totals, bucket_for, bucket_label, bucket_start, date_bucket
+
+
+def local(*args) -> float:
+    return datetime.datetime(*args).timestamp()
+
+
+def test_day_buckets_split_at_local_midnight():
+    assert bucket_for("day", local(2024, 3, 1, 23, 59, 59)) + 1 == bucket_for("day", local(2024, 3, 2, 0, 0))
+    assert bucket_start("day", bucket_for("day", local(2024, 3, 1, 12))) == datetime.date(2024, 3, 1)
+
+
+def test_weeks_start_on_monday():
+    monday = date_bucket("week", datetime.date(2024, 3, 4))
+    assert date_bucket("week", datetime.date(2024, 3, 3)) == monday - 1
+    assert date_bucket("week", datetime.date(2024, 3, 10)) == monday
+    assert bucket_start("week", monday) == datetime.date(2024, 3, 4)
+
+
+def test_week_across_the_year_end():
+    # ISO week 53 of 2020 runs from Monday Dec 28 to Sunday Jan 3 2021, one bucket
+    assert datetime.date(2020, 12, 28).isocalendar()[1] == 53
+    week = date_bucket("week", datetime.date(2020, 12, 28))
+    assert {date_bucket("week", datetime.date(2020, 12, 28) + datetime.timedelta(days=n)) for n in range(7)} == {week}
+    assert date_bucket("week", datetime.date(2021, 1, 4)) == week + 1
+    assert bucket_label("week", week) == "Dec 28"
+
+
+def test_month_buckets_roll_over_the_year():
+    december = date_bucket("month", datetime.date(2020, 12, 31))
+    assert date_bucket("month", datetime.date(2021, 1, 1)) == december + 1
+    assert bucket_start("month", december) == datetime.date(2020, 12, 1)
+    assert bucket_start("month", december + 1) == datetime.date(2021, 1, 1)
+    assert [bucket_label("month", december + n) for n in range(3)] == ["Dec 2020", "Jan 2021", "Feb 2021"]
+
+
+def test_unknown_period():
+    with pytest.raises(ValueError):
+        date_bucket("year", datetime.date(2024, 1, 1))
+    with pytest.raises(ValueError):
+        bucket_start("year", 1)
+
+
+def test_add_to_totals_sums_every_period():
+    totals = {}
+    add_to_totals(totals, b"k", 600, local(2020, 12, 31, 12))
+    add_to_totals(totals, b"k", 300, local(2021, 1, 1, 12))
+
+    day = date_bucket("day", datetime.date(2020, 12, 31))
+    week = date_bucket("week", datetime.date(2020, 12, 31))
+    assert totals[(b"k", "day", day)] == 600
+    assert totals[(b"k", "day", day + 1)] == 300
+    assert totals[(b"k", "week", week)] == 900
+    assert totals[(b"k", "month", 2020 * 12 + 11)] == 600
+    assert totals[(b"k", "month", 2021 * 12)] == 300
+    assert len(totals) == 5
@@ -0,0 +1,169 @@
+import asyncio
+import json
+
+import pytest
+
+from mastery_app.src.cli import open_db
+from mastery_app.src.server import HTTPError, MasteryServer, etag_matches
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = MasteryServer(open_db(str(tmp_path / "server.db")), read_workers=2)
+    yield server
+    server.close()
+
+
+def exchange(server, *requests):
+    """
+    Send raw requests one connection each, returns [(status, headers, body bytes)].
+    """
+    async def run():
+        await server.start("127.0.0.1", 0)
+        port = server.server.sockets[0].getsockname()[1]
+        responses = []
+        try:
+            for raw in requests:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(raw)
+                await writer.drain()
+                data = await reader.read()
+                writer.close()
+
+                head, _, body = data.partition(b"\r\n\r\n")
+                status_line, *lines = head.decode("latin-1").split("\r\n")
+                headers = {name.lower(): value.strip() for name, _, value in (line.partition(":") for line in lines)}
+                responses.append((int(status_line.split()[1]), headers, body))
+        finally:
+            server.server.close()
+            await server.server.wait_closed()
+        return responses
+
+    return asyncio.run(run())
+
+
+def build(method, path, body = None, headers = None) -> bytes:
+    data = body if isinstance(body, bytes) else (json.dumps(body).encode() if body is not None else b"")
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", "Connection: close"]
+    if data:
+        lines.append(f"Content-Length: {len(data)}")
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data
+
+
+def call(server, method, path, body = None, headers = None):
+    status, headers, data = exchange(server, build(method, path, body, headers))[0]
+    return status, headers, json.loads(data) if data else None
+
+
+@pytest.fixture
+def guitar(server):
+    call(server, "POST", "/users", {"username": "Default Name"})
+    call(server, "POST", "/users/Default%20Name/containers", {"name": "Guitar"})
+    return server
+
+
+# ===============================================================
+# Routing
+# ===============================================================
+def test_route_unquotes_and_picks_the_executor(server):
+    executor, function, args = server.route("POST", "/users/Default%20Name/containers/Ear%20training/log", {"value": "1"})
+    assert executor is server.writer
+    assert function == server.service.log
+    assert args == ["Default Name", "Ear training", {"value": "1"}]
+
+    executor, function, args = server.route("GET", "/users/Default%20Name/timers", {})
+    assert executor is server.readers
+    assert args == ["Default Name"]
+
+
+def test_route_errors(server):
+    with pytest.raises(HTTPError) as e:
+        server.route("DELETE", "/users", {})
+    assert e.value.status == 405
+    with pytest.raises(HTTPError) as e:
+        server.route("GET", "/users/Default%20Name/nothing", {})
+    assert e.value.status == 404
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+# ===============================================================
+# Endpoints
+# ===============================================================
+def test_log_and_show(guitar):
+    status, _, body = call(guitar, "POST", "/users/Default%20Name/containers/Guitar/log", {"seconds": 5400})
+    assert status == 200
+    assert body == {"name": "Guitar", "seconds": 5400, "hours": 1.5, "level": "New"}
+
+    status, _, body = call(guitar, "POST", "/users/Default%20Name/containers/Guitar/log", {"value": "20.30"})
+    assert (status, body["seconds"], body["level"]) == (200, 5400 + 73800, "Novice")
+
+    status, _, body = call(guitar, "GET", "/users/Default%20Name/containers")
+    assert (status, [bar["name"] for bar in body]) == (200, ["Guitar"])
+
+
+def test_missing_rows_are_404(guitar):
+    assert call(guitar, "GET", "/users/Nobody/containers")[0] == 404
+    assert call(guitar, "POST", "/users/Default%20Name/containers/Piano/log", {"seconds": 60})[0] == 404
+
+
+def test_etag_and_not_modified(guitar):
+    path = "/users/Default%20Name/containers/Guitar"
+    status, headers, _ = call(guitar, "GET", path)
+    etag = headers["etag"]
+    assert status == 200
+
+    status, headers, body = call(guitar, "GET", path, headers={"If-None-Match": etag})
+    assert (status, body, headers["etag"]) == (304, None, etag)
+
+    call(guitar, "POST", path + "/log", {"seconds": 60})
+    status, headers, _ = call(guitar, "GET", path, headers={"If-None-Match": etag})
+    assert status == 200
+    assert headers["etag"] != etag
+
+
+def test_wrong_method_is_405(server):
+    status, _, body = call(server, "DELETE", "/users")
+    assert status == 405
+    assert "not allowed" in body["error"]
+
+
+@pytest.mark.parametrize("raw", [b'{"seconds": 1e400}', b'{"seconds": NaN}', b'{"seconds": "lots"}', b'{"value": "abc"}', b'{}'])
+def test_bad_log_values_are_400(guitar, raw):
+    status, _, body = call(guitar, "POST", "/users/Default%20Name/containers/Guitar/log", raw)
+    assert status == 400
+    assert "seconds" in body["error"]
+    assert call(guitar, "GET", "/users/Default%20Name/containers/Guitar")[2]["seconds"] == 0
+
+
+# ===============================================================
+# Request parsing
+# ===============================================================
+@pytest.mark.parametrize("length, status", [("-5", 400), ("lots", 400), (str(64 * 1024 + 1), 413)])
+def test_bad_content_length(server, length, status):
+    raw = f"POST /users HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()
+    assert exchange(server, raw)[0][0] == status
+
+
+@pytest.mark.parametrize("raw", [b"[1, 2]", b"not json"])
+def test_body_must_be_a_json_object(server, raw):
+    status, _, body = call(server, "POST", "/users", raw)
+    assert status == 400
+    assert body == {"error": "Body must be a JSON object"}
+
+
+def test_chunked_body_is_refused(server):
+    raw = b"POST /users HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n0\r\n\r\n"
+    assert exchange(server, raw)[0][0] == 411
+
+
+def test_malformed_request_line(server):
+    assert exchange(server, b"GARBAGE\r\n\r\n")[0][0] == 400
@@ -0,0 +1,155 @@
+import io
+
+import pytest
+
+from mastery_app.lib.keys import new_key
+from mastery_app.lib.mastery_db import MasteryDB
+from mastery_app.lib.sync import merge_changes, peers, write_changes
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    dbs = []
+
+    def make(name):
+        db = MasteryDB(str(tmp_path / f"{name}.db"))
+        db.ensure_schema()
+        dbs.append(db)
+        return db
+
+    yield make
+    for db in dbs:
+        db.close()
+
+
+def add_bar(db, username = "Default Name", name = "Guitar"):
+    """
+    A user (reused if the name exists) with one container, returns (user id, container id).
+    """
+    user = db.fetch_user_by_name_db(username)
+    user_id = user["id"] if user else new_key()
+    if user is None:
+        db.insert_user_db(user_id, username)
+    cont_id = new_key()
+    db.insert_container_db(cont_id, name, user_id)
+    return user_id, cont_id
+
+
+def export(db, **kwargs) -> list:
+    out = io.StringIO()
+    write_changes(db, out, **kwargs)
+    return out.getvalue().splitlines()
+
+
+def totals(db, username = "Default Name") -> list:
+    user = db.fetch_user_by_name_db(username)
+    return [(name, xp_seconds) for name, xp_seconds, _ in db.fetch_container_summary_db(user["id"])]
+
+
+def test_merging_twice_is_idempotent(make_db):
+    a, b = make_db("a"), make_db("b")
+    _, cont = add_bar(a)
+    a.add_session_db(cont, 3600, "New")
+    a.add_session_db(cont, 1800, "New")
+
+    lines = export(a)
+    _, applied, skipped = merge_changes(b, lines)
+    assert (applied, skipped) == (4, 0)
+    assert totals(b) == [("Guitar", 5400)]
+
+    _, applied, skipped = merge_changes(b, lines)
+    assert (applied, skipped) == (0, 0)
+    assert totals(b) == [("Guitar", 5400)]
+    assert len(b.fetch_sessions_db(cont)) == 2
+
+
+def test_same_names_become_aliases_and_totals_are_summed(make_db):
+    a, b = make_db("a"), make_db("b")
+    _, cont_a = add_bar(a)
+    _, cont_b = add_bar(b)
+    a.add_session_db(cont_a, 3600, "New")
+    b.add_session_db(cont_b, 1800, "New")
+
+    merge_changes(b, export(a))
+    merge_changes(a, export(b))
+
+    assert totals(a) == [("Guitar", 5400)]
+    assert totals(b) == [("Guitar", 5400)]
+    # each side kept its own rows, the peer's ids map onto them
+    assert len(a.fetch_sessions_db(cont_a)) == 2
+    assert len(b.fetch_sessions_db(cont_b)) == 2
+    with b.get_cursor() as cursor:
+        cursor.execute("SELECT local FROM sync_aliases WHERE remote = ?", (cont_a,))
+        assert cursor.fetchone()[0] == cont_b
+
+
+def test_tombstones_propagate_deletes(make_db):
+    a, b = make_db("a"), make_db("b")
+    _, guitar = add_bar(a)
+    _, piano = add_bar(a, name="Piano")
+    a.add_session_db(guitar, 3600, "New")
+    a.add_session_db(guitar, 600, "New")
+    merge_changes(b, export(a))
+    merge_changes(a, export(b))
+
+    dropped = a.fetch_sessions_db(guitar)[-1]
+    a.discard_session_db(dropped["id"], "New")
+    a.delete_container_db(piano)
+    _, applied, _ = merge_changes(b, export(a))
+
+    assert applied == 2
+    assert totals(b) == [("Guitar", 3600)]
+    assert [session["id"] for session in b.fetch_sessions_db(guitar)] == [s["id"] for s in a.fetch_sessions_db(guitar)]
+
+
+def test_open_sessions_wait_until_closed(make_db):
+    a, b = make_db("a"), make_db("b")
+    _, cont = add_bar(a)
+    session = new_key()
+    a.open_session_db(session, cont, 1000.0)
+    a.checkpoint_session_db(session, 1600.0, 600, "New")
+
+    merge_changes(b, export(a))
+    assert b.fetch_sessions_db(cont) == []
+    assert totals(b) == [("Guitar", 0)]
+
+    a.close_session_db(session, 1900.0, 900, "New")
+    merge_changes(b, export(a))
+    assert totals(b) == [("Guitar", 900)]
+    assert [row["open"] for row in b.fetch_sessions_db(cont)] == [0]
+
+
+def test_watermarks_only_move_forward(make_db):
+    a, b = make_db("a"), make_db("b")
+    _, cont = add_bar(a)
+    first = export(a)
+    a.add_session_db(cont, 3600, "New")
+    second = export(a)
+
+    origin = merge_changes(b, second)[0]
+    seen = peers(b)[origin]["seen"]
+    # the older file merged late changes nothing, not even the watermark
+    merge_changes(b, first)
+    assert peers(b)[origin]["seen"] == seen
+    assert totals(b) == [("Guitar", 3600)]
+
+
+def test_acked_changes_are_not_sent_again(make_db):
+    a, b = make_db("a"), make_db("b")
+    _, cont = add_bar(a)
+    a.add_session_db(cont, 3600, "New")
+
+    merge_changes(b, export(a))
+    merge_changes(a, export(b))
+    # b has everything a wrote, and what a merged from b came from b
+    assert export(a)[1:] == []
+
+    a.add_session_db(cont, 60, "New")
+    assert len(export(a)[1:]) == 1
+
+
+def test_own_file_is_refused(make_db):
+    a = make_db("a")
+    add_bar(a)
+    with pytest.raises(ValueError, match="this database"):
+        merge_changes(a, export(a))
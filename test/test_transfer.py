@@ -0,0 +1,104 @@
+import io
+
+import pytest
+
+from mastery_app.lib.goals import day_number
+from mastery_app.lib.keys import new_key
+from mastery_app.lib.mastery_db import MasteryDB
+from mastery_app.lib.rollups import bucket_for
+from mastery_app.lib.transfer import export_file, import_file
+
+CSV = """container,hours,start,end,source
+Guitar,1.5,2024-03-01T10:00:00,,manual
+Guitar,20,2024-03-02T10:00:00,2024-03-02T18:00:00,timer
+Piano,0.25,,,
+Piano,2,1709805600,,import
+"""
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    dbs = []
+
+    def make(name):
+        db = MasteryDB(str(tmp_path / f"{name}.db"))
+        db.ensure_schema()
+        user_id = new_key()
+        db.insert_user_db(user_id, "Default Name")
+        dbs.append(db)
+        return db, user_id
+
+    yield make
+    for db in dbs:
+        db.close()
+
+
+def export(db, user_id, fmt) -> str:
+    out = io.StringIO()
+    export_file(db, user_id, out, fmt)
+    return out.getvalue()
+
+
+def day_hours(db, user_id, when) -> float:
+    day = bucket_for("day", when)
+    return db.fetch_rollup_db("day", day, day, user_id=user_id)[0]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_round_trip(make_db, fmt):
+    a, a_user = make_db("a")
+    assert import_file(a, a_user, io.StringIO(CSV), "csv", chunk_size=3) == 4
+
+    text = export(a, a_user, fmt)
+    b, b_user = make_db("b")
+    assert import_file(b, b_user, io.StringIO(text), fmt) == 4
+
+    assert export(b, b_user, fmt) == text
+    for db, user_id in ((a, a_user), (b, b_user)):
+        # totals, levels and rates rebuilt once at the end
+        assert db.fetch_container_summary_db(user_id) == [("Guitar", 77400, "Novice"), ("Piano", 8100, "New")]
+        assert set(db.fetch_rates_db(user_id)) == {"Guitar", "Piano"}
+        # only sessions with an end have a day to roll up into
+        assert day_hours(db, user_id, 1709805600 + 7200) == 2.0
+
+
+def test_bad_record_keeps_what_was_committed_consistent(make_db):
+    db, user_id = make_db("a")
+    lines = CSV.splitlines()
+    bad = "\n".join(lines[:3] + ["Guitar,-1,,,", lines[3]])
+
+    with pytest.raises(ValueError, match="Record 3"):
+        import_file(db, user_id, io.StringIO(bad), "csv", chunk_size=2)
+
+    # the first chunk landed, the one holding the bad record did not
+    summary = db.fetch_container_summary_db(user_id)
+    assert summary == [("Guitar", 77400, "Novice")]
+    guitar = db.fetch_container_by_name_db("Guitar", user_id)
+    sessions = db.fetch_sessions_db(guitar["id"])
+    assert sum(session["seconds"] for session in sessions) == guitar["xp_seconds"]
+
+    # rollups and rates were written for the committed part only
+    month = bucket_for("month", sessions[0]["end_time"])
+    assert db.fetch_rollup_db("month", month, month, user_id=user_id)[0] == 21.5
+    assert set(db.fetch_rates_db(user_id)) == {"Guitar"}
+
+
+@pytest.mark.parametrize("row, message", [
+    ("Guitar,lots,,,", "Record 1"),
+    (",1,,,", "empty container name"),
+    ("Guitar,1,,,fishing", "unknown source"),
+    ("Guitar,1,yesterday,,", "Record 1"),
+])
+def test_bad_records_are_named(make_db, row, message):
+    db, user_id = make_db("a")
+    with pytest.raises(ValueError, match=message):
+        import_file(db, user_id, io.StringIO("container,hours,start,end,source\n" + row), "csv")
+    assert db.fetch_container_summary_db(user_id) == []
+
+
+def test_jsonl_skips_blank_lines(make_db):
+    db, user_id = make_db("a")
+    text = '{"container": "Guitar", "hours": 1, "end": 1709805600}\n\n{"container": "Guitar", "hours": 0.5}\n'
+    assert import_file(db, user_id, io.StringIO(text), "jsonl") == 2
+    assert db.fetch_container_summary_db(user_id) == [("Guitar", 5400, "New")]
+    assert db.fetch_rates_db(user_id)["Guitar"].day == day_number(1709805600)
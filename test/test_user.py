@@ -0,0 +1,127 @@
+import pytest
+
+from mastery_app.lib.keys import new_key
+from mastery_app.lib.lazy_containers import LazyContainers
+from mastery_app.lib.levels import LevelLadder
+from mastery_app.lib.mastery_db import MasteryDB
+from mastery_app.lib.prefix_index import PrefixIndex
+from mastery_app.lib.user import User, load_user, make_new_user
+
+
+# ===============================================================
+# PrefixIndex
+# ===============================================================
+def test_search_ignores_case_and_keeps_order():
+    index = PrefixIndex(["piano", "Guitar", "Bass guitar", "gamelan", "Go"])
+    assert index.search("g") == ["gamelan", "Go", "Guitar"]
+    assert index.search("GU") == ["Guitar"]
+    assert index.search("") == ["Bass guitar", "gamelan", "Go", "Guitar", "piano"]
+    assert index.search("x") == []
+    assert index.first() == "Bass guitar"
+
+
+def test_search_limit():
+    index = PrefixIndex(f"Scale {i:03}" for i in range(100))
+    assert index.search("scale", limit=3) == ["Scale 000", "Scale 001", "Scale 002"]
+    assert len(index.search("scale 0")) == 50
+
+
+def test_names_differing_only_in_case_are_both_kept():
+    index = PrefixIndex(["guitar", "Guitar"])
+    assert len(index) == 2
+    index.remove("guitar")
+    assert "guitar" not in index
+    assert index.search("gui") == ["Guitar"]
+
+
+def test_version_moves_only_on_changes():
+    index = PrefixIndex(["Guitar"])
+    index.add("Guitar")
+    index.remove("Piano")
+    assert index.version == 0
+
+    index.add("Piano")
+    index.remove("Guitar")
+    assert index.version == 2
+    assert index.search("") == ["Piano"]
+
+
+def test_empty_index():
+    index = PrefixIndex()
+    assert len(index) == 0
+    assert index.first() is None
+    assert index.search("a") == []
+
+
+# ===============================================================
+# User keeps its index in step
+# ===============================================================
+@pytest.fixture
+def user(tmp_path):
+    db = MasteryDB(str(tmp_path / "user.db"))
+    yield User("Default Name", db=db)
+    db.close()
+
+
+def test_user_index_follows_containers(user):
+    user.new_container("Guitar")
+    user.new_container("Piano")
+    user.new_container("Guitar")
+    assert user.index.search("") == ["Guitar", "Piano"]
+
+    user.delete_container("Guitar")
+    assert user.index.search("g") == []
+    assert len(user.index) == len(user.containers) == 1
+
+
+# ===============================================================
+# Lazy profiles
+# ===============================================================
+@pytest.fixture
+def lazy_user(tmp_path):
+    db = MasteryDB(str(tmp_path / "lazy.db"))
+    db.ensure_schema()
+    user = make_new_user("Default Name", db)
+    for name in ("Piano", "Guitar", "Drums"):
+        key = new_key()
+        db.insert_container_db(key, name, user.uuid)
+        db.add_session_db(key, 30 * 3600, "Novice")
+    yield load_user(db, user.uuid, lazy=True)
+    db.close()
+
+
+def test_lazy_containers_answer_without_building(lazy_user):
+    containers = lazy_user.containers
+    assert isinstance(containers, LazyContainers)
+    assert len(containers) == 3
+    assert "Guitar" in containers and "Violin" not in containers
+    assert sorted(containers) == ["Drums", "Guitar", "Piano"]
+    assert lazy_user.xp_seconds() == {"Drums": 108000, "Guitar": 108000, "Piano": 108000}
+    assert lazy_user.index.search("") == ["Drums", "Guitar", "Piano"]
+    assert containers.built() == 0
+
+
+def test_lazy_container_is_built_once_on_lookup(lazy_user):
+    containers = lazy_user.containers
+    order = list(containers)
+    guitar = containers["Guitar"]
+    assert (guitar.container_name, guitar.xp_seconds, guitar.level) == ("Guitar", 108000, "Novice")
+    assert containers["Guitar"] is guitar
+    assert containers.built() == 1
+    # building keeps the entry where it was
+    assert list(containers) == order
+
+    with pytest.raises(KeyError):
+        containers["Violin"]
+
+
+def test_lazy_set_ladder_leaves_entries_unbuilt(lazy_user):
+    containers = lazy_user.containers
+    guitar = containers["Guitar"]
+    ladder = LevelLadder([(0, "Beginner"), (25, "Going")])
+    containers.set_ladder(ladder, {name: "Going" for name in containers})
+
+    assert containers.built() == 1
+    assert (guitar.level, guitar.ladder) == ("Going", ladder)
+    assert containers["Piano"].level == "Going"
+    assert containers["Piano"].ladder is ladder